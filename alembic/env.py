@@ -7,7 +7,7 @@ from alembic import context
 
 # Import models and database configuration
 from app.database import Base
-from app.models import Weather, ActionLog  # noqa: F401
+from app.models import Weather, ActionLog, WeatherObservation  # noqa: F401
 from app.config import get_settings
 
 # this is the Alembic Config object
@@ -0,0 +1,28 @@
+"""Add provider city ID to weather for batched group fetches
+
+Revision ID: 002
+Revises: 001
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '002'
+down_revision: Union[str, None] = '001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('weather', sa.Column('provider_id', sa.Integer(), nullable=True))
+    op.create_index(op.f('ix_weather_provider_id'), 'weather', ['provider_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_weather_provider_id'), table_name='weather')
+    op.drop_column('weather', 'provider_id')
@@ -0,0 +1,48 @@
+"""Add normalized city/country keys with a unique constraint for upserts
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '003'
+down_revision: Union[str, None] = '002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('weather', sa.Column('city_key', sa.String(length=100), nullable=True))
+    op.add_column('weather', sa.Column('country_key', sa.String(length=100), nullable=True))
+
+    op.execute("UPDATE weather SET city_key = lower(trim(city)), country_key = lower(trim(country))")
+
+    # Keep only the latest row per key so the unique constraint can be created
+    op.execute(
+        """
+        DELETE FROM weather w
+        USING weather newer
+        WHERE newer.city_key = w.city_key
+          AND newer.country_key = w.country_key
+          AND (newer.data_timestamp, newer.id) > (w.data_timestamp, w.id)
+        """
+    )
+
+    op.alter_column('weather', 'city_key', nullable=False)
+    op.alter_column('weather', 'country_key', nullable=False)
+    op.create_unique_constraint(
+        'uq_weather_city_key_country_key', 'weather', ['city_key', 'country_key']
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint('uq_weather_city_key_country_key', 'weather', type_='unique')
+    op.drop_column('weather', 'country_key')
+    op.drop_column('weather', 'city_key')
@@ -0,0 +1,34 @@
+"""Composite indexes for keyset pagination of weather and action logs
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '004'
+down_revision: Union[str, None] = '003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # The composite indexes serve every query the single-column ones did
+    op.create_index('ix_weather_data_timestamp_id', 'weather', ['data_timestamp', 'id'], unique=False)
+    op.drop_index('ix_weather_data_timestamp', table_name='weather')
+
+    op.create_index('ix_action_logs_created_at_id', 'action_logs', ['created_at', 'id'], unique=False)
+    op.drop_index('ix_action_logs_created_at', table_name='action_logs')
+
+
+def downgrade() -> None:
+    op.create_index('ix_action_logs_created_at', 'action_logs', ['created_at'], unique=False)
+    op.drop_index('ix_action_logs_created_at_id', table_name='action_logs')
+
+    op.create_index('ix_weather_data_timestamp', 'weather', ['data_timestamp'], unique=False)
+    op.drop_index('ix_weather_data_timestamp_id', table_name='weather')
@@ -0,0 +1,81 @@
+"""Casefold and collapse whitespace in weather lookup keys, index latest-by-city lookups
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '005'
+down_revision: Union[str, None] = '004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 1000
+
+weather = sa.table(
+    'weather',
+    sa.column('id', sa.Integer),
+    sa.column('city', sa.String),
+    sa.column('country', sa.String),
+    sa.column('city_key', sa.String),
+    sa.column('country_key', sa.String),
+    sa.column('data_timestamp', sa.DateTime),
+)
+
+
+def normalize_key(value: str) -> str:
+    # Frozen copy of app.models.weather.normalize_key
+    return " ".join(value.split()).casefold()
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    rows = bind.execute(
+        sa.select(weather.c.id, weather.c.city, weather.c.country, weather.c.city_key, weather.c.country_key)
+        .order_by(weather.c.data_timestamp.desc(), weather.c.id.desc())
+    )
+
+    # Casefolding can merge keys that lower() kept apart; the latest row wins
+    seen = set()
+    stale_ids = []
+    updates = []
+    for row in rows:
+        key = (normalize_key(row.city), normalize_key(row.country))
+        if key in seen:
+            stale_ids.append(row.id)
+            continue
+        seen.add(key)
+        if key != (row.city_key, row.country_key):
+            updates.append({'row_id': row.id, 'new_city_key': key[0], 'new_country_key': key[1]})
+
+    for start in range(0, len(stale_ids), BATCH_SIZE):
+        bind.execute(weather.delete().where(weather.c.id.in_(stale_ids[start:start + BATCH_SIZE])))
+
+    update = (
+        weather.update()
+        .where(weather.c.id == sa.bindparam('row_id'))
+        .values(city_key=sa.bindparam('new_city_key'), country_key=sa.bindparam('new_country_key'))
+    )
+    for start in range(0, len(updates), BATCH_SIZE):
+        bind.execute(update, updates[start:start + BATCH_SIZE])
+
+    # Lookups filter on the keys now, so the index on raw names is unused
+    op.create_index(
+        'ix_weather_city_key_country_key_ts',
+        'weather',
+        ['city_key', 'country_key', sa.text('data_timestamp DESC')],
+        unique=False,
+    )
+    op.drop_index('ix_weather_city_country', table_name='weather')
+
+
+def downgrade() -> None:
+    op.create_index('ix_weather_city_country', 'weather', ['city', 'country'], unique=False)
+    op.drop_index('ix_weather_city_key_country_key_ts', table_name='weather')
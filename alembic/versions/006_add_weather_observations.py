@@ -0,0 +1,69 @@
+"""Add monthly partitioned weather_observations history table
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '006'
+down_revision: Union[str, None] = '005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Partitions created up front; the scheduler keeps creating them afterwards
+INITIAL_MONTHS = 4
+
+
+def upgrade() -> None:
+    op.create_table(
+        'weather_observations',
+        sa.Column('city_key', sa.String(length=100), nullable=False),
+        sa.Column('country_key', sa.String(length=100), nullable=False),
+        sa.Column('data_timestamp', sa.DateTime(), nullable=False),
+        sa.Column('city', sa.String(length=100), nullable=False),
+        sa.Column('country', sa.String(length=100), nullable=False),
+        sa.Column('provider_id', sa.Integer(), nullable=True),
+        sa.Column('latitude', sa.Float(), nullable=True),
+        sa.Column('longitude', sa.Float(), nullable=True),
+        sa.Column('temperature', sa.Float(), nullable=False),
+        sa.Column('feels_like', sa.Float(), nullable=True),
+        sa.Column('humidity', sa.Float(), nullable=False),
+        sa.Column('pressure', sa.Float(), nullable=False),
+        sa.Column('wind_speed', sa.Float(), nullable=True),
+        sa.Column('wind_direction', sa.Integer(), nullable=True),
+        sa.Column('cloudiness', sa.Integer(), nullable=True),
+        sa.Column('weather_description', sa.String(length=200), nullable=True),
+        sa.Column('weather_main', sa.String(length=50), nullable=True),
+        sa.Column('visibility', sa.Integer(), nullable=True),
+        sa.Column('source', sa.String(length=20), nullable=True),
+        sa.Column('ingested_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('city_key', 'country_key', 'data_timestamp'),
+        postgresql_partition_by='RANGE (data_timestamp)',
+    )
+    op.create_index(
+        'ix_weather_observations_ingested_at', 'weather_observations', ['ingested_at'], unique=False
+    )
+
+    now = datetime.utcnow()
+    for offset in range(INITIAL_MONTHS):
+        index = now.year * 12 + now.month - 1 + offset
+        start = datetime(index // 12, index % 12 + 1, 1)
+        end = datetime((index + 1) // 12, (index + 1) % 12 + 1, 1)
+        op.execute(
+            f"CREATE TABLE weather_observations_p{start:%Y%m} PARTITION OF weather_observations "
+            f"FOR VALUES FROM ('{start:%Y-%m-%d}') TO ('{end:%Y-%m-%d}')"
+        )
+
+
+def downgrade() -> None:
+    # Dropping the parent drops every partition with it
+    op.drop_index('ix_weather_observations_ingested_at', table_name='weather_observations')
+    op.drop_table('weather_observations')
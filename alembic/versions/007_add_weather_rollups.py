@@ -0,0 +1,58 @@
+"""Add hourly and daily weather rollups with an ingestion watermark
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '007'
+down_revision: Union[str, None] = '006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ROLLUP_TABLES = ('weather_rollups_hourly', 'weather_rollups_daily')
+
+
+def upgrade() -> None:
+    for table in ROLLUP_TABLES:
+        op.create_table(
+            table,
+            sa.Column('city_key', sa.String(length=100), nullable=False),
+            sa.Column('country_key', sa.String(length=100), nullable=False),
+            sa.Column('bucket_start', sa.DateTime(), nullable=False),
+            sa.Column('city', sa.String(length=100), nullable=False),
+            sa.Column('country', sa.String(length=100), nullable=False),
+            sa.Column('samples', sa.Integer(), nullable=False),
+            sa.Column('temperature_min', sa.Float(), nullable=False),
+            sa.Column('temperature_max', sa.Float(), nullable=False),
+            sa.Column('temperature_avg', sa.Float(), nullable=False),
+            sa.Column('humidity_min', sa.Float(), nullable=False),
+            sa.Column('humidity_max', sa.Float(), nullable=False),
+            sa.Column('humidity_avg', sa.Float(), nullable=False),
+            sa.Column('pressure_min', sa.Float(), nullable=False),
+            sa.Column('pressure_max', sa.Float(), nullable=False),
+            sa.Column('pressure_avg', sa.Float(), nullable=False),
+            sa.Column('updated_at', sa.DateTime(), nullable=False),
+            sa.PrimaryKeyConstraint('city_key', 'country_key', 'bucket_start'),
+        )
+
+    op.create_table(
+        'rollup_watermarks',
+        sa.Column('name', sa.String(length=50), nullable=False),
+        sa.Column('ingested_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('name'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('rollup_watermarks')
+    for table in ROLLUP_TABLES:
+        op.drop_table(table)
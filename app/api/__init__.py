@@ -1,5 +1,5 @@
 from app.api.weather import router as weather_router
 from app.api.logs import router as logs_router
+from app.api.internal import router as internal_router
 
-__all__ = ["weather_router", "logs_router"]
-
+__all__ = ["weather_router", "logs_router", "internal_router"]
@@ -0,0 +1,73 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.services.fetch_engine import get_fetch_engine
+from app.services.weather_fetcher import get_response_cache
+from app.services.resilience import circuit_breaker_stats
+from app.services.weather_cache import get_weather_cache
+from app.services.invalidation_bus import get_invalidation_listener
+from app.services.spatial_index import get_spatial_index
+from app.services.columnar_snapshot import get_columnar_snapshot
+from app.services.weather_grid import get_weather_grid
+from app.pool_metrics import pool_stats
+from app.database import get_db, pool_metrics
+from app.models.import_checkpoint import ImportCheckpoint
+from app.schemas.importer import ImportRequest
+from app.services.importer import (
+    ImportInProgressError,
+    ImportSourceError,
+    checkpoint_dict,
+    get_import_job,
+    start_import_job,
+)
+
+router = APIRouter(prefix="/internal", tags=["Internal"])
+
+
+@router.get("/fetcher")
+async def get_fetcher_stats():
+    return {
+        "engine": get_fetch_engine().stats(),
+        "cache": get_response_cache().stats(),
+        "circuits": circuit_breaker_stats(),
+    }
+
+
+@router.get("/cache")
+async def get_cache_stats():
+    listener = get_invalidation_listener()
+    return {
+        "weather": get_weather_cache().stats(),
+        "invalidation_listener": listener.stats() if listener else None,
+        "spatial_index": get_spatial_index().stats(),
+        "snapshot": get_columnar_snapshot().stats(),
+        "grid": get_weather_grid().stats(),
+    }
+
+
+@router.get("/pool")
+async def get_pool_stats():
+    return {name: pool_stats(engine, metrics) for name, (engine, metrics) in pool_metrics.items()}
+
+
+@router.post("/imports", status_code=202)
+async def start_import(body: ImportRequest):
+    """Import a CSV/NDJSON file from the server's disk in the background."""
+    try:
+        job = start_import_job(body.source, body.format, body.name, body.chunk_size, body.restart)
+    except ImportSourceError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ImportInProgressError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return job.as_dict()
+
+
+@router.get("/imports/{name}")
+async def get_import_status(name: str, db: AsyncSession = Depends(get_db)):
+    job = get_import_job(name)
+    if job:
+        return job.as_dict()
+    
+    checkpoint = await db.get(ImportCheckpoint, name)
+    if not checkpoint:
+        raise HTTPException(status_code=404, detail=f"Import {name} not found")
+    return checkpoint_dict(checkpoint)
@@ -1,11 +1,15 @@
-from typing import Optional
+from typing import Literal, Optional
 from datetime import datetime
-from fastapi import APIRouter, Depends, Query, HTTPException
+from fastapi import APIRouter, Depends, Query, HTTPException, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.database import get_db
+from app.config import get_settings
+from app.database import get_read_db
 from app.schemas.log import ActionLogResponse, ActionLogListResponse
 from app.services.log_service import LogService
-import math
+from app.services.export import MEDIA_TYPES, export_headers, render_export
+from app.services.fieldsets import resolve_fieldset
+from app.services.pagination import TotalMode, decode_cursor, page_fields
 
 router = APIRouter(prefix="/logs", tags=["Logs"])
 
@@ -19,10 +23,20 @@ async def get_logs(
     status: Optional[str] = Query(None),
     start_date: Optional[datetime] = Query(None),
     end_date: Optional[datetime] = Query(None),
-    db: AsyncSession = Depends(get_db),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    total: Optional[TotalMode] = Query(None, description="exact, estimate or none"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. action,status,created_at"),
+    db: AsyncSession = Depends(get_read_db),
 ):
     service = LogService(db)
-    items, total = await service.get_logs(
+    try:
+        after = decode_cursor(cursor) if cursor else None
+        fieldset = resolve_fieldset(fields, ActionLogResponse, ActionLogListResponse)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    total_mode = total or get_settings().logs_list_total_mode
+    items, total_count = await service.get_logs(
         page=page,
         size=size,
         action=action,
@@ -30,21 +44,49 @@ async def get_logs(
         status=status,
         start_date=start_date,
         end_date=end_date,
+        cursor=after,
+        total_mode=total_mode,
+        columns=fieldset.columns(required=("created_at", "id")) if fieldset else None,
     )
     
-    pages = math.ceil(total / size) if total > 0 else 1
-    
-    return ActionLogListResponse(
-        items=items,
-        total=total,
-        page=page,
-        size=size,
-        pages=pages,
+    page_data = page_fields(
+        items, total_count, page, size, total_mode,
+        sort_key=lambda log: (log.created_at, log.id),
+    )
+    if fieldset:
+        return Response(content=fieldset.dump_page(page_data), media_type="application/json")
+    return ActionLogListResponse(**page_data)
+
+
+@router.get("/export")
+async def export_logs(
+    action: Optional[str] = Query(None),
+    entity: Optional[str] = Query(None),
+    status: Optional[str] = Query(None),
+    start_date: Optional[datetime] = Query(None),
+    end_date: Optional[datetime] = Query(None),
+    format: Literal["ndjson", "csv"] = Query("ndjson"),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Stream every matching log as NDJSON or CSV."""
+    fetch_size = get_settings().export_fetch_size
+    rows = LogService(db).stream_logs(
+        action=action,
+        entity=entity,
+        status=status,
+        start_date=start_date,
+        end_date=end_date,
+        fetch_size=fetch_size,
+    )
+    return StreamingResponse(
+        render_export(rows, ActionLogResponse, format, fetch_size),
+        media_type=MEDIA_TYPES[format],
+        headers=export_headers("action_logs", format),
     )
 
 
 @router.get("/summary")
-async def get_logs_summary(db: AsyncSession = Depends(get_db)):
+async def get_logs_summary(db: AsyncSession = Depends(get_read_db)):
     service = LogService(db)
     return await service.get_actions_summary()
 
@@ -52,7 +94,7 @@ async def get_logs_summary(db: AsyncSession = Depends(get_db)):
 @router.get("/{log_id}", response_model=ActionLogResponse)
 async def get_log(
     log_id: int,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     service = LogService(db)
     log = await service.get_log_by_id(log_id)
@@ -1,17 +1,37 @@
-from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from collections import Counter
+from datetime import datetime
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.database import get_db
+from app.config import get_settings
+from app.database import get_db, get_read_db
 from app.schemas.weather import (
     WeatherCreate,
     WeatherUpdate,
     WeatherResponse,
     WeatherListResponse,
+    WeatherEstimate,
+    WeatherGridResponse,
+    WeatherInterpolationRequest,
+    WeatherInterpolationResponse,
+    WeatherNearbyItem,
+    WeatherNearbyResponse,
+    WeatherStatsResponse,
+    WeatherBulkResponse,
+    WeatherTopResponse,
 )
 from app.services.weather_service import WeatherService
 from app.services.log_service import LogService
 from app.services.weather_fetcher import WeatherFetcher
-import math
+from app.services.interpolation import InterpolationService
+from app.services.weather_grid import GridTooLargeError, get_weather_grid
+from app.services.export import MEDIA_TYPES, export_headers, render_export
+from app.services.fieldsets import resolve_fieldset
+from app.services.bulk_ingest import BulkLimitError, BulkPayloadError, ingest_weather
+from app.services.rollup_service import DEFAULT_WINDOWS, RollupService
+from app.services.pagination import TotalMode, decode_cursor, page_fields
 
 router = APIRouter(prefix="/weather", tags=["Weather"])
 
@@ -33,7 +53,8 @@ async def create_weather(
     ip, user_agent = get_client_info(request)
     
     try:
-        weather = await service.create(weather_data)
+        async with db.begin_nested():
+            weather = await service.create(weather_data)
         await log_service.log_action(
             action="CREATE",
             entity="weather",
@@ -43,6 +64,20 @@ async def create_weather(
             user_agent=user_agent,
         )
         return weather
+    except IntegrityError:
+        await log_service.log_action(
+            action="CREATE",
+            entity="weather",
+            status="error",
+            error_message="Weather for this city already exists",
+            details={"city": weather_data.city, "country": weather_data.country},
+            ip_address=ip,
+            user_agent=user_agent,
+        )
+        raise HTTPException(
+            status_code=409,
+            detail=f"Weather for {weather_data.city}, {weather_data.country} already exists",
+        )
     except Exception as e:
         await log_service.log_action(
             action="CREATE",
@@ -55,30 +90,254 @@ async def create_weather(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post(
+    "/bulk",
+    response_model=WeatherBulkResponse,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {
+                    "schema": {"type": "array", "items": {"$ref": "#/components/schemas/WeatherCreate"}},
+                },
+                "application/x-ndjson": {
+                    "schema": {"$ref": "#/components/schemas/WeatherCreate"},
+                },
+            },
+        },
+    },
+)
+async def bulk_create_weather(
+    request: Request,
+    on_conflict: Literal["error", "update"] = Query("error", description="Report existing cities or update them"),
+    db: AsyncSession = Depends(get_db),
+):
+    """Create many records from a JSON array or NDJSON body, parsed as it streams in."""
+    settings = get_settings()
+    service = WeatherService(db)
+    log_service = LogService(db)
+    ip, user_agent = get_client_info(request)
+    
+    try:
+        results = await ingest_weather(
+            service,
+            request.stream(),
+            on_conflict=on_conflict,
+            max_items=settings.bulk_max_items,
+            chunk_size=settings.bulk_upsert_chunk_size,
+        )
+    except (BulkLimitError, BulkPayloadError) as e:
+        await log_service.log_action(
+            action="BULK_CREATE",
+            entity="weather",
+            status="error",
+            error_message=str(e),
+            ip_address=ip,
+            user_agent=user_agent,
+        )
+        raise HTTPException(status_code=413 if isinstance(e, BulkLimitError) else 400, detail=str(e))
+    
+    counts = Counter(result.status for result in results)
+    summary = {
+        "total": len(results),
+        "created": counts["created"],
+        "updated": counts["updated"],
+        "conflicts": counts["conflict"],
+        "invalid": counts["invalid"],
+    }
+    await log_service.log_action(
+        action="BULK_CREATE",
+        entity="weather",
+        details={**summary, "on_conflict": on_conflict},
+        ip_address=ip,
+        user_agent=user_agent,
+    )
+    
+    return WeatherBulkResponse(**summary, items=results)
+
+
 @router.get("/", response_model=WeatherListResponse)
 async def get_weather_list(
     page: int = Query(1, ge=1),
     size: int = Query(10, ge=1, le=100),
     city: Optional[str] = Query(None),
     country: Optional[str] = Query(None),
-    db: AsyncSession = Depends(get_db),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    total: Optional[TotalMode] = Query(None, description="exact, estimate or none"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. city,temperature,data_timestamp"),
+    db: AsyncSession = Depends(get_read_db),
 ):
     service = WeatherService(db)
-    items, total = await service.get_all(page=page, size=size, city=city, country=country)
+    try:
+        after = decode_cursor(cursor) if cursor else None
+        fieldset = resolve_fieldset(fields, WeatherResponse, WeatherListResponse)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    pages = math.ceil(total / size) if total > 0 else 1
+    total_mode = total or get_settings().weather_list_total_mode
+    items, total_count = await service.get_all(
+        page=page, size=size, city=city, country=country, cursor=after, total_mode=total_mode,
+        columns=fieldset.columns(required=("data_timestamp", "id")) if fieldset else None,
+    )
     
-    return WeatherListResponse(
-        items=items,
-        total=total,
-        page=page,
-        size=size,
-        pages=pages,
+    page_data = page_fields(
+        items, total_count, page, size, total_mode,
+        sort_key=lambda weather: (weather.data_timestamp, weather.id),
+    )
+    if fieldset:
+        return Response(content=fieldset.dump_page(page_data), media_type="application/json")
+    return WeatherListResponse(**page_data)
+
+
+@router.get("/export")
+async def export_weather(
+    city: Optional[str] = Query(None),
+    country: Optional[str] = Query(None),
+    format: Literal["ndjson", "csv"] = Query("ndjson"),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Stream every matching record as NDJSON or CSV."""
+    fetch_size = get_settings().export_fetch_size
+    rows = WeatherService(db).stream_all(city=city, country=country, fetch_size=fetch_size)
+    return StreamingResponse(
+        render_export(rows, WeatherResponse, format, fetch_size),
+        media_type=MEDIA_TYPES[format],
+        headers=export_headers("weather", format),
+    )
+
+
+@router.get("/near", response_model=WeatherNearbyResponse)
+async def get_weather_near(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    k: int = Query(10, ge=1, le=100),
+    radius_km: Optional[float] = Query(None, gt=0),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Latest weather of the ``k`` cities closest to a point, optionally within ``radius_km``."""
+    service = WeatherService(db)
+    nearest = await service.get_nearest(lat, lon, k, radius_km)
+    
+    items = [
+        WeatherNearbyItem(**WeatherResponse.model_validate(weather).model_dump(), distance_km=round(distance, 3))
+        for weather, distance in nearest
+    ]
+    return WeatherNearbyResponse(latitude=lat, longitude=lon, radius_km=radius_km, items=items)
+
+
+@router.get("/interpolate", response_model=WeatherEstimate)
+async def interpolate_weather(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    k: Optional[int] = Query(None, ge=1, le=100),
+    power: Optional[float] = Query(None, gt=0, le=10),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Estimate the weather at a point by inverse-distance weighting of the nearest cities."""
+    settings = get_settings()
+    service = InterpolationService(db)
+    items = await service.estimate(
+        [lat], [lon], k or settings.interpolation_k, power or settings.interpolation_power,
+    )
+    if items is None:
+        raise HTTPException(status_code=404, detail="No weather records with coordinates")
+    return items[0]
+
+
+@router.post("/interpolate", response_model=WeatherInterpolationResponse)
+async def interpolate_weather_batch(
+    body: WeatherInterpolationRequest,
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Estimate the weather at many points in one vectorized pass."""
+    settings = get_settings()
+    if len(body.points) > settings.interpolation_max_points:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {settings.interpolation_max_points} points per request",
+        )
+    
+    k = body.k or settings.interpolation_k
+    power = body.power or settings.interpolation_power
+    service = InterpolationService(db)
+    items = await service.estimate(
+        [point.lat for point in body.points], [point.lon for point in body.points], k, power,
+    )
+    if items is None:
+        raise HTTPException(status_code=404, detail="No weather records with coordinates")
+    return WeatherInterpolationResponse(k=k, power=power, items=items)
+
+
+def parse_bbox(value: str) -> tuple:
+    try:
+        min_lon, min_lat, max_lon, max_lat = (float(part) for part in value.split(","))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="bbox must be min_lon,min_lat,max_lon,max_lat")
+    if not (-180 <= min_lon < max_lon <= 180 and -90 <= min_lat < max_lat <= 90):
+        raise HTTPException(status_code=400, detail="bbox is out of range or empty")
+    return min_lon, min_lat, max_lon, max_lat
+
+
+@router.get("/grid", responses={200: {"model": WeatherGridResponse}})
+async def get_weather_grid_bbox(
+    bbox: str = Query(..., description="min_lon,min_lat,max_lon,max_lat"),
+    cell_deg: float = Query(1.0, gt=0, le=90),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Mean temperature, humidity and cloudiness per cell_deg x cell_deg cell of a bounding box."""
+    try:
+        content = await get_weather_grid().bbox(db, *parse_bbox(bbox), cell_deg)
+    except GridTooLargeError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return Response(content=content, media_type="application/json")
+
+
+@router.get("/grid/{z}/{x}/{y}", responses={200: {"model": WeatherGridResponse}})
+async def get_weather_grid_tile(
+    z: int = Path(..., ge=0, le=22),
+    x: int = Path(..., ge=0),
+    y: int = Path(..., ge=0),
+    cells: int = Query(16, ge=1, le=256, description="Cells per tile side"),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Per-cell aggregates of one Web Mercator tile split into cells x cells."""
+    if x >= 2 ** z or y >= 2 ** z:
+        raise HTTPException(status_code=404, detail=f"Tile {z}/{x}/{y} does not exist")
+    try:
+        content = await get_weather_grid().tile(db, z, x, y, cells)
+    except GridTooLargeError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return Response(content=content, media_type="application/json")
+
+
+@router.get("/top", response_model=WeatherTopResponse)
+async def get_weather_top(
+    field: Literal[
+        "temperature", "feels_like", "humidity", "pressure", "wind_speed",
+        "wind_direction", "cloudiness", "visibility", "latitude", "longitude",
+    ] = Query("temperature"),
+    n: int = Query(50, ge=1, le=1000),
+    order: Literal["desc", "asc"] = Query("desc"),
+    country: Optional[str] = None,
+    weather_main: Optional[str] = None,
+    min_value: Optional[float] = Query(None, description="Only cities with field >= min_value"),
+    max_value: Optional[float] = Query(None, description="Only cities with field <= max_value"),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Top ``n`` cities by a numeric field (e.g. the hottest 50), served from the in-memory snapshot."""
+    service = WeatherService(db)
+    items = await service.top(
+        field, n,
+        descending=order == "desc",
+        country=country,
+        weather_main=weather_main,
+        ranges={field: (min_value, max_value)},
     )
+    return WeatherTopResponse(field=field, order=order, version=service.snapshot.version, items=items)
 
 
 @router.get("/cities", response_model=list)
-async def get_cities(db: AsyncSession = Depends(get_db)):
+async def get_cities(db: AsyncSession = Depends(get_read_db)):
     service = WeatherService(db)
     return await service.get_cities_list()
 
@@ -87,28 +346,71 @@ async def get_cities(db: AsyncSession = Depends(get_db)):
 async def get_weather_by_city(
     city_name: str,
     country: Optional[str] = Query(None),
-    db: AsyncSession = Depends(get_db),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. city,temperature,data_timestamp"),
+    db: AsyncSession = Depends(get_read_db),
 ):
+    try:
+        fieldset = resolve_fieldset(fields, WeatherResponse, WeatherListResponse)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
     service = WeatherService(db)
-    weather = await service.get_by_city(city_name, country)
+    weather = await service.get_snapshot_by_city(city_name, country)
     
     if not weather:
         raise HTTPException(status_code=404, detail=f"Weather data for {city_name} not found")
     
+    if fieldset:
+        return Response(content=fieldset.dump(weather), media_type="application/json")
     return weather
 
 
+@router.get("/city/{city_name}/stats", response_model=WeatherStatsResponse)
+async def get_weather_stats_by_city(
+    city_name: str,
+    bucket: Literal["hour", "day"] = Query("hour"),
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    country: Optional[str] = Query(None),
+    db: AsyncSession = Depends(get_read_db),
+):
+    end = end or datetime.utcnow()
+    start = start or end - DEFAULT_WINDOWS[bucket]
+    if start >= end:
+        raise HTTPException(status_code=400, detail="'from' must be earlier than 'to'")
+    
+    service = RollupService(db)
+    items = await service.get_stats(city_name, bucket, start, end, country)
+    
+    return WeatherStatsResponse(
+        city=city_name,
+        country=country,
+        bucket=bucket,
+        start=start,
+        end=end,
+        items=items,
+    )
+
+
 @router.get("/{weather_id}", response_model=WeatherResponse)
 async def get_weather(
     weather_id: int,
-    db: AsyncSession = Depends(get_db),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. city,temperature,data_timestamp"),
+    db: AsyncSession = Depends(get_read_db),
 ):
+    try:
+        fieldset = resolve_fieldset(fields, WeatherResponse, WeatherListResponse)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
     service = WeatherService(db)
-    weather = await service.get_by_id(weather_id)
+    weather = await service.get_snapshot_by_id(weather_id)
     
     if not weather:
         raise HTTPException(status_code=404, detail="Weather record not found")
     
+    if fieldset:
+        return Response(content=fieldset.dump(weather), media_type="application/json")
     return weather
 
 
@@ -124,7 +426,8 @@ async def update_weather(
     ip, user_agent = get_client_info(request)
     
     try:
-        weather = await service.update(weather_id, weather_data)
+        async with db.begin_nested():
+            weather = await service.update(weather_id, weather_data)
         
         if not weather:
             raise HTTPException(status_code=404, detail="Weather record not found")
@@ -140,6 +443,17 @@ async def update_weather(
         return weather
     except HTTPException:
         raise
+    except IntegrityError:
+        await log_service.log_action(
+            action="UPDATE",
+            entity="weather",
+            entity_id=weather_id,
+            status="error",
+            error_message="Weather for this city already exists",
+            ip_address=ip,
+            user_agent=user_agent,
+        )
+        raise HTTPException(status_code=409, detail="Weather for this city already exists")
     except Exception as e:
         await log_service.log_action(
             action="UPDATE",
@@ -195,6 +509,7 @@ async def delete_weather(
 async def fetch_weather_for_city(
     city_name: str,
     request: Request,
+    response: Response,
     db: AsyncSession = Depends(get_db),
 ):
     fetcher = WeatherFetcher()
@@ -203,15 +518,25 @@ async def fetch_weather_for_city(
     ip, user_agent = get_client_info(request)
     
     try:
-        weather_data = await fetcher.fetch_weather(city_name)
+        result = await fetcher.fetch(city_name)
         
-        if not weather_data:
+        if not result.data:
+            await log_service.log_action(
+                action="FETCH",
+                entity="weather",
+                status="error",
+                error_message=result.error,
+                details={"city": city_name, "source": result.source},
+                ip_address=ip,
+                user_agent=user_agent,
+            )
             raise HTTPException(
                 status_code=502, 
-                detail=f"Failed to fetch weather data for {city_name}"
+                detail=f"Failed to fetch weather data for {city_name}: {result.error}"
             )
         
-        weather, is_new = await service.upsert_by_city(weather_data)
+        weather, is_new = await service.upsert_by_city(result.data)
+        response.headers["X-Data-Source"] = result.source
         
         await log_service.log_action(
             action="FETCH",
@@ -221,6 +546,7 @@ async def fetch_weather_for_city(
                 "city": weather.city,
                 "country": weather.country,
                 "is_new": is_new,
+                "source": result.source,
             },
             ip_address=ip,
             user_agent=user_agent,
@@ -1,15 +1,95 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
+from typing import List, Literal
 
 
 class Settings(BaseSettings):
     database_url: str = "postgresql+asyncpg://postgres:postgres@db:5432/weather_db"
+    # Comma-separated read replica URLs; GET endpoints read from them when set
+    database_replica_urls: str = ""
+    replica_retry_seconds: float = 10.0
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30.0
+    db_pool_recycle: int = 1800
+    db_prepared_statement_cache_size: int = 500
     weather_api_key: str = ""
     weather_api_url: str = "https://api.openweathermap.org/data/2.5/weather"
+    weather_api_group_url: str = "https://api.openweathermap.org/data/2.5/group"
+    weather_api_group_size: int = 20
     weather_update_interval_minutes: int = 30
     app_name: str = "Weather Service API"
     debug: bool = False
-    
+    bulk_upsert_chunk_size: int = 500
+    bulk_max_items: int = 50000
+    export_fetch_size: int = 1000
+    import_chunk_size: int = 5000
+    # POST /internal/imports only reads files under this directory
+    import_root: str = "data/imports"
+
+    # Read-through cache for single-row weather lookups
+    weather_cache_ttl_seconds: float = 300.0
+    weather_cache_max_entries: int = 10000
+
+    # Cross-worker cache invalidation over PostgreSQL LISTEN/NOTIFY
+    cache_invalidation_listen: bool = True
+    cache_invalidation_coalesce_ms: float = 50.0
+    cache_invalidation_reconnect_delay: float = 1.0
+
+    # Inverse-distance interpolation between cities
+    interpolation_k: int = 8
+    interpolation_power: float = 2.0
+    interpolation_max_points: int = 10000
+
+    # Map grid: rendered grids cached per area and data version
+    grid_cache_ttl_seconds: float = 600.0
+    grid_cache_max_entries: int = 2048
+    grid_max_cells: int = 65536
+
+    # Observation history: monthly partitions created ahead, months kept (0 = forever)
+    observation_partitions_ahead: int = 3
+    observation_retention_months: int = 12
+
+    # Rollups: observations younger than the settle window are left for the next
+    # refresh (it must exceed the longest write transaction); rows folded per batch
+    rollup_settle_seconds: float = 300.0
+    rollup_batch_size: int = 50000
+
+    # Default total mode for list endpoints: exact | estimate | none
+    weather_list_total_mode: Literal["exact", "estimate", "none"] = "exact"
+    logs_list_total_mode: Literal["exact", "estimate", "none"] = "exact"
+
+    # Shared HTTP client for upstream weather providers
+    http_max_connections: int = 100
+    http_max_keepalive_connections: int = 20
+    http_keepalive_expiry: float = 30.0
+    http2_enabled: bool = False
+    http_connect_timeout: float = 5.0
+    http_read_timeout: float = 10.0
+    http_write_timeout: float = 5.0
+    http_pool_timeout: float = 5.0
+
+    # Upstream fetch concurrency and rate limit (shared by scheduler and API)
+    fetch_max_in_flight: int = 10
+    fetch_rate_per_minute: float = 60.0
+    fetch_rate_burst: int = 10
+
+    # Provider response cache keyed by normalized city query
+    fetch_cache_ttl_seconds: float = 600.0
+    fetch_cache_max_entries: int = 10000
+
+    # Retries and circuit breaker for provider calls
+    fetch_retry_attempts: int = 3
+    fetch_retry_base_delay: float = 0.5
+    fetch_retry_max_delay: float = 10.0
+    circuit_failure_threshold: int = 5
+    circuit_reset_timeout: float = 30.0
+    circuit_half_open_max_calls: int = 1
+
+    @property
+    def replica_urls(self) -> List[str]:
+        return [url.strip() for url in self.database_replica_urls.split(",") if url.strip()]
+
     class Config:
         env_file = ".env"
         extra = "allow"
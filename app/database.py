@@ -1,14 +1,48 @@
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
+import itertools
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List, Optional
+from fastapi import Request
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
 from app.config import get_settings
+from app.pool_metrics import InstrumentedAsyncQueuePool, instrument_engine
+
+logger = logging.getLogger(__name__)
 
 settings = get_settings()
 
-engine = create_async_engine(
-    settings.database_url,
-    echo=settings.debug,
-    pool_pre_ping=True,
-)
+READ_YOUR_WRITES_HEADER = "X-Read-Your-Writes"
+
+# Session.info key telling readers where a get_read_db session reads from
+READ_SOURCE = "read_source"
+READ_REPLICA = "replica"
+READ_PRIMARY = "primary"
+READ_YOUR_WRITES = "read_your_writes"
+
+
+def create_engine(url: str) -> AsyncEngine:
+    options = {}
+    if not url.startswith("sqlite"):
+        options = dict(
+            poolclass=InstrumentedAsyncQueuePool,
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_timeout=settings.db_pool_timeout,
+            pool_recycle=settings.db_pool_recycle,
+        )
+    if url.startswith("postgresql+asyncpg"):
+        # Prepared statements are kept per connection, keyed by the SQL text
+        options["connect_args"] = {
+            "prepared_statement_cache_size": settings.db_prepared_statement_cache_size,
+        }
+    return create_async_engine(url, echo=settings.debug, pool_pre_ping=True, **options)
+
+
+engine = create_engine(settings.database_url)
+pool_metrics = {"primary": (engine, instrument_engine(engine))}
 
 async_session_maker = async_sessionmaker(
     engine,
@@ -21,6 +55,53 @@ class Base(DeclarativeBase):
     pass
 
 
+class ReplicaRouter:
+    """Round-robin over read replicas, skipping ones that recently failed a checkout."""
+    
+    def __init__(self, session_makers: List[async_sessionmaker], retry_after: float):
+        self.session_makers = session_makers
+        self.retry_after = retry_after
+        self.down_until = [0.0] * len(session_makers)
+        self._next = itertools.cycle(range(len(session_makers)))
+    
+    def candidates(self) -> List[int]:
+        """Healthy replica indexes in round-robin order, starting after the last one used."""
+        if not self.session_makers:
+            return []
+        now = time.monotonic()
+        start = next(self._next)
+        order = [(start + i) % len(self.session_makers) for i in range(len(self.session_makers))]
+        return [index for index in order if self.down_until[index] <= now]
+    
+    def mark_down(self, index: int) -> None:
+        self.down_until[index] = time.monotonic() + self.retry_after
+    
+    async def open_session(self) -> Optional[AsyncSession]:
+        """Session on the first replica that hands out a connection, or None to use the primary."""
+        for index in self.candidates():
+            session = self.session_makers[index]()
+            try:
+                # Checking out a connection runs the pool's pre-ping
+                await session.connection()
+                return session
+            except (DBAPIError, OSError) as e:
+                logger.warning(f"Read replica {index} unavailable, failing over: {e}")
+                self.mark_down(index)
+                await session.close()
+        return None
+
+
+replica_session_makers = []
+for index, url in enumerate(settings.replica_urls):
+    replica_engine = create_engine(url)
+    pool_metrics[f"replica_{index}"] = (replica_engine, instrument_engine(replica_engine))
+    replica_session_makers.append(
+        async_sessionmaker(replica_engine, class_=AsyncSession, expire_on_commit=False)
+    )
+
+replica_router = ReplicaRouter(replica_session_makers, retry_after=settings.replica_retry_seconds)
+
+
 async def get_db() -> AsyncSession:
     async with async_session_maker() as session:
         try:
@@ -33,6 +114,44 @@ async def get_db() -> AsyncSession:
             await session.close()
 
 
+async def get_read_db(request: Request) -> AsyncSession:
+    """Read-only session on a replica, or on the primary when none is healthy.
+    
+    Requests sending a truthy X-Read-Your-Writes header always read from
+    the primary so they see their own just-committed writes. The session's
+    ``info[READ_SOURCE]`` records which of the three cases applies, so
+    shared caches can tell possibly stale reads from fresh ones.
+    """
+    session = None
+    read_your_writes = request.headers.get(READ_YOUR_WRITES_HEADER, "").lower() in ("1", "true", "yes")
+    if not read_your_writes:
+        session = await replica_router.open_session()
+    if session is not None:
+        session.info[READ_SOURCE] = READ_REPLICA
+    else:
+        session = async_session_maker()
+        session.info[READ_SOURCE] = READ_YOUR_WRITES if read_your_writes else READ_PRIMARY
+    
+    try:
+        yield session
+    finally:
+        await session.close()
+
+
+@asynccontextmanager
+async def primary_session(db: AsyncSession) -> AsyncIterator[AsyncSession]:
+    """``db`` itself, or a short-lived primary session when ``db`` reads from a replica.
+    
+    For loads that are cached for the life of the process, where a lagging
+    replica would leave stale rows behind until they change again.
+    """
+    if db.info.get(READ_SOURCE) != READ_REPLICA:
+        yield db
+        return
+    async with async_session_maker() as session:
+        yield session
+
+
 async def init_db():
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
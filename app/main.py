@@ -5,8 +5,10 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import HTMLResponse
 from app.config import get_settings
 from app.database import init_db
-from app.api import weather_router, logs_router
+from app.api import weather_router, logs_router, internal_router
 from app.tasks import start_scheduler, stop_scheduler
+from app.services.http_client import init_http_client, close_http_client
+from app.services.invalidation_bus import start_invalidation_listener, stop_invalidation_listener
 
 logging.basicConfig(
     level=logging.INFO,
@@ -21,6 +23,9 @@ async def lifespan(app: FastAPI):
     await init_db()
     logger.info("Database initialized")
     
+    await init_http_client()
+    await start_invalidation_listener()
+    
     start_scheduler()
     logger.info("Scheduler started")
     
@@ -28,6 +33,9 @@ async def lifespan(app: FastAPI):
     
     stop_scheduler()
     logger.info("Scheduler stopped")
+    
+    await stop_invalidation_listener()
+    await close_http_client()
     logger.info("Weather Service stopped")
 
 
@@ -50,6 +58,7 @@ app.add_middleware(
 
 app.include_router(weather_router, prefix="/api/v1")
 app.include_router(logs_router, prefix="/api/v1")
+app.include_router(internal_router)
 
 
 @app.get("/", response_class=HTMLResponse)
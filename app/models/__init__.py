@@ -1,5 +1,15 @@
 from app.models.weather import Weather
 from app.models.log import ActionLog
+from app.models.observation import WeatherObservation
+from app.models.rollup import WeatherHourlyRollup, WeatherDailyRollup, RollupWatermark
+from app.models.import_checkpoint import ImportCheckpoint
 
-__all__ = ["Weather", "ActionLog"]
-
+__all__ = [
+    "Weather",
+    "ActionLog",
+    "WeatherObservation",
+    "WeatherHourlyRollup",
+    "WeatherDailyRollup",
+    "RollupWatermark",
+    "ImportCheckpoint",
+]
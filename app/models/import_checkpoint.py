@@ -0,0 +1,20 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, DateTime
+from app.database import Base
+
+
+class ImportCheckpoint(Base):
+    """Progress of a file import, committed together with each loaded chunk."""
+    
+    __tablename__ = "import_checkpoints"
+    
+    name = Column(String(200), primary_key=True)
+    source = Column(String(500), nullable=False)
+    format = Column(String(10), nullable=False)
+    status = Column(String(20), nullable=False)
+    records_done = Column(Integer, default=0, nullable=False)
+    rows_imported = Column(Integer, default=0, nullable=False)
+    rows_rejected = Column(Integer, default=0, nullable=False)
+    error_message = Column(String(500), nullable=True)
+    started_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, DateTime, Text
+from sqlalchemy import Column, Integer, String, DateTime, Text, Index
 from app.database import Base
 
 
@@ -15,7 +15,11 @@ class ActionLog(Base):
     error_message = Column(Text, nullable=True)
     ip_address = Column(String(45), nullable=True)
     user_agent = Column(String(500), nullable=True)
-    created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    
+    __table_args__ = (
+        Index("ix_action_logs_created_at_id", "created_at", "id"),
+    )
     
     def __repr__(self):
         return f"<ActionLog(action={self.action}, entity={self.entity}, status={self.status})>"
@@ -0,0 +1,38 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Float, DateTime, Index
+from app.database import Base
+
+
+class WeatherObservation(Base):
+    """Append-only history of weather readings, range-partitioned by month on PostgreSQL."""
+    
+    __tablename__ = "weather_observations"
+    
+    city_key = Column(String(100), primary_key=True)
+    country_key = Column(String(100), primary_key=True)
+    data_timestamp = Column(DateTime, primary_key=True)
+    city = Column(String(100), nullable=False)
+    country = Column(String(100), nullable=False)
+    provider_id = Column(Integer, nullable=True)
+    latitude = Column(Float, nullable=True)
+    longitude = Column(Float, nullable=True)
+    temperature = Column(Float, nullable=False)
+    feels_like = Column(Float, nullable=True)
+    humidity = Column(Float, nullable=False)
+    pressure = Column(Float, nullable=False)
+    wind_speed = Column(Float, nullable=True)
+    wind_direction = Column(Integer, nullable=True)
+    cloudiness = Column(Integer, nullable=True)
+    weather_description = Column(String(200), nullable=True)
+    weather_main = Column(String(50), nullable=True)
+    visibility = Column(Integer, nullable=True)
+    source = Column(String(20), nullable=True)
+    ingested_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    
+    __table_args__ = (
+        Index("ix_weather_observations_ingested_at", "ingested_at"),
+        {"postgresql_partition_by": "RANGE (data_timestamp)"},
+    )
+    
+    def __repr__(self):
+        return f"<WeatherObservation(city={self.city}, at={self.data_timestamp}, temp={self.temperature}°C)>"
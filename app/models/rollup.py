@@ -0,0 +1,42 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Float, DateTime
+from app.database import Base
+
+
+class RollupColumns:
+    """Per-city aggregates of weather observations over one time bucket."""
+    
+    city_key = Column(String(100), primary_key=True)
+    country_key = Column(String(100), primary_key=True)
+    bucket_start = Column(DateTime, primary_key=True)
+    city = Column(String(100), nullable=False)
+    country = Column(String(100), nullable=False)
+    samples = Column(Integer, nullable=False)
+    temperature_min = Column(Float, nullable=False)
+    temperature_max = Column(Float, nullable=False)
+    temperature_avg = Column(Float, nullable=False)
+    humidity_min = Column(Float, nullable=False)
+    humidity_max = Column(Float, nullable=False)
+    humidity_avg = Column(Float, nullable=False)
+    pressure_min = Column(Float, nullable=False)
+    pressure_max = Column(Float, nullable=False)
+    pressure_avg = Column(Float, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class WeatherHourlyRollup(RollupColumns, Base):
+    __tablename__ = "weather_rollups_hourly"
+
+
+class WeatherDailyRollup(RollupColumns, Base):
+    __tablename__ = "weather_rollups_daily"
+
+
+class RollupWatermark(Base):
+    """Latest observation ``ingested_at`` already folded into the rollups."""
+    
+    __tablename__ = "rollup_watermarks"
+    
+    name = Column(String(50), primary_key=True)
+    ingested_at = Column(DateTime, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
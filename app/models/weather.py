@@ -1,14 +1,23 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Float, DateTime, Index
+from sqlalchemy import Column, Integer, String, Float, DateTime, Index, UniqueConstraint
+from sqlalchemy.orm import validates
 from app.database import Base
 
 
+def normalize_key(value: str) -> str:
+    """Lookup key for a city or country name: casefolded, with runs of whitespace collapsed."""
+    return " ".join(value.split()).casefold()
+
+
 class Weather(Base):
     __tablename__ = "weather"
     
     id = Column(Integer, primary_key=True, index=True)
     city = Column(String(100), nullable=False, index=True)
     country = Column(String(100), nullable=False)
+    city_key = Column(String(100), nullable=False)
+    country_key = Column(String(100), nullable=False)
+    provider_id = Column(Integer, nullable=True, index=True)
     latitude = Column(Float, nullable=True)
     longitude = Column(Float, nullable=True)
     temperature = Column(Float, nullable=False)
@@ -26,9 +35,16 @@ class Weather(Base):
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     
     __table_args__ = (
-        Index("ix_weather_city_country", "city", "country"),
-        Index("ix_weather_data_timestamp", "data_timestamp"),
+        Index("ix_weather_city_key_country_key_ts", "city_key", "country_key", data_timestamp.desc()),
+        Index("ix_weather_data_timestamp_id", "data_timestamp", "id"),
+        UniqueConstraint("city_key", "country_key", name="uq_weather_city_key_country_key"),
     )
     
+    @validates("city", "country")
+    def _set_lookup_key(self, field, value):
+        if value is not None:
+            setattr(self, f"{field}_key", normalize_key(value))
+        return value
+    
     def __repr__(self):
         return f"<Weather(city={self.city}, temp={self.temperature}°C, humidity={self.humidity}%)>"
@@ -0,0 +1,135 @@
+import bisect
+import time
+from typing import Any, Dict, Optional, Sequence
+from sqlalchemy import event, exc
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from app.config import get_settings
+
+# Upper bounds of the histogram buckets; the last bucket is open-ended
+CHECKOUT_WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LIFETIME_BUCKETS = (1.0, 10.0, 60.0, 300.0, 900.0, 1800.0, 3600.0, 7200.0)
+
+
+class Histogram:
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+    
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+    
+    def stats(self) -> Dict[str, Any]:
+        labels = [f"le_{bound:g}" for bound in self.bounds] + ["inf"]
+        return {
+            "count": self.count,
+            "avg": round(self.sum / self.count, 6) if self.count else 0.0,
+            "max": round(self.max, 6),
+            "buckets": dict(zip(labels, self.counts)),
+        }
+
+
+class PoolMetrics:
+    def __init__(self):
+        self.checkout_wait = Histogram(CHECKOUT_WAIT_BUCKETS)
+        self.connection_lifetime = Histogram(LIFETIME_BUCKETS)
+        self.checkouts = 0
+        self.checkins = 0
+        self.connects = 0
+        self.closes = 0
+        self.invalidations = 0
+        self.timeouts = 0
+
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """Async queue pool that times how long each checkout waits for a connection.
+    
+    Pool events fire only once a connection is handed out, so the wait
+    itself is measured around ``connect``. It covers queueing, opening a
+    new connection and the pre-ping.
+    """
+    
+    metrics: Optional[PoolMetrics] = None
+    
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            if self.metrics is not None:
+                self.metrics.timeouts += 1
+            raise
+        finally:
+            if self.metrics is not None:
+                self.metrics.checkout_wait.observe(time.perf_counter() - start)
+    
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+def instrument_engine(engine: AsyncEngine) -> PoolMetrics:
+    """Attach metrics and pool event listeners to an engine's pool."""
+    metrics = PoolMetrics()
+    sync_engine = engine.sync_engine
+    if isinstance(sync_engine.pool, InstrumentedAsyncQueuePool):
+        sync_engine.pool.metrics = metrics
+    
+    @event.listens_for(sync_engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        metrics.connects += 1
+        connection_record.info["connected_at"] = time.monotonic()
+    
+    @event.listens_for(sync_engine, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        metrics.checkouts += 1
+    
+    @event.listens_for(sync_engine, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        metrics.checkins += 1
+    
+    @event.listens_for(sync_engine, "invalidate")
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        metrics.invalidations += 1
+    
+    def on_close(dbapi_connection, connection_record):
+        metrics.closes += 1
+        connected_at = connection_record.info.pop("connected_at", None)
+        if connected_at is not None:
+            metrics.connection_lifetime.observe(time.monotonic() - connected_at)
+    
+    event.listen(sync_engine, "close", on_close)
+    
+    return metrics
+
+
+def pool_stats(engine: AsyncEngine, metrics: PoolMetrics) -> Dict[str, Any]:
+    pool = engine.sync_engine.pool
+    stats: Dict[str, Any] = {"pool": pool.__class__.__name__}
+    if hasattr(pool, "checkedout"):
+        stats.update({
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": max(0, pool.overflow()),
+            "max_overflow": get_settings().db_max_overflow,
+            "timeout": pool.timeout(),
+        })
+    stats.update({
+        "checkouts": metrics.checkouts,
+        "checkins": metrics.checkins,
+        "connects": metrics.connects,
+        "closes": metrics.closes,
+        "invalidations": metrics.invalidations,
+        "timeouts": metrics.timeouts,
+        "checkout_wait_seconds": metrics.checkout_wait.stats(),
+        "connection_lifetime_seconds": metrics.connection_lifetime.stats(),
+    })
+    return stats
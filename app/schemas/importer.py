@@ -0,0 +1,10 @@
+from typing import Literal, Optional
+from pydantic import BaseModel, Field
+
+
+class ImportRequest(BaseModel):
+    source: str = Field(..., min_length=1, description="Path to the file on the server")
+    format: Optional[Literal["csv", "ndjson"]] = None
+    name: Optional[str] = Field(None, min_length=1, max_length=200)
+    chunk_size: Optional[int] = Field(None, ge=1)
+    restart: bool = False
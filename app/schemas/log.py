@@ -20,10 +20,13 @@ class ActionLogResponse(BaseModel):
 
 class ActionLogListResponse(BaseModel):
     items: List[ActionLogResponse]
-    total: int
+    total: Optional[int]
     page: int
     size: int
-    pages: int
+    pages: Optional[int]
+    has_more: Optional[bool] = None
+    total_mode: str = "exact"
+    next_cursor: Optional[str] = None
 
 
 class ActionLogFilter(BaseModel):
@@ -12,6 +12,7 @@ class WeatherBase(BaseModel):
 
 
 class WeatherCreate(WeatherBase):
+    provider_id: Optional[int] = None
     latitude: Optional[float] = Field(None, ge=-90, le=90)
     longitude: Optional[float] = Field(None, ge=-180, le=180)
     feels_like: Optional[float] = None
@@ -27,6 +28,7 @@ class WeatherCreate(WeatherBase):
 class WeatherUpdate(BaseModel):
     city: Optional[str] = Field(None, min_length=1, max_length=100)
     country: Optional[str] = Field(None, min_length=1, max_length=100)
+    provider_id: Optional[int] = None
     latitude: Optional[float] = Field(None, ge=-90, le=90)
     longitude: Optional[float] = Field(None, ge=-180, le=180)
     temperature: Optional[float] = None
@@ -46,6 +48,7 @@ class WeatherResponse(WeatherBase):
     model_config = ConfigDict(from_attributes=True)
     
     id: int
+    provider_id: Optional[int] = None
     latitude: Optional[float] = None
     longitude: Optional[float] = None
     feels_like: Optional[float] = None
@@ -60,12 +63,128 @@ class WeatherResponse(WeatherBase):
     updated_at: datetime
 
 
+class WeatherSnapshot(WeatherResponse):
+    """Immutable copy of a weather row that outlives its session."""
+    
+    model_config = ConfigDict(from_attributes=True, frozen=True)
+
+
 class WeatherListResponse(BaseModel):
     items: List[WeatherResponse]
-    total: int
+    total: Optional[int]
     page: int
     size: int
-    pages: int
+    pages: Optional[int]
+    has_more: Optional[bool] = None
+    total_mode: str = "exact"
+    next_cursor: Optional[str] = None
+
+
+class WeatherNearbyItem(WeatherResponse):
+    distance_km: float
+
+
+class WeatherNearbyResponse(BaseModel):
+    latitude: float
+    longitude: float
+    radius_km: Optional[float] = None
+    items: List[WeatherNearbyItem]
+
+
+class WeatherTopResponse(BaseModel):
+    field: str
+    order: str
+    version: int
+    items: List[WeatherResponse]
+
+
+class InterpolationPoint(BaseModel):
+    lat: float = Field(..., ge=-90, le=90)
+    lon: float = Field(..., ge=-180, le=180)
+
+
+class WeatherInterpolationRequest(BaseModel):
+    points: List[InterpolationPoint] = Field(..., min_length=1)
+    k: Optional[int] = Field(None, ge=1, le=100)
+    power: Optional[float] = Field(None, gt=0, le=10)
+
+
+class WeatherEstimate(BaseModel):
+    latitude: float
+    longitude: float
+    temperature: Optional[float] = None
+    humidity: Optional[float] = None
+    pressure: Optional[float] = None
+    wind_speed: Optional[float] = None
+    nearest_km: float
+
+
+class WeatherInterpolationResponse(BaseModel):
+    k: int
+    power: float
+    items: List[WeatherEstimate]
+
+
+class WeatherGridCell(BaseModel):
+    row: int
+    col: int
+    bounds: List[float]
+    count: int
+    temperature: Optional[float] = None
+    humidity: Optional[float] = None
+    cloudiness: Optional[float] = None
+
+
+class WeatherGridResponse(BaseModel):
+    version: int
+    bbox: List[float]
+    cell_deg: Optional[float] = None
+    tile: Optional[str] = None
+    rows: int
+    cols: int
+    cells: List[WeatherGridCell]
+
+
+class WeatherStatsBucket(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    
+    bucket_start: datetime
+    country: str
+    samples: int
+    temperature_min: float
+    temperature_max: float
+    temperature_avg: float
+    humidity_min: float
+    humidity_max: float
+    humidity_avg: float
+    pressure_min: float
+    pressure_max: float
+    pressure_avg: float
+
+
+class WeatherStatsResponse(BaseModel):
+    city: str
+    country: Optional[str] = None
+    bucket: str
+    start: datetime
+    end: datetime
+    items: List[WeatherStatsBucket]
+
+
+class WeatherBulkItemResult(BaseModel):
+    index: int
+    status: str
+    id: Optional[int] = None
+    errors: Optional[List[str]] = None
+
+
+class WeatherBulkResponse(BaseModel):
+    total: int
+    created: int
+    updated: int
+    conflicts: int
+    invalid: int
+    items: List[WeatherBulkItemResult]
 
 
 class CityWeatherRequest(BaseModel):
@@ -0,0 +1,202 @@
+import re
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from pydantic import ValidationError
+from app.schemas.weather import WeatherBulkItemResult, WeatherCreate
+from app.models.weather import normalize_key
+
+ON_CONFLICT_ERROR = "error"
+ON_CONFLICT_UPDATE = "update"
+
+_STRUCTURAL = re.compile(rb'[\[\]{}",]')
+_STRING_SPECIAL = re.compile(rb'["\\]')
+_WHITESPACE = b" \t\r\n"
+
+
+class BulkPayloadError(ValueError):
+    """The body is not a JSON array or NDJSON stream of items."""
+
+
+class BulkLimitError(ValueError):
+    """The body holds more items than allowed in one request."""
+
+
+class JsonItemSplitter:
+    """Incrementally splits a JSON array or an NDJSON stream into raw items.
+    
+    Only the current partial item is buffered, so a large body never has
+    to be held in memory as a whole. The format is picked from the first
+    non-blank byte: ``[`` starts an array, anything else is NDJSON.
+    """
+    
+    def __init__(self):
+        self.buffer = bytearray()
+        self.mode: Optional[str] = None
+        self.pos = 0
+        self.start: Optional[int] = None
+        self.depth = 0
+        self.in_string = False
+        self.closed_array = False
+    
+    def feed(self, data: bytes) -> List[bytes]:
+        self.buffer += data
+        if self.mode is None:
+            stripped = self.buffer.lstrip(_WHITESPACE)
+            if not stripped:
+                return []
+            if stripped[:1] == b"[":
+                self.mode = "array"
+                self.buffer = bytearray(stripped[1:])
+            else:
+                self.mode = "ndjson"
+        
+        if self.mode == "ndjson":
+            return self._split_lines(final=False)
+        return self._scan_array()
+    
+    def close(self) -> List[bytes]:
+        if self.mode == "ndjson":
+            return self._split_lines(final=True)
+        if self.mode == "array" and not self.closed_array:
+            raise BulkPayloadError("Unterminated JSON array")
+        return []
+    
+    def _split_lines(self, final: bool) -> List[bytes]:
+        lines = self.buffer.split(b"\n")
+        self.buffer = bytearray() if final else bytearray(lines.pop())
+        return [bytes(line) for line in lines if line.strip()]
+    
+    def _scan_array(self) -> List[bytes]:
+        items = []
+        buf = self.buffer
+        while self.pos < len(buf):
+            if self.closed_array:
+                if buf[self.pos:].strip(_WHITESPACE):
+                    raise BulkPayloadError("Unexpected data after the JSON array")
+                self.pos = len(buf)
+                break
+            
+            if self.start is None:
+                byte = buf[self.pos]
+                if byte in _WHITESPACE or byte == ord(","):
+                    self.pos += 1
+                    continue
+                if byte == ord("]"):
+                    self.closed_array = True
+                    self.pos += 1
+                    continue
+                self.start = self.pos
+            
+            if self.in_string:
+                match = _STRING_SPECIAL.search(buf, self.pos)
+                if match is None:
+                    self.pos = len(buf)
+                    break
+                if match.group() == b"\\":
+                    if match.end() >= len(buf):
+                        self.pos = match.start()
+                        break
+                    self.pos = match.end() + 1
+                    continue
+                self.in_string = False
+                self.pos = match.end()
+                continue
+            
+            match = _STRUCTURAL.search(buf, self.pos)
+            if match is None:
+                self.pos = len(buf)
+                break
+            char = match.group()
+            self.pos = match.end()
+            if char == b'"':
+                self.in_string = True
+            elif char in (b"{", b"["):
+                self.depth += 1
+            elif char in (b"}", b"]"):
+                if self.depth == 0:
+                    # A bare value ends at the array's closing bracket
+                    items.append(bytes(buf[self.start:match.start()]).strip())
+                    self.start = None
+                    self.closed_array = True
+                    continue
+                self.depth -= 1
+                if self.depth == 0:
+                    items.append(bytes(buf[self.start:self.pos]))
+                    self.start = None
+            elif char == b"," and self.depth == 0:
+                items.append(bytes(buf[self.start:match.start()]).strip())
+                self.start = None
+        
+        # Drop everything before the item in progress
+        keep_from = self.start if self.start is not None else self.pos
+        del buf[:keep_from]
+        self.pos -= keep_from
+        if self.start is not None:
+            self.start = 0
+        return items
+
+
+async def iter_json_items(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    splitter = JsonItemSplitter()
+    async for chunk in chunks:
+        for item in splitter.feed(chunk):
+            yield item
+    for item in splitter.close():
+        yield item
+
+
+async def ingest_weather(
+    service,
+    chunks: AsyncIterator[bytes],
+    on_conflict: str = ON_CONFLICT_ERROR,
+    max_items: int = 50000,
+    chunk_size: int = 500,
+) -> List[WeatherBulkItemResult]:
+    """Validate streamed items one by one and write valid ones in multi-row chunks.
+    
+    Invalid items are reported and skipped. With ``on_conflict="error"``
+    items whose city already exists are reported as conflicts; with
+    ``"update"`` they overwrite the stored row like ``bulk_upsert``.
+    """
+    results: List[WeatherBulkItemResult] = []
+    pending: List[Tuple[int, WeatherCreate]] = []
+    
+    async def flush():
+        if not pending:
+            return
+        items = [item for _, item in pending]
+        if on_conflict == ON_CONFLICT_UPDATE:
+            saved: Dict[Tuple[str, str], Tuple[int, str]] = {
+                (weather.city_key, weather.country_key): (weather.id, "created" if is_new else "updated")
+                for weather, is_new in await service.bulk_upsert(items)
+            }
+            for index, item in pending:
+                weather_id, status = saved[(normalize_key(item.city), normalize_key(item.country))]
+                results[index] = WeatherBulkItemResult(index=index, status=status, id=weather_id)
+        else:
+            for (index, _), weather in zip(pending, await service.bulk_create(items)):
+                if weather is None:
+                    results[index] = WeatherBulkItemResult(
+                        index=index, status="conflict", errors=["Weather for this city already exists"],
+                    )
+                else:
+                    results[index] = WeatherBulkItemResult(index=index, status="created", id=weather.id)
+        pending.clear()
+    
+    async for raw in iter_json_items(chunks):
+        index = len(results)
+        if index >= max_items:
+            raise BulkLimitError(f"Too many items, the limit is {max_items}")
+        try:
+            item = WeatherCreate.model_validate_json(raw)
+        except ValidationError as e:
+            errors = [f"{'.'.join(str(loc) for loc in error['loc']) or 'item'}: {error['msg']}" for error in e.errors()]
+            results.append(WeatherBulkItemResult(index=index, status="invalid", errors=errors))
+            continue
+        
+        results.append(WeatherBulkItemResult(index=index, status="pending"))
+        pending.append((index, item))
+        if len(pending) >= chunk_size:
+            await flush()
+    
+    await flush()
+    return results
@@ -0,0 +1,329 @@
+import asyncio
+from types import SimpleNamespace
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+import numpy as np
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.database import primary_session
+from app.models.weather import Weather
+
+# Session.info key mapping each snapshot to the rows written in the open transaction:
+# weather id -> copied row, None for a deleted row, or REREAD
+PENDING_ROWS = "columnar_snapshot_rows"
+REREAD = object()
+
+FLOAT_COLUMNS = ("latitude", "longitude", "temperature", "feels_like", "humidity", "pressure", "wind_speed")
+# Nullable integers are kept as float64 so a missing value can be NaN
+INT_COLUMNS = ("provider_id", "wind_direction", "cloudiness", "visibility")
+NUMERIC_COLUMNS = FLOAT_COLUMNS + INT_COLUMNS
+TIME_COLUMNS = ("data_timestamp", "created_at", "updated_at")
+STRING_COLUMNS = ("city", "country", "city_key", "country_key", "weather_description", "weather_main")
+ORDERABLE_COLUMNS = ("id",) + NUMERIC_COLUMNS + TIME_COLUMNS
+ROW_COLUMNS = ("id",) + NUMERIC_COLUMNS + TIME_COLUMNS + STRING_COLUMNS
+
+# A range filter: inclusive (low, high), either end may be None
+Range = Tuple[Optional[float], Optional[float]]
+
+
+class StringTable:
+    """Interned strings; a column stores codes into the table, -1 for None."""
+    
+    def __init__(self):
+        self.values: List[str] = []
+        self._codes: Dict[str, int] = {}
+    
+    def encode(self, value: Optional[str]) -> int:
+        if value is None:
+            return -1
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+    
+    def lookup(self, value: str) -> Optional[int]:
+        return self._codes.get(value)
+    
+    def decode(self, code: int) -> Optional[str]:
+        return self.values[code] if code >= 0 else None
+
+
+class ColumnarSnapshot:
+    """Process-local copy of the ``weather`` table, one array per column.
+    
+    Rows live in the first ``len(self)`` slots of every array; removing a
+    row moves the last row into its slot. Writes through ``WeatherService``
+    are applied in place once their transaction commits, so no reader sees
+    uncommitted values; rows changed elsewhere (the importer, another
+    worker) are marked dirty and re-read by id on the next ``refresh``. While ``trusted`` is false, changes elsewhere may go
+    unreported, so every refresh reloads all rows. ``version`` grows with
+    every change, so derived data can be cached per version.
+    """
+    
+    def __init__(self, capacity: int = 256):
+        self._allocate(capacity)
+        self._slots: Dict[int, int] = {}
+        self._dirty: Set[int] = set()
+        self._lock: Optional[asyncio.Lock] = None
+        # Ids committed while a refresh is reading; its rows for them may be older
+        self._committed_during_refresh: Optional[Set[int]] = None
+        self.loaded = False
+        self.trusted = True
+        self.version = 0
+        
+        self.full_loads = 0
+        self.partial_loads = 0
+    
+    def _allocate(self, capacity: int) -> None:
+        self.ids = np.zeros(capacity, dtype=np.int64)
+        self.numeric = {name: np.full(capacity, np.nan) for name in NUMERIC_COLUMNS}
+        self.times = {name: np.full(capacity, np.datetime64("NaT"), dtype="datetime64[us]") for name in TIME_COLUMNS}
+        self.codes = {name: np.full(capacity, -1, dtype=np.int32) for name in STRING_COLUMNS}
+        self.strings = {name: StringTable() for name in STRING_COLUMNS}
+    
+    def _grow(self) -> None:
+        capacity = len(self.ids) * 2
+        self.ids = np.resize(self.ids, capacity)
+        self.numeric = {name: np.resize(values, capacity) for name, values in self.numeric.items()}
+        self.times = {name: np.resize(values, capacity) for name, values in self.times.items()}
+        self.codes = {name: np.resize(values, capacity) for name, values in self.codes.items()}
+    
+    def __len__(self) -> int:
+        return len(self._slots)
+    
+    def column(self, name: str) -> np.ndarray:
+        """Live values of a column: floats, datetime64, or string codes."""
+        size = len(self._slots)
+        if name == "id":
+            return self.ids[:size]
+        if name in self.numeric:
+            return self.numeric[name][:size]
+        if name in self.times:
+            return self.times[name][:size]
+        return self.codes[name][:size]
+    
+    def upsert(self, row: Any) -> None:
+        """Store a Weather row (or any object with its column attributes)."""
+        slot = self._slots.get(row.id)
+        if slot is None:
+            slot = len(self._slots)
+            if slot == len(self.ids):
+                self._grow()
+            self._slots[row.id] = slot
+            self.ids[slot] = row.id
+        
+        for name, values in self.numeric.items():
+            value = getattr(row, name)
+            values[slot] = np.nan if value is None else value
+        for name, values in self.times.items():
+            value = getattr(row, name)
+            values[slot] = np.datetime64("NaT") if value is None else np.datetime64(value, "us")
+        for name, codes in self.codes.items():
+            codes[slot] = self.strings[name].encode(getattr(row, name))
+        self.version += 1
+    
+    def remove(self, weather_id: int) -> None:
+        slot = self._slots.pop(weather_id, None)
+        if slot is None:
+            return
+        last = len(self._slots)
+        if slot != last:
+            moved = int(self.ids[last])
+            self._slots[moved] = slot
+            self.ids[slot] = moved
+            for columns in (self.numeric, self.times, self.codes):
+                for values in columns.values():
+                    values[slot] = values[last]
+        self.version += 1
+    
+    def load(self, rows: Sequence[Any]) -> None:
+        """Replace the contents with ``rows``, filling each column in one pass."""
+        size = len(rows)
+        self._allocate(max(256, size * 2))
+        self._slots = {row.id: slot for slot, row in enumerate(rows)}
+        self.ids[:size] = [row.id for row in rows]
+        for name, values in self.numeric.items():
+            values[:size] = np.array([getattr(row, name) for row in rows], dtype=np.float64)
+        for name, values in self.times.items():
+            values[:size] = np.array([getattr(row, name) for row in rows], dtype="datetime64[us]")
+        for name, codes in self.codes.items():
+            encode = self.strings[name].encode
+            codes[:size] = [encode(getattr(row, name)) for row in rows]
+        self.loaded = True
+        self.version += 1
+    
+    def _pending(self, session: Session) -> Dict[int, Any]:
+        return session.info.setdefault(PENDING_ROWS, {}).setdefault(self, {})
+    
+    def apply(self, session: Session, rows: Iterable[Any]) -> None:
+        """Store rows written in ``session`` once its transaction commits.
+        
+        The values are copied now; the ORM objects may be expired by then.
+        """
+        pending = self._pending(session)
+        for row in rows:
+            pending[row.id] = SimpleNamespace(**{name: getattr(row, name) for name in ROW_COLUMNS})
+    
+    def apply_delete(self, session: Session, weather_ids: Iterable[int]) -> None:
+        pending = self._pending(session)
+        for weather_id in weather_ids:
+            pending[weather_id] = None
+    
+    def mark_dirty_on_commit(self, session: Session, weather_ids: Iterable[int]) -> None:
+        """Re-read rows written in ``session`` by id once its transaction commits."""
+        pending = self._pending(session)
+        for weather_id in weather_ids:
+            pending[weather_id] = REREAD
+    
+    def apply_committed(self, rows: Dict[int, Any]) -> None:
+        for weather_id, row in rows.items():
+            if row is REREAD:
+                self._dirty.add(weather_id)
+            elif row is None:
+                self.remove(weather_id)
+            else:
+                self.upsert(row)
+        if self._committed_during_refresh is not None:
+            self._committed_during_refresh.update(rows)
+    
+    def mark_dirty(self, weather_ids: Iterable[int]) -> None:
+        self._dirty.update(weather_ids)
+    
+    def clear(self) -> None:
+        """Forget everything; the next refresh reloads all rows."""
+        self._slots.clear()
+        self._dirty.clear()
+        self.loaded = False
+        self.version += 1
+    
+    async def refresh(self, db: AsyncSession) -> "ColumnarSnapshot":
+        """Load the snapshot on first use and re-read dirty rows, from the primary
+        when ``db`` is a replica session (see ``primary_session``)."""
+        if self.loaded and not self._dirty and self.trusted:
+            return self
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        
+        async with self._lock, primary_session(db) as db:
+            self._committed_during_refresh = set()
+            try:
+                if not self.loaded or not self.trusted:
+                    self._dirty = set()
+                    result = await db.execute(select(*Weather.__table__.columns))
+                    self.load(result.all())
+                    self.full_loads += 1
+                elif self._dirty:
+                    ids, self._dirty = self._dirty, set()
+                    result = await db.execute(select(*Weather.__table__.columns).where(Weather.id.in_(ids)))
+                    found = {row.id: row for row in result.all()}
+                    for weather_id in ids:
+                        if weather_id in found:
+                            self.upsert(found[weather_id])
+                        else:
+                            self.remove(weather_id)
+                    self.partial_loads += 1
+            finally:
+                self._dirty |= self._committed_during_refresh
+                self._committed_during_refresh = None
+        return self
+    
+    def select(
+        self,
+        country_key: Optional[str] = None,
+        weather_main: Optional[str] = None,
+        ranges: Optional[Dict[str, Range]] = None,
+        order_by: Optional[str] = None,
+        descending: bool = False,
+        limit: Optional[int] = None,
+    ) -> np.ndarray:
+        """Slots of the rows matching every filter, ordered and cut to ``limit``.
+        
+        Rows missing a filtered or ordered value are left out. Ties are
+        broken by id; with ``limit`` only the top rows are fully sorted.
+        """
+        size = len(self._slots)
+        mask = np.ones(size, dtype=bool)
+        for name, value in (("country_key", country_key), ("weather_main", weather_main)):
+            if value is not None:
+                code = self.strings[name].lookup(value)
+                if code is None:
+                    return np.empty(0, dtype=np.int64)
+                mask &= self.column(name) == code
+        for name, (low, high) in (ranges or {}).items():
+            values = self.column(name)
+            if low is not None:
+                mask &= values >= low
+            if high is not None:
+                mask &= values <= high
+        
+        if order_by is None:
+            slots = np.flatnonzero(mask)
+            return slots[:limit] if limit is not None else slots
+        
+        values = self.column(order_by)
+        if values.dtype.kind == "M":
+            mask &= ~np.isnat(values)
+            values = values.view(np.int64)
+        elif values.dtype.kind == "f":
+            mask &= ~np.isnan(values)
+        slots = np.flatnonzero(mask)
+        keys = values[slots].astype(np.float64)
+        if descending:
+            keys = -keys
+        
+        if limit is not None and limit < len(slots):
+            # Keep every row tied with the limit-th key so the id tie-break stays exact
+            cutoff = np.partition(keys, limit - 1)[limit - 1]
+            keep = keys <= cutoff
+            slots, keys = slots[keep], keys[keep]
+        order = np.lexsort((self.ids[slots], keys))
+        return slots[order][:limit]
+    
+    def records(self, slots: Iterable[int]) -> List[Dict[str, Any]]:
+        """Rows at ``slots`` as dicts of Python values, in the given order."""
+        slots = np.asarray(slots, dtype=np.int64)
+        columns: Dict[str, List[Any]] = {"id": self.ids[slots].tolist()}
+        for name in FLOAT_COLUMNS:
+            columns[name] = [None if value != value else value for value in self.numeric[name][slots].tolist()]
+        for name in INT_COLUMNS:
+            columns[name] = [None if value != value else int(value) for value in self.numeric[name][slots].tolist()]
+        for name in TIME_COLUMNS:
+            columns[name] = self.times[name][slots].tolist()
+        for name in STRING_COLUMNS:
+            values = self.strings[name].values
+            columns[name] = [values[code] if code >= 0 else None for code in self.codes[name][slots].tolist()]
+        return [dict(zip(columns, values)) for values in zip(*columns.values())]
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rows": len(self._slots),
+            "loaded": self.loaded,
+            "trusted": self.trusted,
+            "version": self.version,
+            "dirty": len(self._dirty),
+            "full_loads": self.full_loads,
+            "partial_loads": self.partial_loads,
+        }
+
+
+_snapshot: Optional[ColumnarSnapshot] = None
+
+
+def get_columnar_snapshot() -> ColumnarSnapshot:
+    global _snapshot
+    if _snapshot is None:
+        _snapshot = ColumnarSnapshot()
+    return _snapshot
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_after_commit(session: Session) -> None:
+    pending = session.info.pop(PENDING_ROWS, None)
+    for snapshot, rows in (pending or {}).items():
+        snapshot.apply_committed(rows)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session: Session) -> None:
+    session.info.pop(PENDING_ROWS, None)
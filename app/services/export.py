@@ -0,0 +1,46 @@
+import csv
+import io
+from typing import Any, AsyncIterator, Dict, Type
+from pydantic import BaseModel
+
+EXPORT_NDJSON = "ndjson"
+EXPORT_CSV = "csv"
+MEDIA_TYPES = {EXPORT_NDJSON: "application/x-ndjson", EXPORT_CSV: "text/csv"}
+
+
+async def render_export(
+    rows: AsyncIterator[Any],
+    schema: Type[BaseModel],
+    fmt: str,
+    batch_size: int,
+) -> AsyncIterator[str]:
+    """Serialize streamed ORM rows as NDJSON or CSV, one output chunk per batch."""
+    columns = list(schema.model_fields)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if fmt == EXPORT_CSV else None
+    if writer:
+        writer.writerow(columns)
+    
+    pending = 0
+    async for row in rows:
+        item = schema.model_validate(row)
+        if writer:
+            data = item.model_dump(mode="json")
+            writer.writerow(["" if data[column] is None else data[column] for column in columns])
+        else:
+            buffer.write(item.model_dump_json())
+            buffer.write("\n")
+        
+        pending += 1
+        if pending >= batch_size:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def export_headers(name: str, fmt: str) -> Dict[str, str]:
+    return {"Content-Disposition": f'attachment; filename="{name}.{fmt}"'}
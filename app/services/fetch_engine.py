@@ -0,0 +1,106 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Optional, Dict, Any, AsyncIterator
+from app.config import get_settings
+
+
+class TokenBucket:
+    """Token bucket limiter; callers wait for a token instead of being rejected."""
+
+    def __init__(self, rate_per_minute: float, burst: int):
+        self.rate_per_second = rate_per_minute / 60.0
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self.updated_at
+        self.updated_at = now
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate_per_second)
+
+    async def acquire(self) -> None:
+        if self.rate_per_second <= 0:
+            return
+
+        async with self._lock:
+            self._refill()
+            while self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate_per_second)
+                self._refill()
+            self.tokens -= 1
+
+
+class FetchEngine:
+    def __init__(self, max_in_flight: int, rate_per_minute: float, burst: int):
+        self.max_in_flight = max_in_flight
+        self.bucket = TokenBucket(rate_per_minute, burst)
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+
+        self.in_flight = 0
+        self.queued = 0
+        self.completed = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.window_max_wait = 0.0
+
+    def reset_window(self) -> None:
+        """Start a new window for ``window_max_wait``, e.g. one scheduler run."""
+        self.window_max_wait = 0.0
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[float]:
+        """Wait for a free in-flight slot and a rate token; yields the queue wait in seconds."""
+        started = time.monotonic()
+        self.queued += 1
+        try:
+            await self._semaphore.acquire()
+            try:
+                await self.bucket.acquire()
+            except BaseException:
+                self._semaphore.release()
+                raise
+        finally:
+            self.queued -= 1
+
+        waited = time.monotonic() - started
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+        self.window_max_wait = max(self.window_max_wait, waited)
+        self.in_flight += 1
+        try:
+            yield waited
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+            self._semaphore.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_in_flight": self.max_in_flight,
+            "rate_per_minute": self.bucket.rate_per_second * 60,
+            "burst": self.bucket.capacity,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "completed": self.completed,
+            "total_wait_seconds": round(self.total_wait, 3),
+            "avg_wait_seconds": round(self.total_wait / self.completed, 3) if self.completed else 0.0,
+            "max_wait_seconds": round(self.max_wait, 3),
+        }
+
+
+_engine: Optional[FetchEngine] = None
+
+
+def get_fetch_engine() -> FetchEngine:
+    global _engine
+    if _engine is None:
+        settings = get_settings()
+        _engine = FetchEngine(
+            max_in_flight=settings.fetch_max_in_flight,
+            rate_per_minute=settings.fetch_rate_per_minute,
+            burst=settings.fetch_rate_burst,
+        )
+    return _engine
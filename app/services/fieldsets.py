@@ -0,0 +1,68 @@
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Type
+from pydantic import BaseModel, ConfigDict, create_model
+
+
+def parse_fields(value: str, schema: Type[BaseModel]) -> Tuple[str, ...]:
+    """Requested fields of ``schema`` from a comma-separated list, in schema order.
+    
+    The canonical order means ``city,temperature`` and ``temperature,city``
+    share one ``Fieldset``.
+    """
+    requested = {name.strip() for name in value.split(",") if name.strip()}
+    if not requested:
+        raise ValueError("fields must name at least one field")
+    unknown = requested - schema.model_fields.keys()
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    return tuple(name for name in schema.model_fields if name in requested)
+
+
+class Fieldset:
+    """Response models narrowed to a subset of a schema's fields.
+    
+    The narrowed models (and with them pydantic's compiled validators and
+    serializers) are built once per field tuple by ``get_fieldset``, so a
+    request only pays for validating and dumping the fields it asked for.
+    """
+    
+    def __init__(self, schema: Type[BaseModel], list_schema: Type[BaseModel], fields: Tuple[str, ...]):
+        self.schema = schema
+        self.fields = fields
+        self.model = create_model(
+            f"{schema.__name__}Fields",
+            __config__=ConfigDict(from_attributes=True),
+            **{name: (schema.model_fields[name].annotation, schema.model_fields[name]) for name in fields},
+        )
+        self.page_model = create_model(
+            f"{list_schema.__name__}Fields",
+            __base__=list_schema,
+            items=(List[self.model], ...),
+        )
+    
+    def columns(self, required: Iterable[str] = ()) -> Tuple[str, ...]:
+        """Columns to select: the requested fields plus ``required`` (e.g. the cursor sort key)."""
+        wanted = set(self.fields) | set(required)
+        return tuple(name for name in self.schema.model_fields if name in wanted)
+    
+    def dump(self, item: Any) -> bytes:
+        return self.model.model_validate(item).model_dump_json().encode()
+    
+    def dump_page(self, page: Dict[str, Any]) -> bytes:
+        return self.page_model(**page).model_dump_json().encode()
+
+
+@lru_cache(maxsize=256)
+def get_fieldset(schema: Type[BaseModel], list_schema: Type[BaseModel], fields: Tuple[str, ...]) -> Fieldset:
+    return Fieldset(schema, list_schema, fields)
+
+
+def resolve_fieldset(
+    value: Optional[str],
+    schema: Type[BaseModel],
+    list_schema: Type[BaseModel],
+) -> Optional[Fieldset]:
+    """Fieldset for a ``fields`` query parameter, or None to return every field."""
+    if value is None:
+        return None
+    return get_fieldset(schema, list_schema, parse_fields(value, schema))
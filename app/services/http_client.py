@@ -0,0 +1,52 @@
+import logging
+from typing import Optional
+import httpx
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def create_http_client() -> httpx.AsyncClient:
+    settings = get_settings()
+
+    limits = httpx.Limits(
+        max_connections=settings.http_max_connections,
+        max_keepalive_connections=settings.http_max_keepalive_connections,
+        keepalive_expiry=settings.http_keepalive_expiry,
+    )
+    timeout = httpx.Timeout(
+        connect=settings.http_connect_timeout,
+        read=settings.http_read_timeout,
+        write=settings.http_write_timeout,
+        pool=settings.http_pool_timeout,
+    )
+
+    return httpx.AsyncClient(
+        limits=limits,
+        timeout=timeout,
+        http2=settings.http2_enabled,
+    )
+
+
+async def init_http_client() -> httpx.AsyncClient:
+    client = get_http_client()
+    logger.info("Shared HTTP client started")
+    return client
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the process-wide client, creating it lazily outside the app lifespan."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = create_http_client()
+    return _client
+
+
+async def close_http_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+        logger.info("Shared HTTP client closed")
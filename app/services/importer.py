@@ -0,0 +1,532 @@
+"""Bulk import of historical weather readings from CSV or NDJSON files.
+
+Rows are read in chunks, checked by plain converters instead of pydantic
+models, loaded into a temporary staging table (``COPY`` on PostgreSQL) and
+merged into ``weather_observations`` and ``weather`` with set-based
+statements. Each chunk commits together with its checkpoint, so an
+interrupted import resumes after the last committed chunk.
+
+Run from the command line::
+
+    python -m app.services.importer readings.csv --name readings-2020
+"""
+import argparse
+import asyncio
+import csv
+import json
+import logging
+import math
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from itertools import islice
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from sqlalchemy import Column, DateTime, MetaData, String, Table, delete, func, insert, literal, select, true
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from app.config import get_settings
+from app.database import async_session_maker
+from app.models.import_checkpoint import ImportCheckpoint
+from app.models.observation import WeatherObservation
+from app.models.weather import Weather, normalize_key
+from app.services.observation_service import ObservationService, month_start
+from app.services.weather_service import WeatherService
+
+logger = logging.getLogger(__name__)
+
+FORMAT_CSV = "csv"
+FORMAT_NDJSON = "ndjson"
+FORMATS = {".csv": FORMAT_CSV, ".ndjson": FORMAT_NDJSON, ".jsonl": FORMAT_NDJSON}
+
+STATUS_PENDING = "pending"
+STATUS_RUNNING = "running"
+STATUS_COMPLETED = "completed"
+STATUS_FAILED = "failed"
+
+IMPORT_SOURCE = "import"
+MAX_REPORTED_ERRORS = 20
+
+
+class ImportSourceError(ValueError):
+    """The source file cannot be imported as requested."""
+
+
+class ImportInProgressError(RuntimeError):
+    """An import with the same name is already running in this process."""
+
+
+def _text(max_length: int) -> Callable[[Any], str]:
+    def convert(value: Any) -> str:
+        value = str(value)
+        if not value.strip():
+            raise ValueError("must not be blank")
+        if len(value) > max_length:
+            raise ValueError(f"longer than {max_length} characters")
+        return value
+    return convert
+
+
+def _number(cast: type, ge: Optional[float] = None, le: Optional[float] = None, gt: Optional[float] = None):
+    def convert(value: Any):
+        value = cast(value)
+        if cast is float and not math.isfinite(value):
+            raise ValueError("must be a finite number")
+        if ge is not None and value < ge:
+            raise ValueError(f"must be >= {ge}")
+        if le is not None and value > le:
+            raise ValueError(f"must be <= {le}")
+        if gt is not None and value <= gt:
+            raise ValueError(f"must be > {gt}")
+        return value
+    return convert
+
+
+def _timestamp(value: Any) -> datetime:
+    """ISO 8601 string or unix seconds, stored as naive UTC."""
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value, timezone.utc).replace(tzinfo=None)
+    parsed = datetime.fromisoformat(str(value))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+# (column, converter, required); the same limits as WeatherCreate, plus a mandatory timestamp
+FIELDS: List[Tuple[str, Callable[[Any], Any], bool]] = [
+    ("city", _text(100), True),
+    ("country", _text(100), True),
+    ("data_timestamp", _timestamp, True),
+    ("provider_id", _number(int), False),
+    ("latitude", _number(float, ge=-90, le=90), False),
+    ("longitude", _number(float, ge=-180, le=180), False),
+    ("temperature", _number(float), True),
+    ("feels_like", _number(float), False),
+    ("humidity", _number(float, ge=0, le=100), True),
+    ("pressure", _number(float, gt=0), True),
+    ("wind_speed", _number(float, ge=0), False),
+    ("wind_direction", _number(int, ge=0, le=360), False),
+    ("cloudiness", _number(int, ge=0, le=100), False),
+    ("weather_description", _text(200), False),
+    ("weather_main", _text(50), False),
+    ("visibility", _number(int, ge=0), False),
+]
+
+STAGING_COLUMNS = ("city", "country", "city_key", "country_key") + tuple(name for name, _, _ in FIELDS[2:])
+TIMESTAMP_INDEX = STAGING_COLUMNS.index("data_timestamp")
+
+staging_metadata = MetaData()
+staging_table = Table(
+    "weather_import_staging",
+    staging_metadata,
+    *(Column(name, WeatherObservation.__table__.c[name].type) for name in STAGING_COLUMNS),
+    prefixes=["TEMPORARY"],
+)
+
+
+def validate_record(record: Any) -> Tuple[Optional[tuple], Optional[str]]:
+    """Convert one source record to a staging row, or explain why it is rejected."""
+    if not isinstance(record, dict):
+        return None, "expected an object"
+    
+    values = []
+    for name, convert, required in FIELDS:
+        raw = record.get(name)
+        if raw is None or raw == "":
+            if required:
+                return None, f"{name}: field required"
+            values.append(None)
+            continue
+        try:
+            values.append(convert(raw))
+        except (TypeError, ValueError, OverflowError) as e:
+            return None, f"{name}: {e}"
+    
+    city, country = values[0], values[1]
+    return (city, country, normalize_key(city), normalize_key(country), *values[2:]), None
+
+
+def detect_format(path: Path, fmt: Optional[str] = None) -> str:
+    if fmt:
+        if fmt not in (FORMAT_CSV, FORMAT_NDJSON):
+            raise ImportSourceError(f"Unsupported format: {fmt}")
+        return fmt
+    try:
+        return FORMATS[path.suffix.lower()]
+    except KeyError:
+        raise ImportSourceError(f"Cannot tell the format of {path.name}; pass csv or ndjson")
+
+
+def iter_records(path: Path, fmt: str) -> Iterator[Tuple[Any, Optional[str]]]:
+    """Yield (record, parse_error) for every record in the file, in order.
+    
+    NDJSON blank lines are not records, so record numbers stay stable between runs.
+    """
+    with open(path, newline="", encoding="utf-8") as source:
+        if fmt == FORMAT_CSV:
+            for row in csv.DictReader(source):
+                yield row, None
+            return
+        
+        for line in source:
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line), None
+            except json.JSONDecodeError as e:
+                yield None, f"invalid JSON: {e.msg}"
+
+
+def _read_chunk(records: Iterator, size: int) -> list:
+    return list(islice(records, size))
+
+
+@dataclass
+class ImportProgress:
+    name: str
+    source: str
+    format: str
+    status: str = STATUS_PENDING
+    records_done: int = 0
+    rows_imported: int = 0
+    rows_rejected: int = 0
+    resumed_from: int = 0
+    errors: List[str] = field(default_factory=list)
+    error_message: Optional[str] = None
+    started_at: datetime = field(default_factory=datetime.utcnow)
+    updated_at: datetime = field(default_factory=datetime.utcnow)
+    _clock_start: float = field(default_factory=time.monotonic, repr=False)
+    
+    @property
+    def records_per_second(self) -> float:
+        elapsed = time.monotonic() - self._clock_start
+        processed = self.records_done - self.resumed_from
+        return round(processed / elapsed, 1) if elapsed > 0 else 0.0
+    
+    def reject(self, record_number: int, message: str) -> None:
+        self.rows_rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(f"record {record_number}: {message}")
+    
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "source": self.source,
+            "format": self.format,
+            "status": self.status,
+            "records_done": self.records_done,
+            "rows_imported": self.rows_imported,
+            "rows_rejected": self.rows_rejected,
+            "resumed_from": self.resumed_from,
+            "records_per_second": self.records_per_second,
+            "errors": self.errors,
+            "error_message": self.error_message,
+            "started_at": self.started_at,
+            "updated_at": self.updated_at,
+        }
+
+
+def checkpoint_dict(checkpoint: ImportCheckpoint) -> Dict[str, Any]:
+    return {
+        "name": checkpoint.name,
+        "source": checkpoint.source,
+        "format": checkpoint.format,
+        "status": checkpoint.status,
+        "records_done": checkpoint.records_done,
+        "rows_imported": checkpoint.rows_imported,
+        "rows_rejected": checkpoint.rows_rejected,
+        "error_message": checkpoint.error_message,
+        "started_at": checkpoint.started_at,
+        "updated_at": checkpoint.updated_at,
+    }
+
+
+class ImportLoader:
+    """Moves one chunk of staging rows into the weather tables within the session's transaction."""
+    
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.dialect = db.get_bind().dialect.name
+    
+    async def load(self, rows: List[tuple]) -> int:
+        """Stage and merge the rows; returns the number of new observations."""
+        now = datetime.utcnow()
+        conn = await self.db.connection()
+        await conn.run_sync(staging_table.create, checkfirst=True)
+        await self.db.execute(delete(staging_table))
+        
+        if self.dialect == "postgresql":
+            await ObservationService(self.db).ensure_partitions({month_start(row[TIMESTAMP_INDEX]) for row in rows})
+            raw = await conn.get_raw_connection()
+            await raw.driver_connection.copy_records_to_table(
+                staging_table.name, records=rows, columns=STAGING_COLUMNS,
+            )
+        else:
+            await self.db.execute(insert(staging_table), [dict(zip(STAGING_COLUMNS, row)) for row in rows])
+        
+        inserted = await self._merge_history(now)
+        await self._merge_latest(now)
+        return inserted
+    
+    def _insert(self):
+        return postgresql.insert if self.dialect == "postgresql" else sqlite.insert
+    
+    async def _merge_history(self, now: datetime) -> int:
+        source = select(
+            *staging_table.c,
+            literal(IMPORT_SOURCE, String),
+            literal(now, DateTime),
+        ).where(true())
+        stmt = self._insert()(WeatherObservation).from_select(
+            [*STAGING_COLUMNS, "source", "ingested_at"], source,
+        ).on_conflict_do_nothing(
+            index_elements=[
+                WeatherObservation.city_key,
+                WeatherObservation.country_key,
+                WeatherObservation.data_timestamp,
+            ],
+        )
+        result = await self.db.execute(stmt)
+        return result.rowcount
+    
+    async def _merge_latest(self, now: datetime) -> None:
+        """Move each city's newest staged reading into ``weather`` unless a newer one is stored."""
+        ranked = select(
+            *staging_table.c,
+            func.row_number().over(
+                partition_by=(staging_table.c.city_key, staging_table.c.country_key),
+                order_by=staging_table.c.data_timestamp.desc(),
+            ).label("position"),
+        ).subquery()
+        newest = select(
+            *(ranked.c[name] for name in STAGING_COLUMNS),
+            literal(now, DateTime),
+            literal(now, DateTime),
+        ).where(ranked.c.position == 1)
+        
+        stmt = self._insert()(Weather).from_select([*STAGING_COLUMNS, "created_at", "updated_at"], newest)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Weather.city_key, Weather.country_key],
+            set_={
+                name: stmt.excluded[name]
+                for name in (*STAGING_COLUMNS, "updated_at")
+                if name not in ("city_key", "country_key")
+            },
+            where=Weather.data_timestamp < stmt.excluded.data_timestamp,
+        ).returning(Weather.id, Weather.city_key, Weather.country_key, Weather.latitude, Weather.longitude)
+        result = await self.db.execute(stmt)
+        rows = result.all()
+        service = WeatherService(self.db)
+        await service.invalidate((row.id, row.city_key, row.country_key) for row in rows)
+        service.index.apply(self.db.sync_session, ((row.id, row.latitude, row.longitude) for row in rows))
+        # Merged rows are re-read into the snapshot by id on its first refresh after the commit
+        service.snapshot.mark_dirty_on_commit(self.db.sync_session, (row.id for row in rows))
+
+
+async def _save_checkpoint(db: AsyncSession, progress: ImportProgress) -> None:
+    checkpoint = await db.get(ImportCheckpoint, progress.name)
+    if checkpoint is None:
+        checkpoint = ImportCheckpoint(name=progress.name)
+        db.add(checkpoint)
+    checkpoint.started_at = progress.started_at
+    checkpoint.source = progress.source
+    checkpoint.format = progress.format
+    checkpoint.status = progress.status
+    checkpoint.records_done = progress.records_done
+    checkpoint.rows_imported = progress.rows_imported
+    checkpoint.rows_rejected = progress.rows_rejected
+    checkpoint.error_message = progress.error_message
+    await db.flush()
+
+
+def resolve_source(
+    source: str,
+    fmt: Optional[str] = None,
+    name: Optional[str] = None,
+    root: Optional[str] = None,
+) -> Tuple[Path, str, str]:
+    """(path, format, checkpoint name) of an import source.
+    
+    With ``root`` a relative source is taken relative to it, and a source
+    that resolves (symlinks included) outside of it is rejected.
+    """
+    path = Path(source)
+    if root is not None:
+        base = Path(root).resolve()
+        path = (base / path).resolve()
+        if not path.is_relative_to(base):
+            raise ImportSourceError(f"{source} is outside the import directory")
+    if not path.is_file():
+        raise ImportSourceError(f"File not found: {source}")
+    return path, detect_format(path, fmt), name or path.name
+
+
+async def run_import(
+    source: str,
+    fmt: Optional[str] = None,
+    name: Optional[str] = None,
+    chunk_size: Optional[int] = None,
+    restart: bool = False,
+    on_progress: Optional[Callable[[ImportProgress], None]] = None,
+    session_maker: Optional[async_sessionmaker] = None,
+) -> ImportProgress:
+    """Import a file, resuming from the checkpoint stored under ``name``.
+    
+    A finished import is not repeated unless ``restart`` is set; a checkpoint
+    for a different file under the same name is an error.
+    """
+    path, fmt, name = resolve_source(source, fmt, name)
+    chunk_size = chunk_size or get_settings().import_chunk_size
+    session_maker = session_maker or async_session_maker
+    progress = ImportProgress(name=name, source=str(path), format=fmt, status=STATUS_RUNNING)
+    
+    async with session_maker() as db:
+        checkpoint = await db.get(ImportCheckpoint, name)
+        if checkpoint is not None and not restart:
+            if checkpoint.source != progress.source:
+                raise ImportSourceError(
+                    f"Import {name} was started for {checkpoint.source}; use another name or restart"
+                )
+            progress.started_at = checkpoint.started_at
+            progress.records_done = progress.resumed_from = checkpoint.records_done
+            progress.rows_imported = checkpoint.rows_imported
+            progress.rows_rejected = checkpoint.rows_rejected
+            if checkpoint.status == STATUS_COMPLETED:
+                progress.status = STATUS_COMPLETED
+                return progress
+        
+        if progress.resumed_from:
+            logger.info(f"Resuming import {name} after record {progress.resumed_from}")
+        
+        source_records = iter_records(path, fmt)
+        records = islice(source_records, progress.resumed_from, None)
+        loader = ImportLoader(db)
+        # Older readings would land in partitions the retention job drops
+        cutoff = ObservationService(db).retention_cutoff()
+        committed = (progress.records_done, progress.rows_imported, progress.rows_rejected)
+        try:
+            while True:
+                chunk = await asyncio.to_thread(_read_chunk, records, chunk_size)
+                if not chunk:
+                    break
+                
+                rows = []
+                for offset, (record, error) in enumerate(chunk, start=progress.records_done + 1):
+                    if error is None:
+                        row, error = validate_record(record)
+                    if error is None and cutoff is not None and row[TIMESTAMP_INDEX] < cutoff:
+                        error = f"data_timestamp: before {cutoff:%Y-%m-%d}, past OBSERVATION_RETENTION_MONTHS"
+                    if error is None:
+                        rows.append(row)
+                    else:
+                        progress.reject(offset, error)
+                
+                if rows:
+                    progress.rows_imported += await loader.load(rows)
+                progress.records_done += len(chunk)
+                progress.updated_at = datetime.utcnow()
+                await _save_checkpoint(db, progress)
+                await db.commit()
+                committed = (progress.records_done, progress.rows_imported, progress.rows_rejected)
+                
+                if on_progress:
+                    on_progress(progress)
+            
+            progress.status = STATUS_COMPLETED
+        except Exception as e:
+            await db.rollback()
+            progress.records_done, progress.rows_imported, progress.rows_rejected = committed
+            progress.status = STATUS_FAILED
+            progress.error_message = str(e)[:500]
+            logger.error(f"Import {name} failed after record {progress.records_done}: {e}")
+            raise
+        finally:
+            source_records.close()
+            progress.updated_at = datetime.utcnow()
+            await _save_checkpoint(db, progress)
+            await db.commit()
+            if on_progress:
+                on_progress(progress)
+    
+    logger.info(
+        f"Import {name} {progress.status}: {progress.records_done} records, "
+        f"{progress.rows_imported} imported, {progress.rows_rejected} rejected"
+    )
+    return progress
+
+
+_jobs: Dict[str, ImportProgress] = {}
+_tasks: Dict[str, asyncio.Task] = {}
+
+
+def get_import_job(name: str) -> Optional[ImportProgress]:
+    return _jobs.get(name)
+
+
+def start_import_job(
+    source: str,
+    fmt: Optional[str] = None,
+    name: Optional[str] = None,
+    chunk_size: Optional[int] = None,
+    restart: bool = False,
+    session_maker: Optional[async_sessionmaker] = None,
+) -> ImportProgress:
+    """Run an import in the background of this process; poll it with ``get_import_job``.
+    
+    Only files under the ``IMPORT_ROOT`` directory can be imported this way.
+    """
+    path, fmt, name = resolve_source(source, fmt, name, root=get_settings().import_root)
+    task = _tasks.get(name)
+    if task is not None and not task.done():
+        raise ImportInProgressError(f"Import {name} is already running")
+    
+    _jobs[name] = ImportProgress(name=name, source=str(path), format=fmt)
+    
+    async def run():
+        try:
+            await run_import(
+                str(path), fmt, name, chunk_size, restart,
+                on_progress=lambda progress: _jobs.__setitem__(name, progress),
+                session_maker=session_maker,
+            )
+        except Exception as e:
+            job = _jobs[name]
+            if job.status != STATUS_FAILED:
+                job.status = STATUS_FAILED
+                job.error_message = str(e)[:500]
+    
+    _tasks[name] = asyncio.create_task(run())
+    return _jobs[name]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Import historical weather readings from CSV or NDJSON")
+    parser.add_argument("source", help="Path to a .csv, .ndjson or .jsonl file")
+    parser.add_argument("--format", choices=[FORMAT_CSV, FORMAT_NDJSON], default=None)
+    parser.add_argument("--name", default=None, help="Checkpoint name (defaults to the file name)")
+    parser.add_argument("--chunk-size", type=int, default=None)
+    parser.add_argument("--restart", action="store_true", help="Ignore the stored checkpoint")
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    
+    def report(progress: ImportProgress) -> None:
+        print(
+            f"{progress.status}: {progress.records_done} records, {progress.rows_imported} imported, "
+            f"{progress.rows_rejected} rejected, {progress.records_per_second} records/s",
+            file=sys.stderr,
+        )
+    
+    try:
+        progress = asyncio.run(run_import(
+            args.source, args.format, args.name, args.chunk_size, args.restart, on_progress=report,
+        ))
+    except ImportSourceError as e:
+        parser.error(str(e))
+    for error in progress.errors:
+        print(error, file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.services.columnar_snapshot import ColumnarSnapshot, get_columnar_snapshot
+from app.services.spatial_index import chord_to_km, unit_vectors
+
+INTERPOLATED_FIELDS = ("temperature", "humidity", "pressure", "wind_speed")
+
+# Upper bound on points x stations similarities held in memory at once
+CHUNK_ELEMENTS = 2_000_000
+# Points closer than this to a station take its values as they are
+EXACT_MATCH_KM = 1e-3
+
+
+@dataclass
+class Stations:
+    """Coordinates and readings of the cities used as interpolation stations."""
+    
+    vectors: np.ndarray
+    values: np.ndarray
+    
+    def __len__(self) -> int:
+        return len(self.vectors)
+
+
+def idw(
+    stations: Stations,
+    latitudes: Sequence[float],
+    longitudes: Sequence[float],
+    k: int,
+    power: float,
+) -> Dict[str, np.ndarray]:
+    """Inverse-distance weighted estimates of every field at each point.
+    
+    Each point uses its ``k`` nearest stations, weighted by 1 / distance ** power.
+    Stations without a value for a field are left out of that field's
+    average; a field no nearby station reports comes back as NaN. A point
+    on top of a station takes that station's value for every field the
+    station reports and is interpolated from the others for the rest.
+    Points are processed in chunks so the distance matrix stays bounded.
+    """
+    points = unit_vectors(latitudes, longitudes).reshape(-1, 3)
+    k = min(k, len(stations))
+    present = (~np.isnan(stations.values)).astype(np.float64)
+    filled = np.nan_to_num(stations.values, nan=0.0)
+    
+    estimates = np.empty((len(points), stations.values.shape[1]))
+    nearest_km = np.empty(len(points))
+    chunk = max(1, CHUNK_ELEMENTS // len(stations))
+    vectors_t = np.ascontiguousarray(stations.vectors.T)
+    
+    for start in range(0, len(points), chunk):
+        query = points[start:start + chunk]
+        similarity = query @ vectors_t
+        if k < len(stations):
+            neighbours = np.argpartition(similarity, -k, axis=1)[:, -k:]
+            similarity = np.take_along_axis(similarity, neighbours, axis=1)
+        else:
+            neighbours = np.broadcast_to(np.arange(k), (len(query), k))
+        
+        # |a - b| = sqrt(2 - 2 a.b) for unit vectors
+        distances = chord_to_km(np.sqrt(np.maximum(2.0 - 2.0 * similarity, 0.0)))
+        exact = distances <= EXACT_MATCH_KM
+        with np.errstate(divide="ignore"):
+            inverse = np.where(exact, 0.0, 1.0 / distances ** power)
+        
+        # Per field: coincident stations that report it, else inverse-distance weights
+        neighbour_present = present[neighbours]
+        exact_present = exact[:, :, None] * neighbour_present
+        weights = np.where(exact_present.any(axis=1, keepdims=True), exact_present, inverse[:, :, None])
+        
+        total = np.einsum("pkf,pkf->pf", weights, filled[neighbours])
+        weight_sums = np.einsum("pkf,pkf->pf", weights, neighbour_present)
+        with np.errstate(invalid="ignore"):
+            estimates[start:start + chunk] = total / weight_sums
+        nearest_km[start:start + chunk] = distances.min(axis=1)
+    
+    result = {name: estimates[:, i] for i, name in enumerate(INTERPOLATED_FIELDS)}
+    result["nearest_km"] = nearest_km
+    return result
+
+
+class InterpolationService:
+    def __init__(self, db: AsyncSession, snapshot: Optional[ColumnarSnapshot] = None):
+        self.db = db
+        self.snapshot = snapshot if snapshot is not None else get_columnar_snapshot()
+    
+    async def load_stations(self) -> Stations:
+        """Current readings of every city with coordinates, from the columnar snapshot."""
+        snapshot = await self.snapshot.refresh(self.db)
+        latitudes, longitudes = snapshot.column("latitude"), snapshot.column("longitude")
+        located = ~(np.isnan(latitudes) | np.isnan(longitudes))
+        return Stations(
+            vectors=unit_vectors(latitudes[located], longitudes[located]).reshape(-1, 3),
+            values=np.column_stack([snapshot.column(name)[located] for name in INTERPOLATED_FIELDS]),
+        )
+    
+    async def estimate(
+        self,
+        latitudes: Sequence[float],
+        longitudes: Sequence[float],
+        k: int,
+        power: float,
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Estimates per point, or None when no city has coordinates."""
+        stations = await self.load_stations()
+        if not len(stations):
+            return None
+        
+        result = idw(stations, latitudes, longitudes, k, power)
+        columns = {name: _nullable(values) for name, values in result.items()}
+        return [
+            {"latitude": lat, "longitude": lon, **{name: values[i] for name, values in columns.items()}}
+            for i, (lat, lon) in enumerate(zip(latitudes, longitudes))
+        ]
+
+
+def _nullable(values: np.ndarray) -> List[Optional[float]]:
+    return [None if value != value else round(value, 3) for value in values.tolist()]
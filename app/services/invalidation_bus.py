@@ -0,0 +1,232 @@
+import asyncio
+import json
+import logging
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy import func, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import get_settings
+from app.services.columnar_snapshot import ColumnarSnapshot, get_columnar_snapshot
+from app.services.spatial_index import SpatialIndex, get_spatial_index
+from app.services.weather_cache import WeatherReadCache, get_weather_cache, row_keys
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "weather_cache"
+# NOTIFY payloads must stay under 8000 bytes
+MAX_PAYLOAD_BYTES = 7000
+
+# (weather id, city_key, country_key) of a changed row
+RowRef = Tuple[int, str, str]
+
+
+def encode_payloads(rows: Iterable[RowRef], max_bytes: int = MAX_PAYLOAD_BYTES) -> List[str]:
+    """Split changed rows into JSON payloads that each fit in one NOTIFY."""
+    payloads = []
+    chunk: List[str] = []
+    size = 2
+    for row in rows:
+        item = json.dumps(list(row), ensure_ascii=False, separators=(",", ":"))
+        item_size = len(item.encode("utf-8")) + 1
+        if chunk and size + item_size > max_bytes:
+            payloads.append(f"[{','.join(chunk)}]")
+            chunk, size = [], 2
+        chunk.append(item)
+        size += item_size
+    if chunk:
+        payloads.append(f"[{','.join(chunk)}]")
+    return payloads
+
+
+def decode_payload(payload: str) -> Set[Tuple[Any, ...]]:
+    keys = set()
+    for weather_id, city_key, country_key in json.loads(payload):
+        keys |= row_keys(weather_id, city_key, country_key)
+    return keys
+
+
+async def publish_invalidation(db: AsyncSession, rows: Iterable[RowRef]) -> None:
+    """Queue a NOTIFY for the changed rows; PostgreSQL delivers it when the transaction commits."""
+    if db.get_bind().dialect.name != "postgresql":
+        return
+    for payload in encode_payloads(rows):
+        await db.execute(select(func.pg_notify(CHANNEL, payload)))
+
+
+class InvalidationListener:
+    """Evicts weather cache entries changed by other workers.
+    
+    Holds one dedicated connection that LISTENs on the channel. Keys from
+    notifications arriving within ``coalesce_seconds`` are evicted
+    together, and the changed rows are marked dirty in the spatial index
+    and columnar snapshot.
+    Notifications sent while disconnected are lost, so until the listener
+    is connected the cache is disabled and the index and snapshot reload
+    on every refresh, and every (re)connect starts with a full flush.
+    """
+    
+    def __init__(
+        self,
+        connect: Callable[[], Awaitable[Any]],
+        cache: Optional[WeatherReadCache] = None,
+        index: Optional[SpatialIndex] = None,
+        snapshot: Optional[ColumnarSnapshot] = None,
+        coalesce_seconds: float = 0.05,
+        reconnect_delay: float = 1.0,
+        max_reconnect_delay: float = 30.0,
+        ping_interval: float = 30.0,
+    ):
+        self.connect = connect
+        self.cache = cache or get_weather_cache()
+        self.index = index if index is not None else get_spatial_index()
+        self.snapshot = snapshot if snapshot is not None else get_columnar_snapshot()
+        self.coalesce_seconds = coalesce_seconds
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.ping_interval = ping_interval
+        
+        self._task: Optional[asyncio.Task] = None
+        self._pending: Set[Tuple[Any, ...]] = set()
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._lost: Optional[asyncio.Event] = None
+        
+        self.connected = False
+        self.connects = 0
+        self.notifications = 0
+        self.flushes = 0
+        self.full_flushes = 0
+    
+    async def start(self) -> None:
+        if self._task is None:
+            self._set_trusted(False)
+            self._task = asyncio.create_task(self._run())
+    
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._flush()
+    
+    async def _run(self) -> None:
+        delay = self.reconnect_delay
+        while True:
+            try:
+                conn = await self.connect()
+            except Exception as e:
+                logger.warning(f"Cache invalidation listener cannot connect: {e}")
+                await asyncio.sleep(delay)
+                delay = min(self.max_reconnect_delay, delay * 2)
+                continue
+            
+            delay = self.reconnect_delay
+            try:
+                await self._listen(conn)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Cache invalidation listener lost its connection: {e}")
+            finally:
+                self.connected = False
+                self._set_trusted(False)
+                try:
+                    await conn.close()
+                except Exception:
+                    pass
+            await asyncio.sleep(delay)
+    
+    async def _listen(self, conn: Any) -> None:
+        self._lost = asyncio.Event()
+        conn.add_termination_listener(lambda _conn: self._lost.set())
+        await conn.add_listener(CHANNEL, self._on_notify)
+        
+        # Anything changed while we were not listening may be cached here
+        self.cache.clear()
+        self.index.clear()
+        self.snapshot.clear()
+        self._set_trusted(True)
+        self.full_flushes += 1
+        self.connected = True
+        self.connects += 1
+        logger.info("Cache invalidation listener connected")
+        
+        while not self._lost.is_set():
+            try:
+                await asyncio.wait_for(self._lost.wait(), timeout=self.ping_interval)
+            except asyncio.TimeoutError:
+                await asyncio.wait_for(conn.execute("SELECT 1"), timeout=self.ping_interval)
+    
+    def _set_trusted(self, trusted: bool) -> None:
+        self.cache.enabled = trusted
+        self.index.trusted = trusted
+        self.snapshot.trusted = trusted
+    
+    def _on_notify(self, conn: Any, pid: int, channel: str, payload: str) -> None:
+        self.notifications += 1
+        try:
+            self._pending |= decode_payload(payload)
+        except (ValueError, TypeError) as e:
+            logger.warning(f"Ignoring malformed cache invalidation payload: {e}")
+            return
+        if self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(self.coalesce_seconds, self._flush)
+    
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if self._pending:
+            self.cache.invalidate(self._pending)
+            ids = [key[1] for key in self._pending if key[0] == "id"]
+            self.index.mark_dirty(ids)
+            self.snapshot.mark_dirty(ids)
+            self._pending = set()
+            self.flushes += 1
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "connected": self.connected,
+            "connects": self.connects,
+            "notifications": self.notifications,
+            "flushes": self.flushes,
+            "full_flushes": self.full_flushes,
+        }
+
+
+_listener: Optional[InvalidationListener] = None
+
+
+def get_invalidation_listener() -> Optional[InvalidationListener]:
+    return _listener
+
+
+async def start_invalidation_listener() -> Optional[InvalidationListener]:
+    """Start the listener when the database is PostgreSQL and listening is enabled."""
+    global _listener
+    settings = get_settings()
+    url = make_url(settings.database_url)
+    if not settings.cache_invalidation_listen or url.get_backend_name() != "postgresql":
+        return None
+    
+    import asyncpg
+    
+    dsn = url.set(drivername="postgresql").render_as_string(hide_password=False)
+    _listener = InvalidationListener(
+        connect=lambda: asyncpg.connect(dsn),
+        coalesce_seconds=settings.cache_invalidation_coalesce_ms / 1000,
+        reconnect_delay=settings.cache_invalidation_reconnect_delay,
+    )
+    await _listener.start()
+    logger.info("Cache invalidation listener started")
+    return _listener
+
+
+async def stop_invalidation_listener() -> None:
+    global _listener
+    if _listener is not None:
+        await _listener.stop()
+        _listener = None
+        logger.info("Cache invalidation listener stopped")
@@ -1,9 +1,10 @@
 import json
 from datetime import datetime
-from typing import Optional, List, Tuple, Any
-from sqlalchemy import select, func, and_
+from typing import Optional, List, Tuple, Any, AsyncIterator, Dict, Iterable, Sequence
+from sqlalchemy import select, func, lambda_stmt, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.log import ActionLog
+from app.services.pagination import TOTAL_EXACT, TOTAL_NONE, count_total
 
 
 class LogService:
@@ -38,6 +39,19 @@ class LogService:
         await self.db.flush()
         return log
     
+    async def log_actions(self, entries: Iterable[Dict[str, Any]]) -> List[ActionLog]:
+        """Add many log entries (``log_action`` keyword arguments) with a single flush."""
+        logs = []
+        for entry in entries:
+            details = entry.get("details")
+            if details and not isinstance(details, str):
+                details = json.dumps(details, default=str)
+            logs.append(ActionLog(**{**entry, "details": details}))
+        
+        self.db.add_all(logs)
+        await self.db.flush()
+        return logs
+    
     async def get_logs(
         self,
         page: int = 1,
@@ -47,40 +61,95 @@ class LogService:
         status: Optional[str] = None,
         start_date: Optional[datetime] = None,
         end_date: Optional[datetime] = None,
-    ) -> Tuple[List[ActionLog], int]:
-        query = select(ActionLog)
-        count_query = select(func.count(ActionLog.id))
+        cursor: Optional[Tuple[datetime, int]] = None,
+        total_mode: str = TOTAL_EXACT,
+        columns: Optional[Sequence[str]] = None,
+    ) -> Tuple[List[Any], Optional[int]]:
+        """Page through logs, newest first.
+        
+        ``cursor`` is the decoded (created_at, id) of the last row seen. With
+        ``total_mode="none"`` the total is None and up to ``size + 1`` rows are returned.
+        With ``columns`` only those columns are selected and plain rows are returned.
+        """
+        if columns:
+            selected = tuple(getattr(ActionLog, name) for name in columns)
+            query = lambda_stmt(lambda: select(*selected))
+        else:
+            query = lambda_stmt(lambda: select(ActionLog))
+        count_query = lambda_stmt(lambda: select(func.count(ActionLog.id)))
         
-        conditions = []
+        # Each optional filter is its own cached lambda, so every combination
+        # of filters compiles once and later calls only bind new values
         if action:
-            conditions.append(ActionLog.action == action)
+            query += lambda q: q.where(ActionLog.action == action)
+            count_query += lambda q: q.where(ActionLog.action == action)
         if entity:
-            conditions.append(ActionLog.entity == entity)
+            query += lambda q: q.where(ActionLog.entity == entity)
+            count_query += lambda q: q.where(ActionLog.entity == entity)
         if status:
-            conditions.append(ActionLog.status == status)
+            query += lambda q: q.where(ActionLog.status == status)
+            count_query += lambda q: q.where(ActionLog.status == status)
         if start_date:
-            conditions.append(ActionLog.created_at >= start_date)
+            query += lambda q: q.where(ActionLog.created_at >= start_date)
+            count_query += lambda q: q.where(ActionLog.created_at >= start_date)
         if end_date:
-            conditions.append(ActionLog.created_at <= end_date)
+            query += lambda q: q.where(ActionLog.created_at <= end_date)
+            count_query += lambda q: q.where(ActionLog.created_at <= end_date)
         
-        if conditions:
-            query = query.where(and_(*conditions))
-            count_query = count_query.where(and_(*conditions))
+        filtered = any((action, entity, status, start_date, end_date))
+        total = await count_total(self.db, query, count_query, total_mode, filtered=filtered)
         
-        total_result = await self.db.execute(count_query)
-        total = total_result.scalar()
-        
-        offset = (page - 1) * size
-        query = query.order_by(ActionLog.created_at.desc()).offset(offset).limit(size)
+        # Without a total, one extra row tells the caller whether a next page exists
+        limit = size + 1 if total_mode == TOTAL_NONE else size
+        query += lambda q: q.order_by(ActionLog.created_at.desc(), ActionLog.id.desc()).limit(limit)
+        if cursor:
+            cursor_created_at, cursor_id = cursor
+            query += lambda q: q.where(
+                tuple_(ActionLog.created_at, ActionLog.id) < tuple_(cursor_created_at, cursor_id)
+            )
+        else:
+            offset = (page - 1) * size
+            query += lambda q: q.offset(offset)
         
         result = await self.db.execute(query)
-        items = result.scalars().all()
+        items = result.all() if columns else result.scalars().all()
         
         return list(items), total
     
+    async def stream_logs(
+        self,
+        action: Optional[str] = None,
+        entity: Optional[str] = None,
+        status: Optional[str] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        fetch_size: int = 1000,
+    ) -> AsyncIterator[ActionLog]:
+        """Every log ``get_logs`` would page through, read via a server-side cursor."""
+        query = select(ActionLog)
+        if action:
+            query = query.where(ActionLog.action == action)
+        if entity:
+            query = query.where(ActionLog.entity == entity)
+        if status:
+            query = query.where(ActionLog.status == status)
+        if start_date:
+            query = query.where(ActionLog.created_at >= start_date)
+        if end_date:
+            query = query.where(ActionLog.created_at <= end_date)
+        query = query.order_by(ActionLog.created_at.desc(), ActionLog.id.desc())
+        
+        result = await self.db.stream_scalars(query.execution_options(yield_per=fetch_size))
+        try:
+            async for log in result:
+                yield log
+        finally:
+            # Closing the cursor stops the query when the consumer goes away
+            await result.close()
+    
     async def get_log_by_id(self, log_id: int) -> Optional[ActionLog]:
         result = await self.db.execute(
-            select(ActionLog).where(ActionLog.id == log_id)
+            lambda_stmt(lambda: select(ActionLog).where(ActionLog.id == log_id))
         )
         return result.scalar_one_or_none()
     
@@ -0,0 +1,181 @@
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import get_settings
+from app.models.observation import WeatherObservation
+from app.models.weather import normalize_key
+from app.schemas.weather import WeatherCreate
+
+logger = logging.getLogger(__name__)
+
+TABLE_NAME = WeatherObservation.__tablename__
+PARTITION_PREFIX = f"{TABLE_NAME}_p"
+
+
+def month_start(value: datetime) -> datetime:
+    return datetime(value.year, value.month, 1)
+
+
+def add_months(value: datetime, months: int) -> datetime:
+    index = value.year * 12 + value.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: datetime) -> str:
+    return f"{PARTITION_PREFIX}{month:%Y%m}"
+
+
+def partition_month(name: str) -> Optional[datetime]:
+    """Month covered by a partition created by this service, or None for other tables."""
+    if not name.startswith(PARTITION_PREFIX):
+        return None
+    try:
+        return datetime.strptime(name[len(PARTITION_PREFIX):], "%Y%m")
+    except ValueError:
+        return None
+
+
+class ObservationService:
+    """Writes the weather history and manages its monthly partitions.
+    
+    Partition DDL only runs on PostgreSQL; on other databases the history
+    is a plain table and the partition methods do nothing.
+    """
+    
+    def __init__(self, db: AsyncSession):
+        self.db = db
+    
+    @property
+    def partitioned(self) -> bool:
+        return self.db.get_bind().dialect.name == "postgresql"
+    
+    async def record(
+        self,
+        readings: Sequence[Tuple[WeatherCreate, Optional[str]]],
+        chunk_size: Optional[int] = None,
+    ) -> int:
+        """Append (weather, source) readings; repeats of a stored reading are skipped.
+        
+        Returns the number of rows inserted.
+        """
+        now = datetime.utcnow()
+        rows = []
+        for item, source in readings:
+            row = item.model_dump()
+            if row.get("data_timestamp") is None:
+                row["data_timestamp"] = now
+            row["city_key"] = normalize_key(row["city"])
+            row["country_key"] = normalize_key(row["country"])
+            row["source"] = source
+            row["ingested_at"] = now
+            rows.append(row)
+        
+        if not rows:
+            return 0
+        
+        if self.partitioned:
+            await self.ensure_partitions({month_start(row["data_timestamp"]) for row in rows})
+        
+        chunk_size = chunk_size or get_settings().bulk_upsert_chunk_size
+        insert = postgresql.insert if self.partitioned else sqlite.insert
+        inserted = 0
+        for start in range(0, len(rows), chunk_size):
+            stmt = insert(WeatherObservation).values(rows[start:start + chunk_size]).on_conflict_do_nothing(
+                index_elements=[
+                    WeatherObservation.city_key,
+                    WeatherObservation.country_key,
+                    WeatherObservation.data_timestamp,
+                ],
+            )
+            result = await self.db.execute(stmt)
+            inserted += result.rowcount
+        
+        return inserted
+    
+    async def existing_partitions(self) -> Set[str]:
+        if not self.partitioned:
+            return set()
+        
+        result = await self.db.execute(
+            text(
+                "SELECT child.relname FROM pg_inherits "
+                "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+                "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+                "WHERE parent.relname = :table"
+            ),
+            {"table": TABLE_NAME},
+        )
+        return set(result.scalars().all())
+    
+    async def ensure_partitions(self, months: Set[datetime]) -> List[str]:
+        """Create the missing monthly partitions for the given months."""
+        if not self.partitioned:
+            return []
+        
+        existing = await self.existing_partitions()
+        created = []
+        for month in sorted(months):
+            name = partition_name(month)
+            if name in existing:
+                continue
+            await self.db.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {TABLE_NAME} "
+                f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{add_months(month, 1):%Y-%m-%d}')"
+            ))
+            created.append(name)
+        return created
+    
+    def retention_cutoff(
+        self,
+        now: Optional[datetime] = None,
+        retention_months: Optional[int] = None,
+    ) -> Optional[datetime]:
+        """First month ``maintain_partitions`` keeps, or None when nothing expires.
+        
+        Only partitioned history is dropped, so this is None on other databases.
+        """
+        if retention_months is None:
+            retention_months = get_settings().observation_retention_months
+        if not self.partitioned or retention_months <= 0:
+            return None
+        return add_months(month_start(now or datetime.utcnow()), -retention_months)
+    
+    async def maintain_partitions(
+        self,
+        now: Optional[datetime] = None,
+        months_ahead: Optional[int] = None,
+        retention_months: Optional[int] = None,
+    ) -> Dict[str, List[str]]:
+        """Create partitions up to ``months_ahead`` and drop the ones past retention.
+        
+        Expired months go away with DROP TABLE on the partition, so retention
+        never runs a DELETE over the history. ``retention_months`` of 0 keeps
+        everything.
+        """
+        settings = get_settings()
+        if months_ahead is None:
+            months_ahead = settings.observation_partitions_ahead
+        if retention_months is None:
+            retention_months = settings.observation_retention_months
+        
+        if not self.partitioned:
+            return {"created": [], "dropped": []}
+        
+        current = month_start(now or datetime.utcnow())
+        created = await self.ensure_partitions({add_months(current, i) for i in range(months_ahead + 1)})
+        
+        dropped = []
+        oldest_kept = self.retention_cutoff(now, retention_months)
+        if oldest_kept is not None:
+            for name in sorted(await self.existing_partitions()):
+                month = partition_month(name)
+                if month is not None and month < oldest_kept:
+                    await self.db.execute(text(f"DROP TABLE IF EXISTS {name}"))
+                    dropped.append(name)
+        
+        if created or dropped:
+            logger.info(f"Observation partitions: created {created}, dropped {dropped}")
+        return {"created": created, "dropped": dropped}
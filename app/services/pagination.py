@@ -0,0 +1,107 @@
+import base64
+import json
+import math
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Literal, Optional, Tuple, Union
+from sqlalchemy import Select, StatementLambdaElement, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+def encode_cursor(timestamp: datetime, row_id: int) -> str:
+    """Opaque cursor pointing just after the row with this sort key."""
+    raw = json.dumps([timestamp.isoformat(), row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        timestamp, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+TOTAL_EXACT = "exact"
+TOTAL_ESTIMATE = "estimate"
+TOTAL_NONE = "none"
+TotalMode = Literal["exact", "estimate", "none"]
+Query = Union[Select, StatementLambdaElement]
+
+
+async def count_total(
+    db: AsyncSession,
+    query: Query,
+    count_query: Query,
+    mode: str,
+    filtered: bool,
+) -> Optional[int]:
+    """Row count for a list query according to the requested total mode.
+
+    ``estimate`` reads the planner's statistics on PostgreSQL: ``reltuples``
+    for an unfiltered table and the EXPLAIN row estimate otherwise. Other
+    databases, and tables that were never analyzed, fall back to an exact count.
+    """
+    if mode == TOTAL_NONE:
+        return None
+
+    if mode == TOTAL_ESTIMATE and db.get_bind().dialect.name == "postgresql":
+        estimate = await _estimate_rows(db, query, filtered)
+        if estimate is not None:
+            return estimate
+
+    result = await db.execute(count_query)
+    return result.scalar()
+
+
+async def _estimate_rows(db: AsyncSession, query: Query, filtered: bool) -> Optional[int]:
+    if not filtered:
+        table = query.get_final_froms()[0]
+        result = await db.execute(
+            text("SELECT reltuples::bigint FROM pg_class WHERE oid = CAST(:name AS regclass)"),
+            {"name": table.name},
+        )
+        estimate = result.scalar()
+        # reltuples is -1 (or 0 on older servers) until the table is analyzed
+        return estimate if estimate and estimate > 0 else None
+
+    # Filter values stay bound parameters; they are never spliced into the SQL text
+    conn = await db.connection()
+    compiled = query.compile(dialect=conn.dialect)
+    params = compiled.params
+    if compiled.positiontup is not None:
+        params = tuple(params[name] for name in compiled.positiontup)
+    result = await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled.string}", params)
+    plan = result.scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def page_fields(
+    items: List[Any],
+    total: Optional[int],
+    page: int,
+    size: int,
+    total_mode: str,
+    sort_key: Callable[[Any], Tuple[datetime, int]],
+) -> Dict[str, Any]:
+    """Fields of a list response, trimming the extra row fetched in ``none`` mode."""
+    has_more = None
+    if total_mode == TOTAL_NONE:
+        has_more = len(items) > size
+        items = items[:size]
+        full_page = has_more
+    else:
+        full_page = len(items) == size
+
+    return {
+        "items": items,
+        "total": total,
+        "page": page,
+        "size": size,
+        "pages": (math.ceil(total / size) if total > 0 else 1) if total is not None else None,
+        "has_more": has_more,
+        "total_mode": total_mode,
+        "next_cursor": encode_cursor(*sort_key(items[-1])) if full_page and items else None,
+    }
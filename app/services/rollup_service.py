@@ -0,0 +1,248 @@
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Set, Tuple, Type
+from sqlalchemy import select, func, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import get_settings
+from app.models.observation import WeatherObservation
+from app.models.rollup import RollupColumns, RollupWatermark, WeatherDailyRollup, WeatherHourlyRollup
+from app.models.weather import normalize_key
+
+BUCKET_HOUR = "hour"
+BUCKET_DAY = "day"
+
+ROLLUP_MODELS: Dict[str, Type[RollupColumns]] = {
+    BUCKET_HOUR: WeatherHourlyRollup,
+    BUCKET_DAY: WeatherDailyRollup,
+}
+BUCKET_SPANS = {BUCKET_HOUR: timedelta(hours=1), BUCKET_DAY: timedelta(days=1)}
+DEFAULT_WINDOWS = {BUCKET_HOUR: timedelta(days=2), BUCKET_DAY: timedelta(days=30)}
+SQLITE_BUCKET_FORMATS = {BUCKET_HOUR: "%Y-%m-%d %H:00:00", BUCKET_DAY: "%Y-%m-%d 00:00:00"}
+
+METRICS = ("temperature", "humidity", "pressure")
+WATERMARK_NAME = "weather_rollups"
+KEY_CHUNK_SIZE = 500
+
+
+def truncate(value: datetime, bucket: str) -> datetime:
+    value = value.replace(minute=0, second=0, microsecond=0)
+    if bucket == BUCKET_DAY:
+        value = value.replace(hour=0)
+    return value
+
+
+def to_naive_utc(value: datetime) -> datetime:
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+class RollupService:
+    """Hourly and daily per-city aggregates of the observation history.
+    
+    ``refresh`` reads observations ingested after the stored watermark,
+    recomputes only the buckets they fall into from the raw history and
+    then moves the watermark forward, all in the caller's transaction.
+    
+    ``ingested_at`` is stamped before the writer commits, so a slow
+    transaction can make rows visible below a watermark that another
+    refresh already moved past. The watermark therefore never advances
+    beyond the database clock minus ``settle_seconds``; rows younger than
+    that are folded by a later refresh.
+    """
+    
+    def __init__(self, db: AsyncSession, settle_seconds: Optional[float] = None, batch_size: Optional[int] = None):
+        settings = get_settings()
+        self.db = db
+        self.settle_seconds = settings.rollup_settle_seconds if settle_seconds is None else settle_seconds
+        self.batch_size = batch_size or settings.rollup_batch_size
+    
+    @property
+    def dialect(self) -> str:
+        return self.db.get_bind().dialect.name
+    
+    def _insert(self):
+        return postgresql.insert if self.dialect == "postgresql" else sqlite.insert
+    
+    def _bucket_expr(self, bucket: str):
+        if self.dialect == "postgresql":
+            return func.date_trunc(bucket, WeatherObservation.data_timestamp)
+        return func.strftime(SQLITE_BUCKET_FORMATS[bucket], WeatherObservation.data_timestamp)
+    
+    async def get_watermark(self) -> Optional[datetime]:
+        return await self.db.scalar(
+            select(RollupWatermark.ingested_at).where(RollupWatermark.name == WATERMARK_NAME)
+        )
+    
+    async def next_pending(self) -> Optional[datetime]:
+        """Earliest settled ``ingested_at`` not yet folded into the rollups."""
+        query = select(func.min(WeatherObservation.ingested_at)).where(
+            WeatherObservation.ingested_at <= await self.horizon()
+        )
+        watermark = await self.get_watermark()
+        if watermark is not None:
+            query = query.where(WeatherObservation.ingested_at > watermark)
+        return await self.db.scalar(query)
+    
+    async def horizon(self) -> datetime:
+        """Latest ``ingested_at`` no open write transaction can still commit below."""
+        if self.dialect == "postgresql":
+            now = await self.db.scalar(select(func.timezone("UTC", func.clock_timestamp())))
+        else:
+            now = datetime.utcnow()
+        return now - timedelta(seconds=self.settle_seconds)
+    
+    async def refresh(self, until: Optional[datetime] = None) -> int:
+        """Fold settled observations ingested since the watermark (up to ``until``) into the rollups.
+        
+        Works through at most ``batch_size`` observations at a time.
+        Returns the number of rollup rows written.
+        """
+        horizon = await self.horizon()
+        until = horizon if until is None else min(until, horizon)
+        
+        written = 0
+        while True:
+            batch_written = await self._refresh_batch(until)
+            if batch_written is None:
+                return written
+            written += batch_written
+    
+    async def _refresh_batch(self, until: datetime) -> Optional[int]:
+        pending = [WeatherObservation.ingested_at <= until]
+        watermark = await self.get_watermark()
+        if watermark is not None:
+            pending.append(WeatherObservation.ingested_at > watermark)
+        
+        # End the batch at the batch_size-th pending ingestion time; rows sharing it stay together
+        cutoff = await self.db.scalar(
+            select(WeatherObservation.ingested_at)
+            .where(*pending)
+            .order_by(WeatherObservation.ingested_at)
+            .offset(self.batch_size - 1)
+            .limit(1)
+        )
+        if cutoff is not None:
+            pending[0] = WeatherObservation.ingested_at <= cutoff
+        
+        rows = (await self.db.execute(
+            select(
+                WeatherObservation.city_key,
+                WeatherObservation.country_key,
+                WeatherObservation.data_timestamp,
+                WeatherObservation.ingested_at,
+            ).where(*pending)
+        )).all()
+        if not rows:
+            return None
+        
+        written = 0
+        for bucket, model in ROLLUP_MODELS.items():
+            touched = {(row.city_key, row.country_key, truncate(row.data_timestamp, bucket)) for row in rows}
+            written += await self._recompute(bucket, model, touched)
+        
+        await self._set_watermark(max(row.ingested_at for row in rows))
+        return written
+    
+    async def _recompute(
+        self,
+        bucket: str,
+        model: Type[RollupColumns],
+        touched: Set[Tuple[str, str, datetime]],
+    ) -> int:
+        by_key: Dict[Tuple[str, str], List[datetime]] = {}
+        for city_key, country_key, start in touched:
+            by_key.setdefault((city_key, country_key), []).append(start)
+        
+        keys = sorted(by_key)
+        bucket_expr = self._bucket_expr(bucket).label("bucket_start")
+        aggregates = [func.count().label("samples")]
+        for metric in METRICS:
+            column = getattr(WeatherObservation, metric)
+            aggregates += [
+                func.min(column).label(f"{metric}_min"),
+                func.max(column).label(f"{metric}_max"),
+                func.avg(column).label(f"{metric}_avg"),
+            ]
+        
+        now = datetime.utcnow()
+        insert = self._insert()
+        written = 0
+        for start in range(0, len(keys), KEY_CHUNK_SIZE):
+            chunk = keys[start:start + KEY_CHUNK_SIZE]
+            starts = [bucket_start for key in chunk for bucket_start in by_key[key]]
+            query = (
+                select(
+                    WeatherObservation.city_key,
+                    WeatherObservation.country_key,
+                    bucket_expr,
+                    func.max(WeatherObservation.city).label("city"),
+                    func.max(WeatherObservation.country).label("country"),
+                    *aggregates,
+                )
+                .where(
+                    tuple_(WeatherObservation.city_key, WeatherObservation.country_key).in_(chunk),
+                    WeatherObservation.data_timestamp >= min(starts),
+                    WeatherObservation.data_timestamp < max(starts) + BUCKET_SPANS[bucket],
+                )
+                .group_by(WeatherObservation.city_key, WeatherObservation.country_key, bucket_expr)
+            )
+            
+            values = []
+            for row in (await self.db.execute(query)).mappings():
+                value = dict(row)
+                if isinstance(value["bucket_start"], str):
+                    value["bucket_start"] = datetime.fromisoformat(value["bucket_start"])
+                # Untouched buckets inside the scanned range are already current
+                if (value["city_key"], value["country_key"], value["bucket_start"]) not in touched:
+                    continue
+                value["updated_at"] = now
+                values.append(value)
+            
+            if not values:
+                continue
+            stmt = insert(model).values(values)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[model.city_key, model.country_key, model.bucket_start],
+                set_={
+                    column.name: stmt.excluded[column.name]
+                    for column in model.__table__.columns
+                    if not column.primary_key
+                },
+            )
+            await self.db.execute(stmt)
+            written += len(values)
+        
+        return written
+    
+    async def _set_watermark(self, ingested_at: datetime) -> None:
+        stmt = self._insert()(RollupWatermark).values(
+            name=WATERMARK_NAME, ingested_at=ingested_at, updated_at=datetime.utcnow()
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[RollupWatermark.name],
+            set_={"ingested_at": stmt.excluded.ingested_at, "updated_at": stmt.excluded.updated_at},
+        )
+        await self.db.execute(stmt)
+    
+    async def get_stats(
+        self,
+        city: str,
+        bucket: str,
+        start: datetime,
+        end: datetime,
+        country: Optional[str] = None,
+    ) -> List[RollupColumns]:
+        """Rollup rows of a city whose bucket starts in [start, end)."""
+        model = ROLLUP_MODELS[bucket]
+        query = select(model).where(
+            model.city_key == normalize_key(city),
+            model.bucket_start >= truncate(to_naive_utc(start), bucket),
+            model.bucket_start < to_naive_utc(end),
+        )
+        if country:
+            query = query.where(model.country_key == normalize_key(country))
+        
+        query = query.order_by(model.bucket_start, model.country_key)
+        result = await self.db.execute(query)
+        return list(result.scalars().all())
@@ -0,0 +1,216 @@
+import asyncio
+import math
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+import numpy as np
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.database import primary_session
+from app.models.weather import Weather
+
+EARTH_RADIUS_KM = 6371.0088
+
+# Session.info key mapping each index to the locations written in the open transaction
+PENDING_LOCATIONS = "spatial_index_locations"
+
+# (weather id, latitude, longitude); a row without coordinates leaves the index
+Location = Tuple[int, Optional[float], Optional[float]]
+
+
+def unit_vectors(latitudes: Any, longitudes: Any) -> np.ndarray:
+    """Points on the unit sphere, shape (n, 3), for coordinates in degrees."""
+    lat = np.radians(np.asarray(latitudes, dtype=np.float64))
+    lon = np.radians(np.asarray(longitudes, dtype=np.float64))
+    cos_lat = np.cos(lat)
+    return np.stack((cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)), axis=-1)
+
+
+def chord_to_km(chord: np.ndarray) -> np.ndarray:
+    """Great-circle distance for straight-line distances between unit vectors."""
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(chord / 2, 0.0, 1.0))
+
+
+class SpatialIndex:
+    """Nearest-city lookups over unit vectors of the stored coordinates.
+    
+    Vectors live in one contiguous array, so a k-nearest query is a single
+    matrix-vector product plus a partial sort. Writers' entries are updated
+    in place once their transaction commits; rows changed by another
+    worker are marked dirty and re-read by id before the next query. While
+    ``trusted`` is false, changes elsewhere may go unreported, so every
+    refresh reloads the whole index.
+    """
+    
+    def __init__(self, capacity: int = 256):
+        self._vectors = np.empty((capacity, 3), dtype=np.float64)
+        self._ids = np.empty(capacity, dtype=np.int64)
+        self._slots: Dict[int, int] = {}
+        self._dirty: Set[int] = set()
+        self._lock: Optional[asyncio.Lock] = None
+        # Ids committed while a refresh is reading; its rows for them may be older
+        self._committed_during_refresh: Optional[Set[int]] = None
+        self.loaded = False
+        self.trusted = True
+        
+        self.full_loads = 0
+        self.partial_loads = 0
+        self.queries = 0
+    
+    def __len__(self) -> int:
+        return len(self._slots)
+    
+    def upsert(self, weather_id: int, latitude: Optional[float], longitude: Optional[float]) -> None:
+        if latitude is None or longitude is None:
+            self.remove(weather_id)
+            return
+        
+        slot = self._slots.get(weather_id)
+        if slot is None:
+            slot = len(self._slots)
+            if slot == len(self._ids):
+                self._vectors = np.resize(self._vectors, (slot * 2, 3))
+                self._ids = np.resize(self._ids, slot * 2)
+            self._slots[weather_id] = slot
+            self._ids[slot] = weather_id
+        self._vectors[slot] = unit_vectors(latitude, longitude)
+    
+    def remove(self, weather_id: int) -> None:
+        slot = self._slots.pop(weather_id, None)
+        if slot is None:
+            return
+        last = len(self._slots)
+        if slot != last:
+            moved = int(self._ids[last])
+            self._ids[slot] = moved
+            self._vectors[slot] = self._vectors[last]
+            self._slots[moved] = slot
+    
+    def apply(self, session: Session, locations: Iterable[Location]) -> None:
+        """Update entries for rows written in ``session`` once its transaction commits."""
+        pending = session.info.setdefault(PENDING_LOCATIONS, {}).setdefault(self, {})
+        for weather_id, latitude, longitude in locations:
+            pending[weather_id] = (latitude, longitude)
+    
+    def apply_committed(self, locations: Dict[int, Tuple[Optional[float], Optional[float]]]) -> None:
+        for weather_id, (latitude, longitude) in locations.items():
+            self.upsert(weather_id, latitude, longitude)
+        if self._committed_during_refresh is not None:
+            self._committed_during_refresh.update(locations)
+    
+    def mark_dirty(self, weather_ids: Iterable[int]) -> None:
+        self._dirty.update(weather_ids)
+    
+    def clear(self) -> None:
+        """Forget everything; the next refresh reloads all rows."""
+        self._slots.clear()
+        self._dirty.clear()
+        self.loaded = False
+    
+    async def refresh(self, db: AsyncSession) -> None:
+        """Load the index on first use and re-read dirty entries.
+        
+        Reads go to the primary when ``db`` is a replica session: a dirty id
+        re-read from a lagging replica would keep its old coordinates until
+        the row changes again.
+        """
+        if self.loaded and not self._dirty and self.trusted:
+            return
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        
+        async with self._lock, primary_session(db) as db:
+            self._committed_during_refresh = set()
+            try:
+                if not self.loaded or not self.trusted:
+                    self._dirty = set()
+                    result = await db.execute(
+                        select(Weather.id, Weather.latitude, Weather.longitude)
+                        .where(Weather.latitude.is_not(None), Weather.longitude.is_not(None))
+                    )
+                    self._slots.clear()
+                    for weather_id, latitude, longitude in result.all():
+                        self.upsert(weather_id, latitude, longitude)
+                    self.loaded = True
+                    self.full_loads += 1
+                elif self._dirty:
+                    ids, self._dirty = self._dirty, set()
+                    result = await db.execute(
+                        select(Weather.id, Weather.latitude, Weather.longitude).where(Weather.id.in_(ids))
+                    )
+                    found = {weather_id: (latitude, longitude) for weather_id, latitude, longitude in result.all()}
+                    for weather_id in ids:
+                        self.upsert(weather_id, *found.get(weather_id, (None, None)))
+                    self.partial_loads += 1
+            finally:
+                self._dirty |= self._committed_during_refresh
+                self._committed_during_refresh = None
+    
+    def nearest(
+        self,
+        latitude: float,
+        longitude: float,
+        k: int,
+        radius_km: Optional[float] = None,
+    ) -> List[Tuple[int, float]]:
+        """Up to ``k`` (weather id, distance in km) pairs, closest first."""
+        self.queries += 1
+        size = len(self._slots)
+        if size == 0 or k <= 0:
+            return []
+        
+        lat, lon = math.radians(latitude), math.radians(longitude)
+        query = np.array((math.cos(lat) * math.cos(lon), math.cos(lat) * math.sin(lon), math.sin(lat)))
+        vectors = self._vectors[:size]
+        similarity = vectors @ query
+        
+        candidates = None
+        if radius_km is not None:
+            angle = min(radius_km / EARTH_RADIUS_KM, math.pi)
+            candidates = np.flatnonzero(similarity >= math.cos(angle) - 1e-12)
+            similarity = similarity[candidates]
+        
+        if len(similarity) > k:
+            order = np.argpartition(-similarity, k - 1)[:k]
+        else:
+            order = np.arange(len(similarity))
+        order = order[np.argsort(-similarity[order], kind="stable")]
+        
+        slots = order if candidates is None else candidates[order]
+        distances = chord_to_km(np.linalg.norm(vectors[slots] - query, axis=1))
+        if radius_km is not None:
+            keep = distances <= radius_km
+            slots, distances = slots[keep], distances[keep]
+        return [(int(weather_id), float(distance)) for weather_id, distance in zip(self._ids[slots], distances)]
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": len(self._slots),
+            "loaded": self.loaded,
+            "trusted": self.trusted,
+            "dirty": len(self._dirty),
+            "full_loads": self.full_loads,
+            "partial_loads": self.partial_loads,
+            "queries": self.queries,
+        }
+
+
+_spatial_index: Optional[SpatialIndex] = None
+
+
+def get_spatial_index() -> SpatialIndex:
+    global _spatial_index
+    if _spatial_index is None:
+        _spatial_index = SpatialIndex()
+    return _spatial_index
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_after_commit(session: Session) -> None:
+    pending = session.info.pop(PENDING_LOCATIONS, None)
+    for index, locations in (pending or {}).items():
+        index.apply_committed(locations)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session: Session) -> None:
+    session.info.pop(PENDING_LOCATIONS, None)
@@ -0,0 +1,138 @@
+import hashlib
+import math
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Tuple
+
+# (main, description) pairs ordered by increasing cloudiness
+CONDITIONS = [
+    ("Clear", "clear sky"),
+    ("Clouds", "few clouds"),
+    ("Clouds", "scattered clouds"),
+    ("Clouds", "broken clouds"),
+    ("Clouds", "overcast clouds"),
+]
+PRECIPITATION = {
+    "Rain": "rain",
+    "Snow": "snow",
+    "Drizzle": "light intensity drizzle",
+    "Thunderstorm": "thunderstorm",
+}
+
+DAY_SECONDS = 86400.0
+
+
+class SyntheticWeatherProvider:
+    """Deterministic weather generator seeded by the city name.
+
+    Every city gets stable coordinates and climate from a hash of its
+    normalized name and country. Values are smooth functions of time (a daily
+    cycle plus slow multi-day waves), so two calls at the same instant return
+    identical data and nearby instants return nearby values.
+    """
+
+    def __init__(self, seed: str = ""):
+        self.seed = seed
+
+    @staticmethod
+    def split_query(query: str) -> Tuple[str, str]:
+        parts = query.split(",")
+        city = parts[0].strip()
+        country = parts[1].strip() if len(parts) > 1 and parts[1].strip() else "Unknown"
+        return city, country
+
+    def _unit(self, city: str, country: str, label: str) -> float:
+        """Stable pseudo-random number in [0, 1) for a city and a named quantity."""
+        key = f"{self.seed}|{city.strip().casefold()}|{country.strip().casefold()}|{label}"
+        digest = hashlib.sha256(key.encode("utf-8")).digest()
+        return int.from_bytes(digest[:8], "big") / 2 ** 64
+
+    def provider_id(self, city: str, country: str) -> int:
+        return 1 + int(self._unit(city, country, "id") * 9_999_999)
+
+    def coordinates(self, city: str, country: str) -> Tuple[float, float]:
+        latitude = -55 + self._unit(city, country, "lat") * 125
+        longitude = -180 + self._unit(city, country, "lon") * 360
+        return round(latitude, 4), round(longitude, 4)
+
+    def _wave(self, city: str, country: str, label: str, t: float, period_days: float) -> float:
+        phase = self._unit(city, country, label) * 2 * math.pi
+        return math.sin(2 * math.pi * t / (period_days * DAY_SECONDS) + phase)
+
+    def observe(self, city: str, country: str, at: Optional[datetime] = None) -> Dict[str, Any]:
+        """Weather values for a city at a moment (naive datetimes are UTC)."""
+        if at is None:
+            at = datetime.utcnow()
+        if at.tzinfo is not None:
+            at = at.astimezone(timezone.utc).replace(tzinfo=None)
+        t = (at - datetime(1970, 1, 1)).total_seconds()
+
+        latitude, longitude = self.coordinates(city, country)
+
+        # Climate: warmer near the equator, plus a per-city offset
+        base = 28 - 0.45 * abs(latitude) + (self._unit(city, country, "climate") - 0.5) * 8
+        local_hour = ((t / 3600) + longitude / 15) % 24
+        daily = math.sin(2 * math.pi * (local_hour - 9) / 24)
+        synoptic = self._wave(city, country, "synoptic", t, 4.3)
+        slow = self._wave(city, country, "slow", t, 17.0)
+
+        temperature = base + 5 * daily + 4 * synoptic + 2 * slow
+        humidity = 60 - 18 * daily + 15 * self._wave(city, country, "humid", t, 3.1)
+        pressure = 1013 + 11 * synoptic + 4 * self._wave(city, country, "press", t, 1.7)
+        wind_speed = 4.5 + 3.5 * self._wave(city, country, "wind", t, 2.3) + 1.5 * abs(synoptic)
+        wind_direction = (self._unit(city, country, "wdir") * 360 + 40 * slow) % 360
+        cloudiness = 50 - 45 * self._wave(city, country, "cloud", t, 2.9)
+        visibility = 10000 - 80 * max(0.0, cloudiness - 40)
+
+        temperature = round(temperature, 1)
+        cloudiness = int(round(min(100, max(0, cloudiness))))
+        main, description = CONDITIONS[min(len(CONDITIONS) - 1, cloudiness // 20)]
+        if cloudiness >= 85 and humidity >= 70:
+            main = "Snow" if temperature < 0 else ("Thunderstorm" if temperature > 24 else "Rain")
+            description = PRECIPITATION[main]
+        elif cloudiness >= 75 and humidity >= 75:
+            main = "Drizzle"
+            description = PRECIPITATION[main]
+
+        return {
+            "provider_id": self.provider_id(city, country),
+            "city": city,
+            "country": country,
+            "latitude": latitude,
+            "longitude": longitude,
+            "temperature": temperature,
+            "feels_like": round(temperature - 0.15 * wind_speed + 0.02 * (humidity - 50), 1),
+            "humidity": round(min(100, max(5, humidity)), 1),
+            "pressure": round(pressure, 1),
+            "wind_speed": round(max(0.0, wind_speed), 1),
+            "wind_direction": int(wind_direction) % 360,
+            "cloudiness": cloudiness,
+            "weather_description": description,
+            "weather_main": main,
+            "visibility": int(visibility),
+            "data_timestamp": at,
+        }
+
+    def owm_payload(self, city: str, country: str, at: Optional[datetime] = None) -> Dict[str, Any]:
+        """Observation rendered in the OpenWeatherMap current weather format."""
+        values = self.observe(city, country, at)
+        dt = int((values["data_timestamp"] - datetime(1970, 1, 1)).total_seconds())
+        return {
+            "id": values["provider_id"],
+            "name": values["city"],
+            "coord": {"lat": values["latitude"], "lon": values["longitude"]},
+            "sys": {"country": values["country"]},
+            "main": {
+                "temp": values["temperature"],
+                "feels_like": values["feels_like"],
+                "humidity": values["humidity"],
+                "pressure": values["pressure"],
+            },
+            "wind": {"speed": values["wind_speed"], "deg": values["wind_direction"]},
+            "clouds": {"all": values["cloudiness"]},
+            "weather": [{
+                "main": values["weather_main"],
+                "description": values["weather_description"],
+            }],
+            "visibility": values["visibility"],
+            "dt": dt,
+        }
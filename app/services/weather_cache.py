@@ -0,0 +1,121 @@
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, Optional, Set, Tuple
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.config import get_settings
+from app.schemas.weather import WeatherSnapshot
+from app.services.ttl_cache import TTLCache
+
+# Session.info key holding cache keys to drop again once the transaction commits
+PENDING_INVALIDATIONS = "weather_cache_invalidations"
+
+
+def id_cache_key(weather_id: int) -> Tuple[Any, ...]:
+    return ("id", weather_id)
+
+
+def city_cache_key(city_key: str, country_key: Optional[str]) -> Tuple[Any, ...]:
+    return ("city", city_key, country_key)
+
+
+def row_keys(weather_id: int, city_key: str, country_key: str) -> Set[Tuple[Any, ...]]:
+    """Every cache key a stored row can be served under."""
+    return {
+        id_cache_key(weather_id),
+        city_cache_key(city_key, country_key),
+        city_cache_key(city_key, None),
+    }
+
+
+class WeatherReadCache:
+    """Read-through cache of immutable weather snapshots.
+    
+    Writers drop the affected keys right away and once more after their
+    transaction commits, so a reader that loaded the old row in between
+    cannot keep it. A load that overlaps an invalidation is not stored.
+    Loads from a replica are never stored either: a lagging replica can
+    still return the row a committed write just invalidated. While
+    ``enabled`` is false (nothing is delivering invalidations from other
+    workers) every read goes to the loader.
+    """
+    
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.cache = TTLCache(ttl_seconds=ttl_seconds, max_entries=max_entries)
+        self.enabled = True
+        self.generation = 0
+        self.invalidations = 0
+    
+    async def get_or_load(
+        self,
+        key: Hashable,
+        loader: Callable[[], Awaitable[Optional[WeatherSnapshot]]],
+        store: bool = True,
+        fresh: bool = False,
+    ) -> Optional[WeatherSnapshot]:
+        """Cached snapshot for ``key``, loading it on a miss.
+        
+        ``store=False`` is for loaders that may read stale data: the result
+        is returned but not cached. ``fresh=True`` is for loaders that must
+        see the latest commit: the cached entry and any load already in
+        flight are skipped, and the result replaces the cached entry.
+        """
+        if not self.enabled:
+            return await loader()
+        
+        generation = self.generation
+        if fresh:
+            value = await loader()
+            if value is not None and self.generation == generation:
+                self.cache.set(key, value)
+            return value
+        
+        value = self.cache.get(key)
+        if value is not None:
+            return value
+        
+        value = await self.cache.load(key, loader, store=store)
+        if self.generation != generation:
+            self.cache.pop(key)
+        return value
+    
+    def invalidate(self, keys: Iterable[Hashable]) -> None:
+        self.generation += 1
+        for key in keys:
+            if self.cache.pop(key) is not None:
+                self.invalidations += 1
+    
+    def invalidate_on_commit(self, session: Session, keys: Set[Hashable]) -> None:
+        self.invalidate(keys)
+        session.info.setdefault(PENDING_INVALIDATIONS, set()).update(keys)
+    
+    def clear(self) -> None:
+        self.generation += 1
+        self.cache.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        return {**self.cache.stats(), "enabled": self.enabled, "invalidations": self.invalidations}
+
+
+_weather_cache: Optional[WeatherReadCache] = None
+
+
+def get_weather_cache() -> WeatherReadCache:
+    global _weather_cache
+    if _weather_cache is None:
+        settings = get_settings()
+        _weather_cache = WeatherReadCache(
+            ttl_seconds=settings.weather_cache_ttl_seconds,
+            max_entries=settings.weather_cache_max_entries,
+        )
+    return _weather_cache
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session: Session) -> None:
+    keys = session.info.pop(PENDING_INVALIDATIONS, None)
+    if keys:
+        get_weather_cache().invalidate(keys)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session: Session) -> None:
+    session.info.pop(PENDING_INVALIDATIONS, None)
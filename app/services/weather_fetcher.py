@@ -1,39 +1,204 @@
+import asyncio
+import logging
 import httpx
+from dataclasses import dataclass
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Sequence, Tuple
 from app.config import get_settings
 from app.schemas.weather import WeatherCreate
+from app.services.http_client import get_http_client
+from app.services.fetch_engine import FetchEngine, get_fetch_engine
+from app.services.ttl_cache import TTLCache
+from app.services.synthetic_weather import SyntheticWeatherProvider
+from app.services.resilience import (
+    RETRYABLE_STATUS_CODES,
+    CircuitBreaker,
+    ProviderError,
+    RetryPolicy,
+    get_circuit_breaker,
+    get_retry_policy,
+    parse_retry_after,
+)
+
+logger = logging.getLogger(__name__)
+
+PROVIDER_NAME = "openweathermap"
+
+# Where the data in a FetchResult came from
+SOURCE_LIVE = "live"
+SOURCE_CACHED = "cached"
+SOURCE_SYNTHETIC = "synthetic"
+SOURCE_UNAVAILABLE = "unavailable"
+
+
+@dataclass
+class FetchResult:
+    data: Optional[WeatherCreate]
+    source: str
+    error: Optional[str] = None
+
+
+_response_cache: Optional[TTLCache] = None
+
+
+def get_response_cache() -> TTLCache:
+    global _response_cache
+    if _response_cache is None:
+        settings = get_settings()
+        _response_cache = TTLCache(
+            ttl_seconds=settings.fetch_cache_ttl_seconds,
+            max_entries=settings.fetch_cache_max_entries,
+        )
+    return _response_cache
 
 
 class WeatherFetcher:
-    def __init__(self):
+    def __init__(
+        self,
+        client: Optional[httpx.AsyncClient] = None,
+        engine: Optional[FetchEngine] = None,
+        cache: Optional[TTLCache] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+    ):
         self.settings = get_settings()
         self.api_key = self.settings.weather_api_key
         self.api_url = self.settings.weather_api_url
+        self.group_url = self.settings.weather_api_group_url
+        self.group_size = max(1, self.settings.weather_api_group_size)
+        self.client = client or get_http_client()
+        self.engine = engine or get_fetch_engine()
+        self.cache = cache if cache is not None else get_response_cache()
+        self.breaker = breaker or get_circuit_breaker(PROVIDER_NAME)
+        self.retry_policy = retry_policy or get_retry_policy()
+        self.synthetic = SyntheticWeatherProvider()
     
     async def fetch_weather(self, city: str) -> Optional[WeatherCreate]:
+        return (await self.fetch(city)).data
+    
+    async def fetch(self, city: str) -> FetchResult:
         if not self.api_key:
-            return await self._get_mock_weather(city)
+            return FetchResult(await self._get_mock_weather(city), SOURCE_SYNTHETIC)
+        
+        key = self._cache_key(city)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return FetchResult(cached, SOURCE_CACHED)
         
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    self.api_url,
-                    params={
-                        "q": city,
-                        "appid": self.api_key,
-                        "units": "metric",
-                    },
-                    timeout=10.0,
-                )
-                
-                if response.status_code == 200:
-                    return self._parse_response(response.json())
+            weather = await self.cache.load(key, lambda: self._request_weather(city))
+        except ProviderError as e:
+            return FetchResult(None, SOURCE_UNAVAILABLE, error=str(e))
+        return FetchResult(weather, SOURCE_LIVE)
+    
+    @staticmethod
+    def _cache_key(city: str) -> Tuple[str, ...]:
+        return tuple(part.strip().casefold() for part in city.split(","))
+    
+    async def fetch_many(self, provider_ids: Sequence[int]) -> Dict[int, FetchResult]:
+        """Fetch cities by provider ID through the multi-city group endpoint."""
+        results: Dict[int, FetchResult] = {}
+        missing = []
+        for provider_id in dict.fromkeys(provider_ids):
+            cached = self.cache.get(("id", provider_id))
+            if cached is not None:
+                results[provider_id] = FetchResult(cached, SOURCE_CACHED)
+            else:
+                missing.append(provider_id)
+        
+        size = self.group_size
+        chunks = [missing[i:i + size] for i in range(0, len(missing), size)]
+        responses = await asyncio.gather(*(self._request_group(chunk) for chunk in chunks))
+        
+        for chunk, (weather_by_id, error) in zip(chunks, responses):
+            for provider_id in chunk:
+                weather = weather_by_id.get(provider_id)
+                if weather is not None:
+                    self.cache.set(("id", provider_id), weather)
+                    results[provider_id] = FetchResult(weather, SOURCE_LIVE)
+                else:
+                    results[provider_id] = FetchResult(
+                        None,
+                        SOURCE_UNAVAILABLE,
+                        error=error or f"City {provider_id} missing from group response",
+                    )
+        return results
+    
+    async def _request_group(
+        self, provider_ids: List[int]
+    ) -> Tuple[Dict[int, WeatherCreate], Optional[str]]:
+        try:
+            data = await self._get_json(
+                self.group_url,
+                {"id": ",".join(str(provider_id) for provider_id in provider_ids)},
+                f"group of {len(provider_ids)} cities",
+            )
+            weather_by_id = {}
+            for item in data.get("list", []):
+                weather = self._parse_response(item)
+                weather_by_id[weather.provider_id] = weather
+        except ValueError as e:
+            return {}, f"Invalid provider response: {e}"
+        except ProviderError as e:
+            return {}, str(e)
+        return weather_by_id, None
+    
+    async def _request_weather(self, city: str) -> WeatherCreate:
+        data = await self._get_json(self.api_url, {"q": city}, city)
+        try:
+            return self._parse_response(data)
+        except ValueError as e:
+            raise ProviderError(f"Invalid provider response: {e}")
+    
+    async def _get_json(self, url: str, params: Dict[str, Any], label: str) -> Dict[str, Any]:
+        attempts = self.retry_policy.attempts
+        params = {**params, "appid": self.api_key, "units": "metric"}
+        
+        for attempt in range(attempts):
+            # Fail fast before queueing for a slot while the provider is down
+            self.breaker.before_call()
+            retry_after = None
+            
+            try:
+                async with self.engine.slot():
+                    response = await self.client.get(url, params=params)
+            except httpx.HTTPError as e:
+                # Transport, decoding and redirect errors all count against the provider
+                self.breaker.record_failure()
+                error = f"{type(e).__name__}: {e}"
+            except BaseException:
+                # Cancelled or failed before reaching the provider: free a half-open trial slot
+                self.breaker.release()
+                raise
+            else:
+                status = response.status_code
+                if status >= 500:
+                    self.breaker.record_failure()
                 else:
-                    return await self._get_mock_weather(city)
-                    
-        except Exception:
-            return await self._get_mock_weather(city)
+                    # Rate limits and client errors still mean the provider is up
+                    self.breaker.record_success()
+                
+                if status == 200:
+                    try:
+                        return response.json()
+                    except ValueError as e:
+                        raise ProviderError(f"Invalid provider response: {e}")
+                
+                error = f"Provider returned HTTP {status}"
+                if status not in RETRYABLE_STATUS_CODES:
+                    raise ProviderError(error)
+                if status in (429, 503):
+                    retry_after = parse_retry_after(response.headers.get("retry-after"))
+            
+            if attempt == attempts - 1 or self.breaker.state == CircuitBreaker.OPEN:
+                break
+            delay = self.retry_policy.delay(attempt, retry_after)
+            if delay is None:
+                break
+            logger.warning(f"Fetch for {label} failed ({error}), retrying in {delay:.2f}s")
+            await asyncio.sleep(delay)
+        
+        raise ProviderError(f"{error} after {attempt + 1} attempt(s)")
     
     def _parse_response(self, data: Dict[str, Any]) -> WeatherCreate:
         main = data.get("main", {})
@@ -44,6 +209,7 @@ class WeatherFetcher:
         weather = data.get("weather", [{}])[0]
         
         return WeatherCreate(
+            provider_id=data.get("id"),
             city=data.get("name", "Unknown"),
             country=sys.get("country", "Unknown"),
             latitude=coord.get("lat"),
@@ -62,34 +228,8 @@ class WeatherFetcher:
         )
     
     async def _get_mock_weather(self, city: str) -> WeatherCreate:
-        import random
-        
-        parts = city.split(",")
-        city_name = parts[0].strip()
-        country = parts[1].strip() if len(parts) > 1 else "Unknown"
-        
-        temperature = round(random.uniform(-10, 35), 1)
-        
-        return WeatherCreate(
-            city=city_name,
-            country=country,
-            latitude=round(random.uniform(-90, 90), 4),
-            longitude=round(random.uniform(-180, 180), 4),
-            temperature=temperature,
-            feels_like=round(temperature + random.uniform(-3, 3), 1),
-            humidity=round(random.uniform(20, 100), 1),
-            pressure=round(random.uniform(990, 1030), 1),
-            wind_speed=round(random.uniform(0, 20), 1),
-            wind_direction=random.randint(0, 360),
-            cloudiness=random.randint(0, 100),
-            weather_description=random.choice([
-                "clear sky", "few clouds", "scattered clouds", 
-                "broken clouds", "shower rain", "rain", "thunderstorm",
-                "snow", "mist"
-            ]),
-            weather_main=random.choice([
-                "Clear", "Clouds", "Rain", "Drizzle", "Thunderstorm", "Snow", "Mist"
-            ]),
-            visibility=random.randint(1000, 10000),
-            data_timestamp=datetime.utcnow(),
-        )
+        city_name, country = self.synthetic.split_query(city)
+        values = self.synthetic.observe(city_name, country)
+        # Synthetic IDs do not exist at the real provider, so never store them
+        values.pop("provider_id")
+        return WeatherCreate(**values)
@@ -0,0 +1,229 @@
+import math
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import get_settings
+from app.schemas.weather import WeatherGridCell, WeatherGridResponse
+from app.services.columnar_snapshot import ColumnarSnapshot, get_columnar_snapshot
+from app.services.ttl_cache import TTLCache
+
+GRID_FIELDS = ("temperature", "humidity", "cloudiness")
+
+# Web Mercator stops at this latitude
+MAX_TILE_LATITUDE = 85.0511287798
+
+
+class GridTooLargeError(ValueError):
+    """The requested area would be split into more cells than allowed."""
+
+
+@dataclass
+class GridColumns:
+    """Latest readings as arrays, stamped with the data version they were read at."""
+    
+    version: int
+    latitudes: np.ndarray
+    longitudes: np.ndarray
+    values: np.ndarray
+
+
+def tile_bounds(x: int, y: int, n: int) -> Tuple[float, float, float, float]:
+    """(min_lon, min_lat, max_lon, max_lat) of Web Mercator tile x/y on an n x n tile grid."""
+    def latitude(row: float) -> float:
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * row / n))))
+    
+    return x / n * 360 - 180, latitude(y + 1), (x + 1) / n * 360 - 180, latitude(y)
+
+
+def bin_cells(
+    columns: np.ndarray,
+    rows: np.ndarray,
+    values: np.ndarray,
+    n_columns: int,
+    n_rows: int,
+) -> Dict[str, np.ndarray]:
+    """Counts and per-field means of the points in each occupied cell.
+    
+    ``columns``/``rows`` are fractional cell positions; points outside
+    ``[0, n_columns) x [0, n_rows)`` are dropped. Missing values (NaN) do
+    not count towards a field's mean.
+    """
+    inside = (columns >= 0) & (columns < n_columns) & (rows >= 0) & (rows < n_rows)
+    cell_ids = np.floor(rows[inside]).astype(np.int64) * n_columns + np.floor(columns[inside]).astype(np.int64)
+    occupied, inverse = np.unique(cell_ids, return_inverse=True)
+    values = values[inside]
+    present = ~np.isnan(values)
+    filled = np.where(present, values, 0.0)
+    
+    result = {
+        "row": occupied // n_columns,
+        "col": occupied % n_columns,
+        "count": np.bincount(inverse, minlength=len(occupied)),
+    }
+    for i, name in enumerate(GRID_FIELDS):
+        sums = np.bincount(inverse, weights=filled[:, i], minlength=len(occupied))
+        counts = np.bincount(inverse, weights=present[:, i], minlength=len(occupied))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            result[name] = sums / counts
+    return result
+
+
+class WeatherGrid:
+    """Per-cell aggregates of the latest readings for map rendering.
+    
+    The readings are sliced from the columnar snapshot, which re-reads rows
+    changed elsewhere on the primary, and only when its version moves.
+    Rendered grids are cached under their area and that version, so
+    repeated requests skip the binning and serialization entirely.
+    """
+    
+    def __init__(
+        self,
+        ttl_seconds: float,
+        max_entries: int,
+        max_cells: int,
+        snapshot: Optional[ColumnarSnapshot] = None,
+    ):
+        self.tiles = TTLCache(ttl_seconds=ttl_seconds, max_entries=max_entries)
+        self.max_cells = max_cells
+        self.snapshot = snapshot if snapshot is not None else get_columnar_snapshot()
+        self._columns: Optional[GridColumns] = None
+        self.loads = 0
+    
+    @property
+    def version(self) -> int:
+        return self.snapshot.version
+    
+    async def columns(self, db: AsyncSession) -> GridColumns:
+        """Located readings at the snapshot's current version, refreshing it first."""
+        snapshot = await self.snapshot.refresh(db)
+        if self._columns is None or self._columns.version != snapshot.version:
+            latitudes = snapshot.column("latitude")
+            longitudes = snapshot.column("longitude")
+            located = ~np.isnan(latitudes) & ~np.isnan(longitudes)
+            # Boolean indexing copies, so later writes to the snapshot do not leak in
+            values = np.stack([snapshot.column(name)[located] for name in GRID_FIELDS], axis=-1)
+            self._columns = GridColumns(snapshot.version, latitudes[located], longitudes[located], values)
+            self.loads += 1
+        return self._columns
+    
+    async def bbox(
+        self,
+        db: AsyncSession,
+        min_lon: float,
+        min_lat: float,
+        max_lon: float,
+        max_lat: float,
+        cell_deg: float,
+    ) -> bytes:
+        n_columns = math.ceil((max_lon - min_lon) / cell_deg)
+        n_rows = math.ceil((max_lat - min_lat) / cell_deg)
+        self._check_size(n_columns, n_rows)
+        data = await self.columns(db)
+        
+        async def render() -> bytes:
+            cells = bin_cells(
+                (data.longitudes - min_lon) / cell_deg,
+                (data.latitudes - min_lat) / cell_deg,
+                data.values, n_columns, n_rows,
+            )
+            
+            def bounds(row: int, col: int) -> List[float]:
+                return [
+                    min_lon + col * cell_deg,
+                    min_lat + row * cell_deg,
+                    min(min_lon + (col + 1) * cell_deg, max_lon),
+                    min(min_lat + (row + 1) * cell_deg, max_lat),
+                ]
+            
+            return self._render(data.version, cells, bounds, n_columns, n_rows, {
+                "bbox": [min_lon, min_lat, max_lon, max_lat],
+                "cell_deg": cell_deg,
+            })
+        
+        return await self._cached(("bbox", min_lon, min_lat, max_lon, max_lat, cell_deg), data.version, render)
+    
+    async def tile(self, db: AsyncSession, z: int, x: int, y: int, cells_per_side: int) -> bytes:
+        self._check_size(cells_per_side, cells_per_side)
+        n = 2 ** z
+        data = await self.columns(db)
+        
+        async def render() -> bytes:
+            latitudes = np.radians(np.clip(data.latitudes, -MAX_TILE_LATITUDE, MAX_TILE_LATITUDE))
+            tile_x = (data.longitudes + 180) / 360 * n - x
+            tile_y = (1 - np.log(np.tan(latitudes) + 1 / np.cos(latitudes)) / math.pi) / 2 * n - y
+            cells = bin_cells(
+                tile_x * cells_per_side, tile_y * cells_per_side,
+                data.values, cells_per_side, cells_per_side,
+            )
+            
+            def bounds(row: int, col: int) -> List[float]:
+                # A cell is a tile of the zoom level with cells_per_side times more tiles
+                return list(tile_bounds(x * cells_per_side + col, y * cells_per_side + row, n * cells_per_side))
+            
+            return self._render(data.version, cells, bounds, cells_per_side, cells_per_side, {
+                "bbox": list(tile_bounds(x, y, n)),
+                "tile": f"{z}/{x}/{y}",
+            })
+        
+        return await self._cached(("tile", z, x, y, cells_per_side), data.version, render)
+    
+    def _check_size(self, n_columns: int, n_rows: int) -> None:
+        if n_columns * n_rows > self.max_cells:
+            raise GridTooLargeError(
+                f"{n_columns}x{n_rows} cells requested; at most {self.max_cells} per grid"
+            )
+    
+    async def _cached(
+        self,
+        key: Tuple[Hashable, ...],
+        version: int,
+        render: Callable[[], Awaitable[bytes]],
+    ) -> bytes:
+        return await self.tiles.get_or_load((*key, version), render)
+    
+    @staticmethod
+    def _render(
+        version: int,
+        cells: Dict[str, np.ndarray],
+        bounds: Callable[[int, int], List[float]],
+        n_columns: int,
+        n_rows: int,
+        area: Dict[str, Any],
+    ) -> bytes:
+        columns = {name: values.tolist() for name, values in cells.items()}
+        items = [
+            WeatherGridCell(
+                row=row,
+                col=col,
+                bounds=bounds(row, col),
+                count=count,
+                **{name: _finite(columns[name][i]) for name in GRID_FIELDS},
+            )
+            for i, (row, col, count) in enumerate(zip(columns["row"], columns["col"], columns["count"]))
+        ]
+        response = WeatherGridResponse(version=version, rows=n_rows, cols=n_columns, cells=items, **area)
+        return response.model_dump_json().encode()
+    
+    def stats(self) -> Dict[str, Any]:
+        return {**self.tiles.stats(), "loads": self.loads, "version": self.version}
+
+
+def _finite(value: float) -> Optional[float]:
+    return round(value, 2) if math.isfinite(value) else None
+
+
+_weather_grid: Optional[WeatherGrid] = None
+
+
+def get_weather_grid() -> WeatherGrid:
+    global _weather_grid
+    if _weather_grid is None:
+        settings = get_settings()
+        _weather_grid = WeatherGrid(
+            ttl_seconds=settings.grid_cache_ttl_seconds,
+            max_entries=settings.grid_cache_max_entries,
+            max_cells=settings.grid_max_cells,
+        )
+    return _weather_grid
@@ -1,14 +1,55 @@
 from datetime import datetime
-from typing import Optional, List, Tuple
-from sqlalchemy import select, func, and_
+from typing import Any, AsyncIterator, Dict, Iterable, Optional, List, Sequence, Tuple
+from sqlalchemy import select, func, lambda_stmt, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.models.weather import Weather
-from app.schemas.weather import WeatherCreate, WeatherUpdate
+from app.config import get_settings
+from app.database import READ_REPLICA, READ_SOURCE, READ_YOUR_WRITES
+from app.services.pagination import TOTAL_EXACT, TOTAL_NONE, count_total
+from app.models.weather import Weather, normalize_key
+from app.schemas.weather import WeatherCreate, WeatherUpdate, WeatherSnapshot
+from app.services.columnar_snapshot import ColumnarSnapshot, Range, get_columnar_snapshot
+from app.services.invalidation_bus import RowRef, publish_invalidation
+from app.services.spatial_index import SpatialIndex, get_spatial_index
+from app.services.weather_cache import (
+    WeatherReadCache,
+    city_cache_key,
+    get_weather_cache,
+    id_cache_key,
+    row_keys,
+)
+
+# Columns an upsert never overwrites on an existing row
+UPSERT_PRESERVED_COLUMNS = {"id", "city_key", "country_key", "created_at"}
 
 
 class WeatherService:
-    def __init__(self, db: AsyncSession):
+    def __init__(
+        self,
+        db: AsyncSession,
+        cache: Optional[WeatherReadCache] = None,
+        index: Optional[SpatialIndex] = None,
+        snapshot: Optional[ColumnarSnapshot] = None,
+    ):
         self.db = db
+        self.cache = cache or get_weather_cache()
+        self.index = index if index is not None else get_spatial_index()
+        self.snapshot = snapshot if snapshot is not None else get_columnar_snapshot()
+    
+    async def invalidate(self, rows: Iterable[RowRef]) -> None:
+        """Drop cached snapshots of the changed rows here and, after commit, on other workers."""
+        rows = list(rows)
+        keys = set()
+        for row in rows:
+            keys |= row_keys(*row)
+        self.cache.invalidate_on_commit(self.db.sync_session, keys)
+        await publish_invalidation(self.db, rows)
+    
+    def _relocate(self, rows: Iterable[Weather]) -> None:
+        """Move written rows in the spatial index and columnar snapshot to their stored values."""
+        rows = list(rows)
+        self.index.apply(self.db.sync_session, ((row.id, row.latitude, row.longitude) for row in rows))
+        self.snapshot.apply(self.db.sync_session, rows)
     
     async def create(self, weather_data: WeatherCreate) -> Weather:
         data = weather_data.model_dump()
@@ -19,59 +60,192 @@ class WeatherService:
         self.db.add(weather)
         await self.db.flush()
         await self.db.refresh(weather)
+        await self.invalidate([(weather.id, weather.city_key, weather.country_key)])
+        self._relocate([weather])
         return weather
     
     async def get_by_id(self, weather_id: int) -> Optional[Weather]:
         result = await self.db.execute(
-            select(Weather).where(Weather.id == weather_id)
+            lambda_stmt(lambda: select(Weather).where(Weather.id == weather_id))
         )
         return result.scalar_one_or_none()
     
     async def get_by_city(self, city: str, country: Optional[str] = None) -> Optional[Weather]:
-        query = select(Weather).where(func.lower(Weather.city) == city.lower())
+        city_key = normalize_key(city)
+        query = lambda_stmt(lambda: select(Weather).where(Weather.city_key == city_key))
         if country:
-            query = query.where(func.lower(Weather.country) == country.lower())
+            country_key = normalize_key(country)
+            query += lambda q: q.where(Weather.country_key == country_key)
         
-        query = query.order_by(Weather.data_timestamp.desc()).limit(1)
+        query += lambda q: q.order_by(Weather.data_timestamp.desc()).limit(1)
         result = await self.db.execute(query)
         return result.scalar_one_or_none()
     
+    async def get_snapshot_by_id(self, weather_id: int) -> Optional[WeatherSnapshot]:
+        """Cached immutable copy of ``get_by_id``."""
+        async def load():
+            weather = await self.get_by_id(weather_id)
+            return WeatherSnapshot.model_validate(weather) if weather else None
+        
+        return await self.cache.get_or_load(id_cache_key(weather_id), load, **self._cache_options())
+    
+    async def get_snapshot_by_city(self, city: str, country: Optional[str] = None) -> Optional[WeatherSnapshot]:
+        """Cached immutable copy of ``get_by_city``."""
+        async def load():
+            weather = await self.get_by_city(city, country)
+            return WeatherSnapshot.model_validate(weather) if weather else None
+        
+        key = city_cache_key(normalize_key(city), normalize_key(country) if country else None)
+        return await self.cache.get_or_load(key, load, **self._cache_options())
+    
+    def _cache_options(self) -> Dict[str, bool]:
+        """Replica reads may be stale and are not cached; read-your-writes reads bypass the cache."""
+        source = self.db.info.get(READ_SOURCE)
+        return {"store": source != READ_REPLICA, "fresh": source == READ_YOUR_WRITES}
+    
+    async def get_nearest(
+        self,
+        latitude: float,
+        longitude: float,
+        k: int,
+        radius_km: Optional[float] = None,
+    ) -> List[Tuple[Weather, float]]:
+        """Closest cities with coordinates as (weather, distance in km), nearest first."""
+        await self.index.refresh(self.db)
+        hits = self.index.nearest(latitude, longitude, k, radius_km)
+        if not hits:
+            return []
+        
+        result = await self.db.execute(select(Weather).where(Weather.id.in_([weather_id for weather_id, _ in hits])))
+        rows = {weather.id: weather for weather in result.scalars().all()}
+        return [(rows[weather_id], distance) for weather_id, distance in hits if weather_id in rows]
+    
+    async def query_snapshot(
+        self,
+        country: Optional[str] = None,
+        weather_main: Optional[str] = None,
+        ranges: Optional[Dict[str, Range]] = None,
+        order_by: Optional[str] = None,
+        descending: bool = False,
+        limit: Optional[int] = None,
+    ) -> List[WeatherSnapshot]:
+        """Latest readings filtered, sorted and limited in memory from the columnar snapshot."""
+        snapshot = await self.snapshot.refresh(self.db)
+        slots = snapshot.select(
+            country_key=normalize_key(country) if country else None,
+            weather_main=weather_main,
+            ranges=ranges,
+            order_by=order_by,
+            descending=descending,
+            limit=limit,
+        )
+        return [WeatherSnapshot(**record) for record in snapshot.records(slots)]
+    
+    async def top(
+        self,
+        field: str,
+        n: int,
+        descending: bool = True,
+        country: Optional[str] = None,
+        weather_main: Optional[str] = None,
+        ranges: Optional[Dict[str, Range]] = None,
+    ) -> List[WeatherSnapshot]:
+        """The ``n`` cities with the highest (or lowest) ``field``, e.g. the hottest 50."""
+        return await self.query_snapshot(
+            country=country,
+            weather_main=weather_main,
+            ranges=ranges,
+            order_by=field,
+            descending=descending,
+            limit=n,
+        )
+    
     async def get_all(
         self,
         page: int = 1,
         size: int = 10,
         city: Optional[str] = None,
         country: Optional[str] = None,
-    ) -> Tuple[List[Weather], int]:
-        query = select(Weather)
-        count_query = select(func.count(Weather.id))
+        cursor: Optional[Tuple[datetime, int]] = None,
+        total_mode: str = TOTAL_EXACT,
+        columns: Optional[Sequence[str]] = None,
+    ) -> Tuple[List[Any], Optional[int]]:
+        """Page through weather rows, newest first.
+        
+        With ``cursor`` (the decoded (data_timestamp, id) of the last row seen)
+        the page starts right after that row instead of at an offset.
+        ``total_mode`` picks how the total is counted; with ``none`` the total
+        is None and up to ``size + 1`` rows are returned. With ``columns`` only
+        those columns are selected and plain rows are returned instead of
+        ``Weather`` objects.
+        """
+        if columns:
+            selected = tuple(getattr(Weather, name) for name in columns)
+            query = lambda_stmt(lambda: select(*selected))
+        else:
+            query = lambda_stmt(lambda: select(Weather))
+        count_query = lambda_stmt(lambda: select(func.count(Weather.id)))
         
-        conditions = []
+        # Each optional filter is its own cached lambda, so every combination
+        # of filters compiles once and later calls only bind new values
         if city:
-            conditions.append(func.lower(Weather.city) == city.lower())
+            city_key = normalize_key(city)
+            query += lambda q: q.where(Weather.city_key == city_key)
+            count_query += lambda q: q.where(Weather.city_key == city_key)
         if country:
-            conditions.append(func.lower(Weather.country) == country.lower())
-        
-        if conditions:
-            query = query.where(and_(*conditions))
-            count_query = count_query.where(and_(*conditions))
+            country_key = normalize_key(country)
+            query += lambda q: q.where(Weather.country_key == country_key)
+            count_query += lambda q: q.where(Weather.country_key == country_key)
         
-        total_result = await self.db.execute(count_query)
-        total = total_result.scalar()
+        total = await count_total(self.db, query, count_query, total_mode, filtered=bool(city or country))
         
-        offset = (page - 1) * size
-        query = query.order_by(Weather.data_timestamp.desc()).offset(offset).limit(size)
+        # Without a total, one extra row tells the caller whether a next page exists
+        limit = size + 1 if total_mode == TOTAL_NONE else size
+        query += lambda q: q.order_by(Weather.data_timestamp.desc(), Weather.id.desc()).limit(limit)
+        if cursor:
+            cursor_timestamp, cursor_id = cursor
+            query += lambda q: q.where(
+                tuple_(Weather.data_timestamp, Weather.id) < tuple_(cursor_timestamp, cursor_id)
+            )
+        else:
+            offset = (page - 1) * size
+            query += lambda q: q.offset(offset)
         
         result = await self.db.execute(query)
-        items = result.scalars().all()
+        items = result.all() if columns else result.scalars().all()
         
         return list(items), total
     
+    async def stream_all(
+        self,
+        city: Optional[str] = None,
+        country: Optional[str] = None,
+        fetch_size: int = 1000,
+    ) -> AsyncIterator[Weather]:
+        """Every row ``get_all`` would page through, read via a server-side cursor."""
+        query = select(Weather)
+        if city:
+            query = query.where(Weather.city_key == normalize_key(city))
+        if country:
+            query = query.where(Weather.country_key == normalize_key(country))
+        query = query.order_by(Weather.data_timestamp.desc(), Weather.id.desc())
+        
+        result = await self.db.stream_scalars(query.execution_options(yield_per=fetch_size))
+        try:
+            async for weather in result:
+                yield weather
+        finally:
+            # Closing the cursor stops the query when the consumer goes away
+            await result.close()
+    
     async def update(self, weather_id: int, weather_data: WeatherUpdate) -> Optional[Weather]:
         weather = await self.get_by_id(weather_id)
         if not weather:
             return None
         
+        # A rename moves the row to new city keys; both old and new are stale
+        old_row = (weather.id, weather.city_key, weather.country_key)
+        
         update_data = weather_data.model_dump(exclude_unset=True)
         for field, value in update_data.items():
             setattr(weather, field, value)
@@ -79,6 +253,8 @@ class WeatherService:
         weather.updated_at = datetime.utcnow()
         await self.db.flush()
         await self.db.refresh(weather)
+        await self.invalidate([old_row, (weather.id, weather.city_key, weather.country_key)])
+        self._relocate([weather])
         return weather
     
     async def delete(self, weather_id: int) -> bool:
@@ -86,21 +262,126 @@ class WeatherService:
         if not weather:
             return False
         
+        await self.invalidate([(weather.id, weather.city_key, weather.country_key)])
+        self.index.apply(self.db.sync_session, [(weather.id, None, None)])
+        self.snapshot.apply_delete(self.db.sync_session, [weather.id])
         await self.db.delete(weather)
         await self.db.flush()
         return True
     
     async def upsert_by_city(self, weather_data: WeatherCreate) -> Tuple[Weather, bool]:
-        existing = await self.get_by_city(weather_data.city, weather_data.country)
+        results = await self.bulk_upsert([weather_data])
+        return results[0]
+    
+    async def bulk_upsert(
+        self,
+        items: Sequence[WeatherCreate],
+        chunk_size: Optional[int] = None,
+    ) -> List[Tuple[Weather, bool]]:
+        """Insert or update the row for each city with one statement per chunk.
         
-        if existing:
-            update_dict = {k: v for k, v in weather_data.model_dump().items() if v is not None}
-            update_data = WeatherUpdate(**update_dict)
-            weather = await self.update(existing.id, update_data)
-            return weather, False
-        else:
-            weather = await self.create(weather_data)
-            return weather, True
+        Rows are matched on (city_key, country_key). When a city repeats in
+        ``items`` the reading with the latest data_timestamp wins, and fields
+        that are None keep their stored value. A reading older than the stored
+        one leaves the row unchanged; it is still returned, as not new.
+        Returns (weather, is_new) pairs.
+        """
+        now = datetime.utcnow()
+        rows = {}
+        for item in items:
+            row = self._insert_row(item, now)
+            key = (row["city_key"], row["country_key"])
+            current = rows.get(key)
+            if current is None or row["data_timestamp"] >= current["data_timestamp"]:
+                rows[key] = row
+        
+        rows = list(rows.values())
+        chunk_size = chunk_size or get_settings().bulk_upsert_chunk_size
+        insert = self._dialect_insert()
+        results = []
+        
+        for start in range(0, len(rows), chunk_size):
+            stmt = insert(Weather).values(rows[start:start + chunk_size])
+            update = {}
+            for column in Weather.__table__.columns:
+                if column.name in UPSERT_PRESERVED_COLUMNS:
+                    continue
+                if column.nullable:
+                    update[column.name] = func.coalesce(stmt.excluded[column.name], column)
+                else:
+                    update[column.name] = stmt.excluded[column.name]
+            
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[Weather.city_key, Weather.country_key],
+                set_=update,
+                # Same guard as the importer: a late, older reading never overwrites a newer one
+                where=Weather.data_timestamp <= stmt.excluded.data_timestamp,
+            ).returning(Weather)
+            
+            result = await self.db.scalars(stmt, execution_options={"populate_existing": True})
+            # Inserted rows carry the shared timestamp in both columns
+            results.extend((weather, weather.created_at == weather.updated_at) for weather in result.all())
+        
+        await self.invalidate((weather.id, weather.city_key, weather.country_key) for weather, _ in results)
+        self._relocate(weather for weather, _ in results)
+        
+        # Rows the guard skipped are not returned by the statement; report their stored state
+        written = {(weather.city_key, weather.country_key) for weather, _ in results}
+        skipped = [key for key in ((row["city_key"], row["country_key"]) for row in rows) if key not in written]
+        for start in range(0, len(skipped), chunk_size):
+            result = await self.db.scalars(
+                select(Weather).where(
+                    tuple_(Weather.city_key, Weather.country_key).in_(skipped[start:start + chunk_size])
+                )
+            )
+            results.extend((weather, False) for weather in result.all())
+        return results
+    
+    async def bulk_create(
+        self,
+        items: Sequence[WeatherCreate],
+        chunk_size: Optional[int] = None,
+    ) -> List[Optional[Weather]]:
+        """Insert new cities with one multi-row INSERT per chunk, skipping existing ones.
+        
+        Returns a list aligned with ``items``: the created row, or None when
+        the city already existed (or appeared earlier in ``items``).
+        """
+        now = datetime.utcnow()
+        rows = [self._insert_row(item, now) for item in items]
+        chunk_size = chunk_size or get_settings().bulk_upsert_chunk_size
+        insert = self._dialect_insert()
+        created = {}
+        
+        for start in range(0, len(rows), chunk_size):
+            stmt = insert(Weather).values(rows[start:start + chunk_size]).on_conflict_do_nothing(
+                index_elements=[Weather.city_key, Weather.country_key],
+            ).returning(Weather)
+            result = await self.db.scalars(stmt)
+            for weather in result.all():
+                created[(weather.city_key, weather.country_key)] = weather
+        
+        await self.invalidate((weather.id, weather.city_key, weather.country_key) for weather in created.values())
+        self._relocate(created.values())
+        return [created.pop((row["city_key"], row["country_key"]), None) for row in rows]
+    
+    @staticmethod
+    def _insert_row(item: WeatherCreate, now: datetime) -> dict:
+        row = item.model_dump()
+        if row.get("data_timestamp") is None:
+            row["data_timestamp"] = now
+        row["city_key"] = normalize_key(row["city"])
+        row["country_key"] = normalize_key(row["country"])
+        row["created_at"] = row["updated_at"] = now
+        return row
+    
+    def _dialect_insert(self):
+        dialect = self.db.get_bind().dialect.name
+        if dialect == "postgresql":
+            return postgresql.insert
+        if dialect == "sqlite":
+            return sqlite.insert
+        raise NotImplementedError(f"Upsert is not supported for {dialect}")
     
     async def get_cities_list(self) -> List[str]:
         query = select(Weather.city, Weather.country).distinct()
@@ -111,4 +392,10 @@ class WeatherService:
         """Get list of unique city names from the database."""
         query = select(Weather.city).distinct()
         result = await self.db.execute(query)
-        return [row[0] for row in result.all()]
\ No newline at end of file
+        return [row[0] for row in result.all()]
+    
+    async def get_fetch_targets(self) -> List[Tuple[int, str, str, Optional[int]]]:
+        """Get (id, city, country, provider city ID) for every stored row, the ID if one is known."""
+        query = select(Weather.id, Weather.city, Weather.country, Weather.provider_id).order_by(Weather.id)
+        result = await self.db.execute(query)
+        return [tuple(row) for row in result.all()]
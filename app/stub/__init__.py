@@ -0,0 +1,3 @@
+from app.stub.owm_server import StubConfig, create_stub_app
+
+__all__ = ["StubConfig", "create_stub_app"]
@@ -0,0 +1,195 @@
+"""Local OpenWeatherMap stub for offline load tests.
+
+Serves ``/data/2.5/weather`` and ``/data/2.5/group`` with data from the
+deterministic synthetic provider, with configurable latency, error rate and
+periodic 429 bursts. Point the service at it with::
+
+    python -m app.stub.owm_server --port 8081 --latency lognormal --latency-ms 80
+    WEATHER_API_KEY=stub \\
+    WEATHER_API_URL=http://localhost:8081/data/2.5/weather \\
+    WEATHER_API_GROUP_URL=http://localhost:8081/data/2.5/group \\
+    uvicorn app.main:app
+"""
+import argparse
+import asyncio
+import random
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from fastapi import FastAPI, Query
+from fastapi.responses import JSONResponse
+from app.services.synthetic_weather import SyntheticWeatherProvider
+
+
+@dataclass
+class StubConfig:
+    latency: str = "fixed"  # fixed | uniform | lognormal
+    latency_ms: float = 0.0  # fixed value, uniform mean or lognormal median
+    latency_jitter_ms: float = 0.0  # half-width of the uniform distribution
+    latency_sigma: float = 0.5  # shape of the lognormal distribution
+    error_rate: float = 0.0
+    error_status: int = 500
+    rate_limit_every: int = 0  # start a 429 burst every N requests, 0 disables
+    rate_limit_burst: int = 0
+    retry_after: int = 1
+    api_key: Optional[str] = None
+    seed: int = 0
+    frozen_time: Optional[datetime] = None
+    cities: List[str] = field(default_factory=list)
+
+
+class StubState:
+    def __init__(self, config: StubConfig):
+        self.config = config
+        self.rng = random.Random(config.seed)
+        self.provider = SyntheticWeatherProvider()
+        self.cities_by_id: Dict[int, Tuple[str, str]] = {}
+        self.requests = 0
+        self.errors = 0
+        self.rate_limited = 0
+        for query in config.cities:
+            self.register(*self.provider.split_query(query))
+
+    def register(self, city: str, country: str) -> int:
+        provider_id = self.provider.provider_id(city, country)
+        self.cities_by_id[provider_id] = (city, country)
+        return provider_id
+
+    def latency(self) -> float:
+        config = self.config
+        if config.latency == "uniform":
+            delay = self.rng.uniform(
+                config.latency_ms - config.latency_jitter_ms,
+                config.latency_ms + config.latency_jitter_ms,
+            )
+        elif config.latency == "lognormal" and config.latency_ms > 0:
+            delay = self.rng.lognormvariate(0, config.latency_sigma) * config.latency_ms
+        else:
+            delay = config.latency_ms
+        return max(0.0, delay) / 1000
+
+    def fault(self, appid: Optional[str]) -> Optional[JSONResponse]:
+        """Injected failure for the current request, if any."""
+        config = self.config
+        self.requests += 1
+
+        if not appid or (config.api_key and appid != config.api_key):
+            return JSONResponse({"cod": 401, "message": "Invalid API key"}, status_code=401)
+
+        if config.rate_limit_every > 0 and config.rate_limit_burst > 0:
+            if (self.requests - 1) % config.rate_limit_every < config.rate_limit_burst:
+                self.rate_limited += 1
+                return JSONResponse(
+                    {"cod": 429, "message": "Too many requests"},
+                    status_code=429,
+                    headers={"Retry-After": str(config.retry_after)},
+                )
+
+        if config.error_rate > 0 and self.rng.random() < config.error_rate:
+            self.errors += 1
+            return JSONResponse(
+                {"cod": config.error_status, "message": "Injected error"},
+                status_code=config.error_status,
+            )
+        return None
+
+    def payload(self, city: str, country: str, provider_id: Optional[int] = None) -> dict:
+        data = self.provider.owm_payload(city, country, self.config.frozen_time)
+        if provider_id is not None:
+            data["id"] = provider_id
+        return data
+
+
+def create_stub_app(config: Optional[StubConfig] = None) -> FastAPI:
+    state = StubState(config or StubConfig())
+    app = FastAPI(title="OpenWeatherMap stub")
+    app.state.stub = state
+
+    @app.get("/data/2.5/weather")
+    async def current_weather(
+        q: Optional[str] = Query(None),
+        id: Optional[int] = Query(None),
+        appid: Optional[str] = Query(None),
+    ):
+        await asyncio.sleep(state.latency())
+        failure = state.fault(appid)
+        if failure is not None:
+            return failure
+
+        if q:
+            city, country = state.provider.split_query(q)
+            state.register(city, country)
+            return state.payload(city, country)
+        if id is not None and id in state.cities_by_id:
+            return state.payload(*state.cities_by_id[id], provider_id=id)
+        return JSONResponse({"cod": "404", "message": "city not found"}, status_code=404)
+
+    @app.get("/data/2.5/group")
+    async def group_weather(
+        id: str = Query(...),
+        appid: Optional[str] = Query(None),
+    ):
+        await asyncio.sleep(state.latency())
+        failure = state.fault(appid)
+        if failure is not None:
+            return failure
+
+        # Like the real API, unknown ids are left out of the list
+        items = []
+        for value in id.split(","):
+            provider_id = int(value)
+            if provider_id in state.cities_by_id:
+                items.append(state.payload(*state.cities_by_id[provider_id], provider_id=provider_id))
+        return {"cnt": len(items), "list": items}
+
+    @app.get("/stats")
+    async def stats():
+        return {
+            "requests": state.requests,
+            "errors": state.errors,
+            "rate_limited": state.rate_limited,
+            "known_cities": len(state.cities_by_id),
+        }
+
+    return app
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Local OpenWeatherMap stub server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", choices=["fixed", "uniform", "lognormal"], default="fixed")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--latency-jitter-ms", type=float, default=0.0)
+    parser.add_argument("--latency-sigma", type=float, default=0.5)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=500)
+    parser.add_argument("--rate-limit-every", type=int, default=0)
+    parser.add_argument("--rate-limit-burst", type=int, default=0)
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--api-key", default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--cities", default="", help="Comma-separated list of City:CC to preload")
+    args = parser.parse_args()
+
+    config = StubConfig(
+        latency=args.latency,
+        latency_ms=args.latency_ms,
+        latency_jitter_ms=args.latency_jitter_ms,
+        latency_sigma=args.latency_sigma,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        rate_limit_every=args.rate_limit_every,
+        rate_limit_burst=args.rate_limit_burst,
+        retry_after=args.retry_after,
+        api_key=args.api_key,
+        seed=args.seed,
+        cities=[city.replace(":", ",") for city in args.cities.split(",") if city],
+    )
+    uvicorn.run(create_stub_app(config), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
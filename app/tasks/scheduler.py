@@ -1,83 +1,198 @@
 import asyncio
 import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.interval import IntervalTrigger
 from app.config import get_settings
 from app.database import async_session_maker
 from app.services.weather_service import WeatherService
-from app.services.weather_fetcher import WeatherFetcher
+from app.services.weather_fetcher import FetchResult, WeatherFetcher
 from app.services.log_service import LogService
+from app.services.observation_service import ObservationService
+from app.services.rollup_service import RollupService
+from app.models.weather import normalize_key
 
 logger = logging.getLogger(__name__)
 
 scheduler = AsyncIOScheduler()
 
+# (weather id, city, country, provider city ID) of a stored row
+FetchTarget = Tuple[int, str, str, Optional[int]]
 
-async def update_weather_for_cities():
-    fetcher = WeatherFetcher()
+
+async def update_weather_for_cities(fetcher: Optional[WeatherFetcher] = None):
+    fetcher = fetcher or WeatherFetcher()
     
     async with async_session_maker() as db:
         weather_service = WeatherService(db)
+        observation_service = ObservationService(db)
         log_service = LogService(db)
         
-        # Get all cities from database
-        cities = await weather_service.get_unique_cities()
+        # One target per stored row: (id, city, country, provider_id)
+        targets = await weather_service.get_fetch_targets()
         
-        if not cities:
+        if not targets:
             logger.info("No cities in database to update")
             return
         
-        logger.info(f"Starting weather update for {len(cities)} cities from database")
+        logger.info(f"Starting weather update for {len(targets)} cities from database")
+        
+        # Rows with a known provider ID go through group requests; synthetic
+        # mode has no provider to batch against. The rest are queried by
+        # "city,country" so same-named cities in different countries stay apart
+        targets_by_id: Dict[int, List[FetchTarget]] = {}
+        queried: List[FetchTarget] = []
+        for target in targets:
+            provider_id = target[3]
+            if fetcher.api_key and provider_id:
+                targets_by_id.setdefault(provider_id, []).append(target)
+            else:
+                queried.append(target)
+        
+        # The fetch engine caps in-flight requests and rate, so the
+        # remaining cities queue instead of hitting the provider at once
+        engine = fetcher.engine
+        completed_before, wait_before = engine.completed, engine.total_wait
+        engine.reset_window()
         
-        tasks = [fetcher.fetch_weather(city) for city in cities]
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        tasks = [fetcher.fetch(f"{city},{country}") for _, city, country, _ in queried]
+        batch_results, single_results = await asyncio.gather(
+            fetcher.fetch_many(list(targets_by_id)),
+            asyncio.gather(*tasks, return_exceptions=True),
+        )
+        results = list(zip(queried, single_results)) + [
+            (target, result)
+            for provider_id, result in batch_results.items()
+            for target in targets_by_id[provider_id]
+        ]
+        
+        fetched = engine.completed - completed_before
+        if fetched:
+            logger.info(
+                f"Made {fetched} provider requests, "
+                f"avg queue wait {(engine.total_wait - wait_before) / fetched:.2f}s, "
+                f"max queue wait {engine.window_max_wait:.2f}s"
+            )
         
         success_count = 0
         error_count = 0
+        log_entries = []
+        fetched_data = []
         
-        for city, result in zip(cities, results):
-            if isinstance(result, Exception):
-                logger.error(f"Failed to fetch weather for {city}: {result}")
-                await log_service.log_action(
+        for (weather_id, city, country, _), result in results:
+            # BaseException: a fetch cancelled under us comes back as CancelledError
+            if isinstance(result, BaseException):
+                logger.error(f"Failed to fetch weather for {city}, {country}: {result}")
+                log_entries.append(dict(
                     action="SCHEDULED_FETCH",
                     entity="weather",
+                    entity_id=weather_id,
                     status="error",
                     error_message=str(result),
-                    details={"city": city},
-                )
+                    details={"city": city, "country": country},
+                ))
                 error_count += 1
-            elif result is None:
-                logger.warning(f"No weather data received for {city}")
+            elif result.data is None:
+                # Provider failures are recorded, never replaced with synthetic data
+                logger.warning(f"No weather data received for {city}, {country}: {result.error}")
+                log_entries.append(dict(
+                    action="SCHEDULED_FETCH",
+                    entity="weather",
+                    entity_id=weather_id,
+                    status="error",
+                    error_message=result.error,
+                    details={"city": city, "country": country, "source": result.source},
+                ))
                 error_count += 1
             else:
-                try:
-                    weather, is_new = await weather_service.upsert_by_city(result)
-                    await log_service.log_action(
-                        action="SCHEDULED_FETCH",
-                        entity="weather",
-                        entity_id=weather.id,
-                        details={
-                            "city": weather.city,
-                            "country": weather.country,
-                            "temperature": weather.temperature,
-                            "is_new": is_new,
-                        },
-                    )
-                    success_count += 1
-                    logger.info(f"Updated weather for {weather.city}, {weather.country}: {weather.temperature}°C")
-                except Exception as e:
-                    logger.error(f"Failed to save weather for {city}: {e}")
-                    await log_service.log_action(
-                        action="SCHEDULED_FETCH",
-                        entity="weather",
-                        status="error",
-                        error_message=str(e),
-                        details={"city": city},
-                    )
-                    error_count += 1
+                # Save under the stored row's names, whatever spelling the provider returned
+                data = result.data.model_copy(update={"city": city, "country": country})
+                fetched_data.append((weather_id, FetchResult(data, result.source)))
         
+        try:
+            saved = await weather_service.bulk_upsert([result.data for _, result in fetched_data])
+            recorded = await observation_service.record([(result.data, result.source) for _, result in fetched_data])
+        except Exception as e:
+            logger.error(f"Failed to save weather for {len(fetched_data)} cities: {e}")
+            await db.rollback()
+            for weather_id, result in fetched_data:
+                log_entries.append(dict(
+                    action="SCHEDULED_FETCH",
+                    entity="weather",
+                    entity_id=weather_id,
+                    status="error",
+                    error_message=str(e),
+                    details={"city": result.data.city, "country": result.data.country},
+                ))
+            error_count += len(fetched_data)
+        else:
+            sources = {
+                (normalize_key(result.data.city), normalize_key(result.data.country)): result.source
+                for _, result in fetched_data
+            }
+            for weather, is_new in saved:
+                log_entries.append(dict(
+                    action="SCHEDULED_FETCH",
+                    entity="weather",
+                    entity_id=weather.id,
+                    details={
+                        "city": weather.city,
+                        "country": weather.country,
+                        "temperature": weather.temperature,
+                        "is_new": is_new,
+                        "source": sources.get((weather.city_key, weather.country_key)),
+                    },
+                ))
+                logger.info(f"Updated weather for {weather.city}, {weather.country}: {weather.temperature}°C")
+            success_count += len(saved)
+            logger.info(f"Recorded {recorded} new observations")
+        
+        await log_service.log_actions(log_entries)
         await db.commit()
         logger.info(f"Weather update completed: {success_count} success, {error_count} errors")
+        
+        # Pick up rows changed outside this run (rollbacks, other workers) while the data is fresh
+        snapshot = await weather_service.snapshot.refresh(db)
+        logger.info(f"Columnar snapshot at version {snapshot.version} with {len(snapshot)} cities")
+        
+        # Rollups are derived data; a failed refresh is caught up from the watermark next time
+        try:
+            written = await RollupService(db).refresh()
+            await db.commit()
+            logger.info(f"Refreshed {written} weather rollup buckets")
+        except Exception as e:
+            logger.error(f"Failed to refresh weather rollups: {e}")
+            await db.rollback()
+
+
+async def backfill_weather_rollups(step: timedelta = timedelta(days=1)):
+    """Fold the whole pending history into the rollups, committing one ingestion window at a time."""
+    async with async_session_maker() as db:
+        service = RollupService(db)
+        written = 0
+        try:
+            while True:
+                pending = await service.next_pending()
+                if pending is None:
+                    break
+                written += await service.refresh(until=pending + step)
+                await db.commit()
+        except Exception as e:
+            logger.error(f"Weather rollup backfill stopped: {e}")
+            await db.rollback()
+        if written:
+            logger.info(f"Backfilled {written} weather rollup buckets")
+
+
+async def maintain_observation_partitions():
+    async with async_session_maker() as db:
+        try:
+            await ObservationService(db).maintain_partitions()
+            await db.commit()
+        except Exception as e:
+            logger.error(f"Failed to maintain observation partitions: {e}")
+            await db.rollback()
 
 
 def start_scheduler():
@@ -91,6 +206,23 @@ def start_scheduler():
         replace_existing=True,
     )
     
+    scheduler.add_job(
+        maintain_observation_partitions,
+        trigger=IntervalTrigger(hours=24),
+        id="observation_partitions",
+        name="Create upcoming and drop expired observation partitions",
+        next_run_time=datetime.now(),
+        replace_existing=True,
+    )
+    
+    # One-off catch-up for history recorded before the rollups existed
+    scheduler.add_job(
+        backfill_weather_rollups,
+        id="rollup_backfill",
+        name="Backfill weather rollups from the observation history",
+        replace_existing=True,
+    )
+    
     scheduler.start()
     logger.info(f"Scheduler started. Weather updates every {settings.weather_update_interval_minutes} minutes")
 
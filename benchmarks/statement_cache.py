@@ -0,0 +1,103 @@
+"""Per-call overhead of building and compiling the weather list query.
+
+Compares a freshly built ``select()`` (the previous WeatherService.get_all
+shape) with the cached ``lambda_stmt`` version. Runs against an in-memory
+SQLite database with a handful of rows so that statement construction,
+cache-key generation and compilation dominate the measurement.
+
+    python -m benchmarks.statement_cache --iterations 20000
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, lambda_stmt, select, tuple_
+from sqlalchemy.orm import Session
+from app.database import Base
+from app.models.weather import Weather, normalize_key
+
+
+def select_query(city: str, size: int, page: int):
+    query = select(Weather).where(Weather.city_key == normalize_key(city))
+    return query.order_by(Weather.data_timestamp.desc(), Weather.id.desc()).limit(size).offset((page - 1) * size)
+
+
+def lambda_query(city: str, size: int, page: int):
+    city_key = normalize_key(city)
+    offset = (page - 1) * size
+    query = lambda_stmt(lambda: select(Weather))
+    query += lambda q: q.where(Weather.city_key == city_key)
+    query += lambda q: q.order_by(Weather.data_timestamp.desc(), Weather.id.desc()).limit(size)
+    query += lambda q: q.offset(offset)
+    return query
+
+
+def select_cursor_query(cursor_timestamp: datetime, cursor_id: int, size: int):
+    return (
+        select(Weather)
+        .where(tuple_(Weather.data_timestamp, Weather.id) < tuple_(cursor_timestamp, cursor_id))
+        .order_by(Weather.data_timestamp.desc(), Weather.id.desc())
+        .limit(size)
+    )
+
+
+def lambda_cursor_query(cursor_timestamp: datetime, cursor_id: int, size: int):
+    query = lambda_stmt(lambda: select(Weather))
+    query += lambda q: q.order_by(Weather.data_timestamp.desc(), Weather.id.desc()).limit(size)
+    query += lambda q: q.where(
+        tuple_(Weather.data_timestamp, Weather.id) < tuple_(cursor_timestamp, cursor_id)
+    )
+    return query
+
+
+def seed(session: Session) -> None:
+    now = datetime(2024, 1, 1)
+    session.add_all(
+        Weather(
+            city=f"City {i}",
+            country="BM",
+            temperature=20.0,
+            humidity=50.0,
+            pressure=1010.0,
+            data_timestamp=now - timedelta(minutes=i),
+        )
+        for i in range(20)
+    )
+    session.commit()
+
+
+def measure(session: Session, build, iterations: int) -> float:
+    for i in range(100):
+        session.execute(build(i)).scalars().all()
+    start = time.perf_counter()
+    for i in range(iterations):
+        session.execute(build(i)).scalars().all()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=5000)
+    args = parser.parse_args()
+    
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    cursor_at = datetime(2024, 1, 1)
+    
+    cases = [
+        ("get_all by city", lambda i: select_query(f"City {i % 20}", 10, 1 + i % 3),
+         lambda i: lambda_query(f"City {i % 20}", 10, 1 + i % 3)),
+        ("get_all by cursor", lambda i: select_cursor_query(cursor_at, i % 20, 10),
+         lambda i: lambda_cursor_query(cursor_at, i % 20, 10)),
+    ]
+    
+    with Session(engine) as session:
+        seed(session)
+        print(f"{'query':<20} {'select() us/call':>18} {'lambda_stmt us/call':>20} {'speedup':>8}")
+        for name, build_select, build_lambda in cases:
+            before = measure(session, build_select, args.iterations)
+            after = measure(session, build_lambda, args.iterations)
+            print(f"{name:<20} {before:>18.1f} {after:>20.1f} {before / after:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
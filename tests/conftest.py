@@ -6,8 +6,11 @@ from httpx import AsyncClient, ASGITransport
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.pool import StaticPool
 
-from app.database import Base, get_db
+from app.database import Base, get_db, get_read_db
 from app.main import app
+from app.services.columnar_snapshot import get_columnar_snapshot
+from app.services.spatial_index import get_spatial_index
+from app.services.weather_cache import get_weather_cache
 
 # Use SQLite for testing
 TEST_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
@@ -21,6 +24,15 @@ def event_loop():
     loop.close()
 
 
+@pytest.fixture(autouse=True)
+def clear_weather_cache():
+    """Start every test with an empty weather read cache, spatial index and columnar snapshot."""
+    get_weather_cache().clear()
+    get_spatial_index().clear()
+    get_columnar_snapshot().clear()
+    yield
+
+
 @pytest_asyncio.fixture(scope="function")
 async def test_engine():
     """Create test database engine."""
@@ -62,6 +74,7 @@ async def client(test_session: AsyncSession) -> AsyncGenerator[AsyncClient, None
         yield test_session
     
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
     
     transport = ASGITransport(app=app)
     async with AsyncClient(transport=transport, base_url="http://test") as ac:
@@ -0,0 +1,51 @@
+import json
+import pytest
+from app.services.bulk_ingest import BulkPayloadError, JsonItemSplitter
+
+
+def split(body: bytes, chunk_size: int):
+    splitter = JsonItemSplitter()
+    items = []
+    for start in range(0, len(body), chunk_size):
+        items.extend(splitter.feed(body[start:start + chunk_size]))
+    items.extend(splitter.close())
+    return items
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 7, 1024])
+def test_split_json_array(chunk_size):
+    """Test splitting an array regardless of where chunks break."""
+    records = [
+        {"city": "A [x], {y}", "note": 'quote " and \\ slash'},
+        {"city": "B", "nested": {"list": [1, 2, {"k": "]"}]}},
+        {"city": "C"},
+    ]
+    body = b"  [ " + b" ,\n ".join(json.dumps(record).encode() for record in records) + b" ]\n"
+    
+    items = split(body, chunk_size)
+    
+    assert [json.loads(item) for item in items] == records
+
+
+def test_split_array_bare_values():
+    """Test that non-object elements come out as separate items."""
+    assert split(b'[1, "two", null]', 4) == [b"1", b'"two"', b"null"]
+    assert split(b"[]", 1) == []
+
+
+@pytest.mark.parametrize("chunk_size", [1, 5, 1024])
+def test_split_ndjson(chunk_size):
+    """Test splitting newline-delimited JSON, with or without a final newline."""
+    body = b'{"city": "A"}\n\n{"city": "B"}\r\n{"city": "C"}'
+    
+    items = split(body, chunk_size)
+    
+    assert [json.loads(item)["city"] for item in items] == ["A", "B", "C"]
+
+
+def test_split_rejects_malformed_array():
+    """Test that truncated arrays and trailing data are rejected."""
+    with pytest.raises(BulkPayloadError):
+        split(b'[{"city": "A"}', 4)
+    with pytest.raises(BulkPayloadError):
+        split(b'[{"city": "A"}] {"city": "B"}', 4)
@@ -0,0 +1,147 @@
+from datetime import datetime
+from types import SimpleNamespace
+import numpy as np
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from app import database
+from app.database import READ_REPLICA, READ_SOURCE, Base
+from app.schemas.weather import WeatherCreate, WeatherUpdate
+from app.services.columnar_snapshot import ColumnarSnapshot
+from app.services.weather_service import WeatherService
+
+
+def make_row(weather_id, city, country="XX", temperature=0.0, **values):
+    row = dict(
+        id=weather_id, city=city, country=country, city_key=city.lower(), country_key=country.lower(),
+        provider_id=None, latitude=None, longitude=None, temperature=temperature, feels_like=None,
+        humidity=50.0, pressure=1000.0, wind_speed=None, wind_direction=None, cloudiness=None,
+        weather_description=None, weather_main=None, visibility=None,
+        data_timestamp=datetime(2026, 1, 1), created_at=datetime(2026, 1, 1), updated_at=datetime(2026, 1, 1),
+    )
+    row.update(values)
+    return SimpleNamespace(**row)
+
+
+def test_select_matches_python_sort():
+    """Test filters and top-N against sorting the rows in Python, ties broken by id."""
+    rng = np.random.default_rng(3)
+    rows = [
+        make_row(
+            i, f"City {i}", country=["AA", "BB", "CC"][i % 3],
+            temperature=float(rng.integers(-20, 40)),
+            cloudiness=None if i % 7 == 0 else int(rng.integers(0, 100)),
+        )
+        for i in range(1, 1001)
+    ]
+    snapshot = ColumnarSnapshot(capacity=4)
+    for row in rows:
+        snapshot.upsert(row)
+    
+    def ids(slots):
+        return [record["id"] for record in snapshot.records(slots)]
+    
+    expected = sorted(rows, key=lambda row: (-row.temperature, row.id))[:50]
+    assert ids(snapshot.select(order_by="temperature", descending=True, limit=50)) == [row.id for row in expected]
+    
+    expected = sorted(
+        (row for row in rows if row.country == "BB" and row.cloudiness is not None and 10 <= row.cloudiness <= 60),
+        key=lambda row: (row.cloudiness, row.id),
+    )
+    slots = snapshot.select(country_key="bb", ranges={"cloudiness": (10, 60)}, order_by="cloudiness")
+    assert ids(slots) == [row.id for row in expected]
+    assert snapshot.select(country_key="zz").size == 0
+
+
+def test_upsert_remove_and_strings():
+    """Test in-place updates, swap-removal, interned strings and the version counter."""
+    snapshot = ColumnarSnapshot(capacity=2)
+    snapshot.upsert(make_row(1, "Oslo", "NO", weather_main="Snow"))
+    snapshot.upsert(make_row(2, "Bergen", "NO", weather_main="Rain", cloudiness=80))
+    snapshot.upsert(make_row(3, "Rome", "IT", weather_main="Clear"))
+    version = snapshot.version
+    
+    snapshot.upsert(make_row(2, "Bergen", "NO", weather_main="Snow", temperature=-3.5))
+    snapshot.remove(1)
+    assert snapshot.version == version + 2
+    assert len(snapshot) == 2
+    assert snapshot.strings["country"].values == ["NO", "IT"]
+    
+    records = snapshot.records(snapshot.select(weather_main="Snow"))
+    assert len(records) == 1
+    assert records[0]["city"] == "Bergen"
+    assert records[0]["temperature"] == -3.5
+    assert records[0]["cloudiness"] is None
+    assert records[0]["data_timestamp"] == datetime(2026, 1, 1)
+    assert [record["city"] for record in snapshot.records(snapshot.select(order_by="id"))] == ["Bergen", "Rome"]
+
+
+@pytest.mark.asyncio
+async def test_writes_applied_on_commit(test_session: AsyncSession):
+    """Test that writes reach the snapshot only when their transaction commits."""
+    snapshot = ColumnarSnapshot()
+    service = WeatherService(test_session, snapshot=snapshot)
+    await snapshot.refresh(test_session)
+    
+    kept = await service.create(WeatherCreate(city="Kept", country="KP", temperature=5.0, humidity=1.0, pressure=1.0))
+    kept_id = kept.id
+    assert len(snapshot) == 0
+    await test_session.commit()
+    assert [record["city"] for record in snapshot.records(snapshot.select())] == ["Kept"]
+    
+    await service.update(kept_id, WeatherUpdate(temperature=30.0))
+    await service.create(WeatherCreate(city="Gone", country="GN", temperature=9.0, humidity=1.0, pressure=1.0))
+    assert [item.temperature for item in await service.top("temperature", 5)] == [5.0]
+    
+    await test_session.rollback()
+    assert [(item.city, item.temperature) for item in await service.top("temperature", 5)] == [("Kept", 5.0)]
+    
+    await service.delete(kept_id)
+    assert len(snapshot) == 1
+    await test_session.commit()
+    assert len(snapshot) == 0
+    assert snapshot.stats()["partial_loads"] == 0
+    assert snapshot.stats()["full_loads"] == 1
+
+
+@pytest.mark.asyncio
+async def test_commit_during_refresh_is_reread(test_session: AsyncSession):
+    """Test that a row committed while a refresh is reading is not left at the refresh's older value."""
+    snapshot = ColumnarSnapshot()
+    service = WeatherService(test_session, snapshot=snapshot)
+    weather = await service.create(WeatherCreate(city="Race", country="RC", temperature=1.0, humidity=1.0, pressure=1.0))
+    await test_session.commit()
+    
+    # Commit the new value while the full load is between its query and applying the result
+    original_load = snapshot.load
+    
+    def load_then_commit(rows):
+        original_load(rows)
+        snapshot.apply_committed({weather.id: make_row(weather.id, "Race", "RC", temperature=2.0)})
+    
+    snapshot.load = load_then_commit
+    await snapshot.refresh(test_session)
+    assert snapshot.stats()["dirty"] == 1
+
+
+@pytest.mark.asyncio
+async def test_dirty_rows_reread_on_primary(test_session: AsyncSession, test_engine, monkeypatch):
+    """Test that rows changed by another worker are not re-read from a lagging replica."""
+    monkeypatch.setattr(database, "async_session_maker", async_sessionmaker(test_engine, expire_on_commit=False))
+    replica_engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with replica_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    
+    snapshot = ColumnarSnapshot()
+    await snapshot.refresh(test_session)
+    weather = await WeatherService(test_session, snapshot=ColumnarSnapshot()).create(
+        WeatherCreate(city="Remote", country="RM", temperature=7.0, humidity=1.0, pressure=1.0)
+    )
+    await test_session.commit()
+    snapshot.mark_dirty([weather.id])
+    
+    async with async_sessionmaker(replica_engine)() as replica:
+        replica.info[READ_SOURCE] = READ_REPLICA
+        await snapshot.refresh(replica)
+    await replica_engine.dispose()
+    
+    assert [record["city"] for record in snapshot.records(snapshot.select())] == ["Remote"]
@@ -0,0 +1,85 @@
+import pytest
+from sqlalchemy.exc import OperationalError
+from starlette.requests import Request
+from app import database
+from app.database import (
+    READ_PRIMARY,
+    READ_REPLICA,
+    READ_SOURCE,
+    READ_YOUR_WRITES,
+    READ_YOUR_WRITES_HEADER,
+    ReplicaRouter,
+    get_read_db,
+)
+
+
+class FakeSession:
+    def __init__(self, name, healthy=True):
+        self.name = name
+        self.healthy = healthy
+        self.closed = False
+        self.info = {}
+    
+    async def connection(self):
+        if not self.healthy:
+            raise OperationalError("SELECT 1", {}, Exception("connection refused"))
+    
+    async def close(self):
+        self.closed = True
+
+
+def session_maker(name, healthy=True):
+    return lambda: FakeSession(name, healthy)
+
+
+def make_request(headers=None):
+    raw = [(key.lower().encode(), value.encode()) for key, value in (headers or {}).items()]
+    return Request({"type": "http", "headers": raw})
+
+
+@pytest.mark.asyncio
+async def test_replica_router_round_robin():
+    """Test that reads rotate over the replicas."""
+    router = ReplicaRouter([session_maker("a"), session_maker("b")], retry_after=60)
+    
+    names = [(await router.open_session()).name for _ in range(4)]
+    
+    assert names == ["a", "b", "a", "b"]
+
+
+@pytest.mark.asyncio
+async def test_replica_router_fails_over():
+    """Test that an unhealthy replica is skipped until its retry time."""
+    router = ReplicaRouter([session_maker("down", healthy=False), session_maker("up")], retry_after=60)
+    
+    assert (await router.open_session()).name == "up"
+    assert router.candidates() == [1]
+    
+    router.down_until[0] = 0.0
+    assert sorted(router.candidates()) == [0, 1]
+    
+    router = ReplicaRouter([session_maker("down", healthy=False)], retry_after=60)
+    assert await router.open_session() is None
+
+
+@pytest.mark.asyncio
+async def test_get_read_db_routing(monkeypatch):
+    """Test replica reads, primary fallback and the read-your-writes override."""
+    monkeypatch.setattr(database, "replica_router", ReplicaRouter([session_maker("replica")], retry_after=60))
+    monkeypatch.setattr(database, "async_session_maker", session_maker("primary"))
+    
+    async def session_for(request):
+        dependency = get_read_db(request)
+        session = await dependency.__anext__()
+        await dependency.aclose()
+        return session
+    
+    session = await session_for(make_request())
+    assert (session.name, session.info[READ_SOURCE]) == ("replica", READ_REPLICA)
+    session = await session_for(make_request({READ_YOUR_WRITES_HEADER: "1"}))
+    assert (session.name, session.info[READ_SOURCE]) == ("primary", READ_YOUR_WRITES)
+    
+    monkeypatch.setattr(database, "replica_router", ReplicaRouter([], retry_after=60))
+    session = await session_for(make_request())
+    assert (session.name, session.info[READ_SOURCE]) == ("primary", READ_PRIMARY)
+    assert session.closed
@@ -0,0 +1,79 @@
+import asyncio
+import time
+import pytest
+from app.services.fetch_engine import FetchEngine, TokenBucket
+
+
+@pytest.mark.asyncio
+async def test_engine_caps_in_flight_requests():
+    """Test that no more than max_in_flight calls run at once."""
+    engine = FetchEngine(max_in_flight=3, rate_per_minute=0, burst=1)
+    peak = 0
+    
+    async def call():
+        nonlocal peak
+        async with engine.slot():
+            peak = max(peak, engine.in_flight)
+            await asyncio.sleep(0.01)
+    
+    await asyncio.gather(*(call() for _ in range(12)))
+    
+    assert peak == 3
+    assert engine.completed == 12
+    assert engine.in_flight == 0
+    assert engine.queued == 0
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_allows_burst_then_waits():
+    """Test that the bucket serves the burst immediately and queues the rest."""
+    bucket = TokenBucket(rate_per_minute=600, burst=2)  # 10 tokens per second
+    
+    started = time.monotonic()
+    await bucket.acquire()
+    await bucket.acquire()
+    burst_elapsed = time.monotonic() - started
+    await bucket.acquire()
+    total_elapsed = time.monotonic() - started
+    
+    assert burst_elapsed < 0.05
+    assert total_elapsed >= 0.09
+
+
+@pytest.mark.asyncio
+async def test_engine_reports_queue_wait():
+    """Test that queue wait time is recorded for rate-limited calls."""
+    engine = FetchEngine(max_in_flight=10, rate_per_minute=1200, burst=1)
+    
+    async def call():
+        async with engine.slot() as waited:
+            return waited
+    
+    waits = await asyncio.gather(*(call() for _ in range(3)))
+    stats = engine.stats()
+    
+    assert max(waits) >= 0.09
+    assert stats["completed"] == 3
+    assert stats["max_wait_seconds"] >= 0.09
+    assert stats["avg_wait_seconds"] > 0
+    assert engine.window_max_wait == engine.max_wait
+    
+    engine.reset_window()
+    async with engine.slot():
+        pass
+    assert engine.window_max_wait < engine.max_wait
+
+
+@pytest.mark.asyncio
+async def test_engine_releases_slot_on_error():
+    """Test that a failing call gives its slot back."""
+    engine = FetchEngine(max_in_flight=1, rate_per_minute=0, burst=1)
+    
+    with pytest.raises(RuntimeError):
+        async with engine.slot():
+            raise RuntimeError("boom")
+    
+    async with engine.slot():
+        assert engine.in_flight == 1
+    
+    assert engine.completed == 2
@@ -0,0 +1,178 @@
+import json
+import pytest
+from datetime import datetime
+from httpx import AsyncClient
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from app.config import get_settings
+from app.models import Weather, WeatherObservation, ImportCheckpoint
+from app.services.observation_service import ObservationService
+from app.services.importer import (
+    STATUS_COMPLETED,
+    STATUS_FAILED,
+    ImportLoader,
+    ImportSourceError,
+    run_import,
+    validate_record,
+)
+
+
+def write_ndjson(path, readings):
+    path.write_text("".join(json.dumps(reading) + "\n" for reading in readings))
+    return str(path)
+
+
+def reading(hour: int, temperature: float = 10.0, city: str = "Importville") -> dict:
+    return {
+        "city": city,
+        "country": "IM",
+        "temperature": temperature,
+        "humidity": 40,
+        "pressure": 1005,
+        "data_timestamp": f"2024-02-01T{hour:02d}:00:00Z",
+    }
+
+
+@pytest.fixture
+def session_maker(test_engine):
+    return async_sessionmaker(test_engine, class_=AsyncSession, expire_on_commit=False)
+
+
+def test_validate_record():
+    """Test fast-path validation of raw CSV and JSON values."""
+    row, error = validate_record({
+        "city": "Oslo", "country": "NO", "temperature": "-3.5", "humidity": "80",
+        "pressure": "990", "data_timestamp": "2024-01-01T12:00:00+01:00", "cloudiness": "",
+    })
+    assert error is None
+    assert row[:5] == ("Oslo", "NO", "oslo", "no", datetime(2024, 1, 1, 11, 0))
+    assert row[8] == -3.5
+    
+    assert validate_record({**reading(1), "humidity": 120})[1] == "humidity: must be <= 100"
+    assert validate_record({**reading(1), "data_timestamp": None})[1] == "data_timestamp: field required"
+    assert validate_record({**reading(1), "temperature": "warm"})[1].startswith("temperature:")
+    assert validate_record([1, 2])[1] == "expected an object"
+
+
+@pytest.mark.asyncio
+async def test_import_csv(tmp_path, session_maker, test_session: AsyncSession):
+    """Test that a CSV file fills the history and keeps only the newest reading in weather."""
+    source = tmp_path / "history.csv"
+    source.write_text(
+        "city,country,temperature,humidity,pressure,data_timestamp,wind_speed\n"
+        "Importville,IM,1.5,40,1005,2024-02-01T02:00:00,3\n"
+        "Importville,IM,0.5,40,1005,2024-02-01T01:00:00,\n"
+        "Importville,IM,oops,40,1005,2024-02-01T03:00:00,\n"
+        "Elsewhere,IM,7,40,1005,2024-02-01T01:00:00,\n"
+    )
+    
+    reports = []
+    progress = await run_import(
+        str(source), chunk_size=2, session_maker=session_maker, on_progress=lambda p: reports.append(p.records_done),
+    )
+    
+    assert progress.status == STATUS_COMPLETED
+    assert (progress.records_done, progress.rows_imported, progress.rows_rejected) == (4, 3, 1)
+    assert progress.errors[0].startswith("record 3: temperature:")
+    assert reports[:2] == [2, 4]
+    
+    count = await test_session.scalar(select(func.count()).select_from(WeatherObservation))
+    assert count == 3
+    latest = await test_session.scalar(select(Weather).where(Weather.city_key == "importville"))
+    assert latest.temperature == 1.5
+    assert latest.wind_speed == 3.0
+
+
+@pytest.mark.asyncio
+async def test_import_keeps_newer_weather(tmp_path, session_maker, test_session: AsyncSession):
+    """Test that older imported readings do not replace a newer stored record."""
+    await run_import(write_ndjson(tmp_path / "new.ndjson", [reading(12, 20.0)]), session_maker=session_maker)
+    await run_import(write_ndjson(tmp_path / "old.ndjson", [reading(6, 5.0)]), session_maker=session_maker)
+    
+    latest = await test_session.scalar(select(Weather).where(Weather.city_key == "importville"))
+    assert latest.temperature == 20.0
+    count = await test_session.scalar(select(func.count()).select_from(WeatherObservation))
+    assert count == 2
+
+
+@pytest.mark.asyncio
+async def test_import_rejects_readings_past_retention(tmp_path, session_maker, monkeypatch):
+    """Test that readings the partition retention would drop are rejected instead of imported."""
+    # Retention only applies to the partitioned (PostgreSQL) history
+    monkeypatch.setattr(ObservationService, "partitioned", property(lambda self: True))
+    monkeypatch.setattr(get_settings(), "observation_retention_months", 12)
+    recent = {**reading(0), "data_timestamp": datetime.utcnow().replace(microsecond=0).isoformat()}
+    
+    source = write_ndjson(tmp_path / "old.ndjson", [reading(1), recent])
+    progress = await run_import(source, session_maker=session_maker)
+    
+    assert (progress.rows_imported, progress.rows_rejected) == (1, 1)
+    assert "past OBSERVATION_RETENTION_MONTHS" in progress.errors[0]
+
+
+@pytest.mark.asyncio
+async def test_import_resumes_from_checkpoint(tmp_path, session_maker, test_session: AsyncSession, monkeypatch):
+    """Test that a failed import resumes after the last committed chunk."""
+    source = write_ndjson(tmp_path / "resume.ndjson", [reading(hour) for hour in range(6)])
+    original_load = ImportLoader.load
+    calls = []
+    
+    async def failing_load(self, rows):
+        calls.append(len(rows))
+        if len(calls) == 2:
+            raise RuntimeError("connection lost")
+        return await original_load(self, rows)
+    
+    monkeypatch.setattr(ImportLoader, "load", failing_load)
+    with pytest.raises(RuntimeError):
+        await run_import(source, name="resume", chunk_size=2, session_maker=session_maker)
+    
+    checkpoint = await test_session.get(ImportCheckpoint, "resume")
+    assert (checkpoint.status, checkpoint.records_done) == (STATUS_FAILED, 2)
+    
+    monkeypatch.setattr(ImportLoader, "load", original_load)
+    progress = await run_import(source, name="resume", chunk_size=2, session_maker=session_maker)
+    
+    assert progress.resumed_from == 2
+    assert (progress.records_done, progress.rows_imported) == (6, 6)
+    count = await test_session.scalar(select(func.count()).select_from(WeatherObservation))
+    assert count == 6
+    
+    again = await run_import(source, name="resume", session_maker=session_maker)
+    assert again.status == STATUS_COMPLETED
+    assert again.resumed_from == 6
+
+
+@pytest.mark.asyncio
+async def test_import_checkpoint_belongs_to_source(tmp_path, session_maker):
+    """Test that a checkpoint name cannot be reused for another file."""
+    await run_import(write_ndjson(tmp_path / "a.ndjson", [reading(1)]), name="shared", session_maker=session_maker)
+    
+    with pytest.raises(ImportSourceError):
+        await run_import(write_ndjson(tmp_path / "b.ndjson", [reading(2)]), name="shared", session_maker=session_maker)
+    
+    with pytest.raises(ImportSourceError):
+        await run_import(str(tmp_path / "readings.xml"), session_maker=session_maker)
+
+
+@pytest.mark.asyncio
+async def test_import_endpoints(client: AsyncClient, tmp_path, session_maker, monkeypatch):
+    """Test the admin import endpoints' error responses and checkpoint lookup."""
+    monkeypatch.setattr(get_settings(), "import_root", str(tmp_path / "imports"))
+    (tmp_path / "imports").mkdir()
+    write_ndjson(tmp_path / "outside.ndjson", [reading(1)])
+    (tmp_path / "imports" / "link.ndjson").symlink_to(tmp_path / "outside.ndjson")
+    
+    for source in ["missing.csv", str(tmp_path / "outside.ndjson"), "../outside.ndjson", "link.ndjson"]:
+        response = await client.post("/internal/imports", json={"source": source})
+        assert response.status_code == 400
+    assert "outside" in response.json()["detail"]
+    
+    response = await client.get("/internal/imports/never-ran")
+    assert response.status_code == 404
+    
+    await run_import(write_ndjson(tmp_path / "done.ndjson", [reading(1)]), name="done", session_maker=session_maker)
+    response = await client.get("/internal/imports/done")
+    assert response.status_code == 200
+    assert response.json()["status"] == STATUS_COMPLETED
+    assert response.json()["rows_imported"] == 1
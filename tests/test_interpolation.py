@@ -0,0 +1,64 @@
+import math
+import numpy as np
+import pytest
+from app.services import interpolation
+from app.services.interpolation import Stations, idw
+from app.services.spatial_index import EARTH_RADIUS_KM, unit_vectors
+
+
+def stations(rows):
+    data = np.array(rows, dtype=np.float64)
+    return Stations(vectors=unit_vectors(data[:, 0], data[:, 1]), values=data[:, 2:])
+
+
+def test_idw_weights_by_distance():
+    """Test exact matches, midpoints and inverse-distance weighting."""
+    grid = stations([
+        (0.0, 0.0, 10.0, 50.0, 1000.0, 2.0),
+        (0.0, 2.0, 20.0, 70.0, 1010.0, np.nan),
+        (0.0, 40.0, 90.0, 90.0, 1090.0, 9.0),
+    ])
+    
+    result = idw(grid, [0.0, 0.0, 0.0], [0.0, 1.0, 0.5], k=2, power=2.0)
+    
+    assert result["temperature"][0] == pytest.approx(10.0)
+    assert result["nearest_km"][0] == pytest.approx(0.0, abs=1e-6)
+    assert result["temperature"][1] == pytest.approx(15.0)
+    assert result["humidity"][1] == pytest.approx(60.0)
+    assert result["nearest_km"][1] == pytest.approx(math.radians(1.0) * EARTH_RADIUS_KM)
+    # 1:3 distances give 9:1 weights
+    assert result["temperature"][2] == pytest.approx((9 * 10.0 + 20.0) / 10)
+    # Only the first neighbour reports wind
+    assert result["wind_speed"][1] == pytest.approx(2.0)
+
+
+def test_idw_missing_field_is_nan():
+    """Test that a field no neighbour reports is NaN."""
+    grid = stations([(10.0, 10.0, 1.0, 1.0, 1.0, np.nan), (10.0, 11.0, 2.0, 2.0, 2.0, np.nan)])
+    result = idw(grid, [10.0], [10.5], k=5, power=1.0)
+    assert math.isnan(result["wind_speed"][0])
+    assert result["temperature"][0] == pytest.approx(1.5, rel=1e-3)
+
+
+def test_idw_exact_match_per_field():
+    """Test that a coincident station missing a field does not blank it out."""
+    grid = stations([(0.0, 0.0, np.nan, 40.0, 1000.0, 3.0), (0.0, 1.0, 20.0, 60.0, 1010.0, 5.0)])
+    result = idw(grid, [0.0], [0.0], k=2, power=2.0)
+    assert result["temperature"][0] == pytest.approx(20.0)
+    assert result["humidity"][0] == pytest.approx(40.0)
+    assert result["wind_speed"][0] == pytest.approx(3.0)
+
+
+def test_idw_chunks_match(monkeypatch):
+    """Test that chunked evaluation gives the same result as one pass."""
+    rng = np.random.default_rng(3)
+    rows = np.column_stack([rng.uniform(-60, 60, 300), rng.uniform(-180, 180, 300), rng.normal(15, 8, (300, 4))])
+    grid = stations(rows)
+    lats, lons = rng.uniform(-60, 60, 1000), rng.uniform(-180, 180, 1000)
+    
+    whole = idw(grid, lats, lons, k=6, power=2.0)
+    monkeypatch.setattr(interpolation, "CHUNK_ELEMENTS", 7 * 300)
+    chunked = idw(grid, lats, lons, k=6, power=2.0)
+    
+    for name, values in whole.items():
+        np.testing.assert_allclose(chunked[name], values)
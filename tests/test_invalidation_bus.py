@@ -0,0 +1,169 @@
+import asyncio
+import json
+import pytest
+from app.services.invalidation_bus import (
+    CHANNEL,
+    InvalidationListener,
+    decode_payload,
+    encode_payloads,
+)
+from app.services.columnar_snapshot import ColumnarSnapshot
+from app.services.spatial_index import SpatialIndex
+from app.services.weather_cache import WeatherReadCache, city_cache_key, id_cache_key
+
+
+class FakeConnection:
+    def __init__(self):
+        self.listeners = {}
+        self.on_terminate = None
+        self.closed = False
+    
+    async def add_listener(self, channel, callback):
+        self.listeners[channel] = callback
+    
+    def add_termination_listener(self, callback):
+        self.on_terminate = callback
+    
+    async def execute(self, query):
+        return "SELECT 1"
+    
+    async def close(self):
+        self.closed = True
+    
+    def notify(self, payload):
+        self.listeners[CHANNEL](self, 1, CHANNEL, payload)
+    
+    def terminate(self):
+        self.on_terminate(self)
+
+
+async def wait_for(condition, timeout=1.0):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not condition():
+        assert loop.time() < deadline
+        await asyncio.sleep(0.005)
+
+
+def test_payloads_fit_notify_limit():
+    """Test splitting many changed rows into bounded payloads."""
+    rows = [(i, f"city {i}", "country") for i in range(500)]
+    
+    payloads = encode_payloads(rows, max_bytes=1000)
+    
+    assert len(payloads) > 1
+    assert all(len(payload.encode("utf-8")) <= 1000 for payload in payloads)
+    assert sum(len(json.loads(payload)) for payload in payloads) == 500
+    assert id_cache_key(7) in decode_payload(payloads[0])
+
+
+@pytest.mark.asyncio
+async def test_listener_coalesces_notifications():
+    """Test that a burst of notifications is evicted in one flush."""
+    cache = WeatherReadCache(ttl_seconds=60, max_entries=100)
+    conn = FakeConnection()
+    
+    async def connect():
+        return conn
+    
+    listener = InvalidationListener(
+        connect, cache=cache, index=SpatialIndex(), snapshot=ColumnarSnapshot(), coalesce_seconds=0.02,
+    )
+    await listener.start()
+    await wait_for(lambda: listener.connected)
+    
+    cache.cache.set(id_cache_key(1), "one")
+    cache.cache.set(city_cache_key("paris", "fr"), "paris")
+    cache.cache.set(id_cache_key(3), "three")
+    conn.notify(json.dumps([[1, "london", "gb"]]))
+    conn.notify(json.dumps([[2, "paris", "fr"]]))
+    
+    await wait_for(lambda: listener.flushes == 1)
+    assert listener.notifications == 2
+    assert cache.cache.get(id_cache_key(1)) is None
+    assert cache.cache.get(city_cache_key("paris", "fr")) is None
+    assert cache.cache.get(id_cache_key(3)) == "three"
+    
+    await listener.stop()
+
+
+@pytest.mark.asyncio
+async def test_listener_reconnects_with_full_flush():
+    """Test that a lost connection is replaced and the cache flushed."""
+    cache = WeatherReadCache(ttl_seconds=60, max_entries=100)
+    connections = []
+    attempts = 0
+    
+    async def connect():
+        nonlocal attempts
+        attempts += 1
+        if attempts == 2:
+            raise OSError("connection refused")
+        connections.append(FakeConnection())
+        return connections[-1]
+    
+    listener = InvalidationListener(
+        connect, cache=cache, index=SpatialIndex(), snapshot=ColumnarSnapshot(), reconnect_delay=0.01,
+    )
+    await listener.start()
+    await wait_for(lambda: listener.connected)
+    
+    cache.cache.set(id_cache_key(1), "one")
+    connections[0].terminate()
+    
+    await wait_for(lambda: listener.connects == 2)
+    assert connections[0].closed
+    assert attempts == 3
+    assert listener.full_flushes == 2
+    assert len(cache.cache) == 0
+    
+    await listener.stop()
+
+
+
+@pytest.mark.asyncio
+async def test_caches_untrusted_while_disconnected():
+    """Test that the cache is bypassed and the index and snapshot untrusted until connected."""
+    cache = WeatherReadCache(ttl_seconds=60, max_entries=100)
+    index = SpatialIndex()
+    snapshot = ColumnarSnapshot()
+    connections = []
+    refused = asyncio.Event()
+    allow = asyncio.Event()
+    
+    async def connect():
+        if not allow.is_set():
+            refused.set()
+            raise OSError("connection refused")
+        connections.append(FakeConnection())
+        return connections[-1]
+    
+    loads = 0
+    
+    async def loader():
+        nonlocal loads
+        loads += 1
+        return "value"
+    
+    listener = InvalidationListener(connect, cache=cache, index=index, snapshot=snapshot, reconnect_delay=0.01)
+    await listener.start()
+    await asyncio.wait_for(refused.wait(), timeout=1.0)
+    
+    assert not cache.enabled and not index.trusted and not snapshot.trusted
+    await cache.get_or_load(id_cache_key(1), loader)
+    await cache.get_or_load(id_cache_key(1), loader)
+    assert loads == 2
+    assert len(cache.cache) == 0
+    
+    allow.set()
+    await wait_for(lambda: listener.connected)
+    assert cache.enabled and index.trusted and snapshot.trusted
+    await cache.get_or_load(id_cache_key(1), loader)
+    await cache.get_or_load(id_cache_key(1), loader)
+    assert loads == 3
+    
+    connections[0].terminate()
+    await wait_for(lambda: not listener.connected)
+    assert not cache.enabled and not index.trusted and not snapshot.trusted
+    
+    await listener.stop()
@@ -184,3 +184,85 @@ async def test_log_details_json_serialization(test_session: AsyncSession):
     assert log.details is not None
     assert "city" in log.details
 
+
+
+@pytest.mark.asyncio
+async def test_get_logs_cursor_pagination(test_session: AsyncSession):
+    """Test walking logs with a keyset cursor, including equal timestamps."""
+    service = LogService(test_session)
+    
+    same_time = datetime(2024, 1, 1, 12, 0)
+    await service.log_actions(
+        dict(action="CREATE", entity="weather", entity_id=i, created_at=same_time - timedelta(minutes=i % 3))
+        for i in range(12)
+    )
+    await test_session.commit()
+    
+    seen = []
+    cursor = None
+    while True:
+        items, total = await service.get_logs(size=5, cursor=cursor)
+        seen.extend(item.id for item in items)
+        if len(items) < 5:
+            break
+        cursor = (items[-1].created_at, items[-1].id)
+    
+    offset_items, _ = await service.get_logs(page=1, size=12)
+    assert seen == [item.id for item in offset_items]
+    assert len(set(seen)) == 12
+
+
+@pytest.mark.asyncio
+async def test_log_actions_bulk(test_session: AsyncSession):
+    """Test adding many log entries at once."""
+    service = LogService(test_session)
+    
+    logs = await service.log_actions([
+        {"action": "SCHEDULED_FETCH", "entity": "weather", "details": {"city": "A"}},
+        {"action": "SCHEDULED_FETCH", "entity": "weather", "status": "error", "error_message": "down"},
+    ])
+    await test_session.commit()
+    
+    assert all(log.id is not None for log in logs)
+    assert logs[0].details == '{"city": "A"}'
+    assert logs[1].status == "error"
+
+
+@pytest.mark.asyncio
+async def test_get_logs_total_modes(test_session: AsyncSession):
+    """Test skipping and estimating the total count of logs."""
+    service = LogService(test_session)
+    
+    await service.log_actions(dict(action="CREATE", entity="weather") for _ in range(6))
+    await test_session.commit()
+    
+    items, total = await service.get_logs(size=5, total_mode="none")
+    assert total is None
+    assert len(items) == 6
+    
+    # Estimates need planner statistics, so SQLite falls back to an exact count
+    items, total = await service.get_logs(size=5, total_mode="estimate")
+    assert total == 6
+    assert len(items) == 5
+
+
+@pytest.mark.asyncio
+async def test_stream_logs(test_session: AsyncSession):
+    """Test streaming logs in order and stopping early."""
+    service = LogService(test_session)
+    await service.log_actions(dict(action="CREATE", entity="weather", entity_id=i) for i in range(5))
+    await service.log_action(action="DELETE", entity="weather")
+    await test_session.commit()
+    
+    streamed = [log async for log in service.stream_logs(action="CREATE", fetch_size=2)]
+    assert len(streamed) == 5
+    assert all(log.action == "CREATE" for log in streamed)
+    
+    stream = service.stream_logs(fetch_size=2)
+    first = await stream.__anext__()
+    await stream.aclose()
+    assert first.action in ("CREATE", "DELETE")
+    
+    # The abandoned cursor is closed, so the session keeps working
+    items, total = await service.get_logs()
+    assert total == 6
@@ -0,0 +1,66 @@
+import pytest
+from datetime import datetime
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.observation import WeatherObservation
+from app.schemas.weather import WeatherCreate
+from app.services.observation_service import (
+    ObservationService,
+    add_months,
+    partition_month,
+    partition_name,
+)
+
+
+def reading(city: str, at: datetime, temperature: float = 20.0) -> WeatherCreate:
+    return WeatherCreate(
+        city=city,
+        country="HS",
+        temperature=temperature,
+        humidity=50.0,
+        pressure=1010.0,
+        data_timestamp=at,
+    )
+
+
+def test_partition_names():
+    """Test monthly partition naming and month arithmetic."""
+    assert add_months(datetime(2024, 11, 15), 3) == datetime(2025, 2, 1)
+    assert add_months(datetime(2024, 1, 1), -1) == datetime(2023, 12, 1)
+    assert partition_name(datetime(2024, 3, 1)) == "weather_observations_p202403"
+    assert partition_month("weather_observations_p202403") == datetime(2024, 3, 1)
+    assert partition_month("weather_observations_default") is None
+
+
+@pytest.mark.asyncio
+async def test_record_appends_history(test_session: AsyncSession):
+    """Test that every reading is kept and exact repeats are skipped."""
+    service = ObservationService(test_session)
+    
+    inserted = await service.record([
+        (reading("History", datetime(2024, 1, 1, 12, 0), 20.0), "live"),
+        (reading("History", datetime(2024, 1, 1, 12, 30), 21.0), "live"),
+        (reading("history ", datetime(2024, 1, 1, 12, 0), 20.0), "cached"),
+    ])
+    await test_session.commit()
+    
+    assert inserted == 2
+    count = await test_session.scalar(select(func.count()).select_from(WeatherObservation))
+    assert count == 2
+    
+    rows = (await test_session.scalars(
+        select(WeatherObservation).order_by(WeatherObservation.data_timestamp)
+    )).all()
+    assert [row.temperature for row in rows] == [20.0, 21.0]
+    assert rows[0].source == "live"
+    assert rows[0].city_key == "history"
+
+
+@pytest.mark.asyncio
+async def test_partition_maintenance_is_noop_without_postgres(test_session: AsyncSession):
+    """Test that partition DDL is skipped on SQLite."""
+    service = ObservationService(test_session)
+    
+    result = await service.maintain_partitions(now=datetime(2024, 5, 10))
+    
+    assert result == {"created": [], "dropped": []}
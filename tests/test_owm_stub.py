@@ -0,0 +1,96 @@
+from datetime import datetime
+import httpx
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.services.fetch_engine import FetchEngine
+from app.services.resilience import CircuitBreaker, RetryPolicy
+from app.services.ttl_cache import TTLCache
+from app.services.weather_fetcher import WeatherFetcher, SOURCE_LIVE
+from app.services.weather_service import WeatherService
+from app.stub import StubConfig, create_stub_app
+
+FROZEN = datetime(2024, 6, 1, 12, 0)
+
+
+def stub_fetcher(client: httpx.AsyncClient, attempts: int = 3) -> WeatherFetcher:
+    fetcher = WeatherFetcher(
+        client=client,
+        engine=FetchEngine(max_in_flight=10, rate_per_minute=0, burst=1),
+        cache=TTLCache(ttl_seconds=60, max_entries=100),
+        breaker=CircuitBreaker("stub", failure_threshold=100, reset_timeout=30),
+        retry_policy=RetryPolicy(attempts=attempts, base_delay=0.001, max_delay=1.0),
+    )
+    fetcher.api_key = "stub"
+    fetcher.api_url = "http://stub/data/2.5/weather"
+    fetcher.group_url = "http://stub/data/2.5/group"
+    return fetcher
+
+
+def stub_client(app) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://stub")
+
+
+@pytest.mark.asyncio
+async def test_stub_serves_single_and_group_requests(test_session: AsyncSession):
+    """Test the fetch -> upsert path end to end against the local stub."""
+    app = create_stub_app(StubConfig(frozen_time=FROZEN, cities=["Moscow,RU", "Paris,FR"]))
+    
+    async with stub_client(app) as client:
+        fetcher = stub_fetcher(client)
+        single = await fetcher.fetch("London,GB")
+        ids = list(app.state.stub.cities_by_id)
+        batch = await fetcher.fetch_many(ids)
+    
+    assert single.source == SOURCE_LIVE
+    assert single.data.city == "London"
+    assert single.data.data_timestamp == FROZEN
+    assert {result.data.city for result in batch.values()} == {"Moscow", "Paris", "London"}
+    
+    service = WeatherService(test_session)
+    for result in batch.values():
+        await service.upsert_by_city(result.data)
+    await test_session.commit()
+    
+    weather = await service.get_by_city("Paris", "FR")
+    assert weather.latitude == batch[weather.provider_id].data.latitude
+
+
+@pytest.mark.asyncio
+async def test_stub_rate_limit_burst_is_retried():
+    """Test that an injected 429 burst is absorbed by the fetcher's retries."""
+    config = StubConfig(rate_limit_every=10, rate_limit_burst=2, retry_after=0, frozen_time=FROZEN)
+    
+    async with stub_client(create_stub_app(config)) as client:
+        fetcher = stub_fetcher(client)
+        result = await fetcher.fetch("Oslo,NO")
+        stats = (await client.get("/stats")).json()
+    
+    assert result.source == SOURCE_LIVE
+    assert stats["rate_limited"] == 2
+    assert stats["requests"] == 3
+
+
+@pytest.mark.asyncio
+async def test_stub_error_injection_is_reproducible():
+    """Test that the same seed injects errors into the same requests."""
+    async def run() -> list:
+        config = StubConfig(error_rate=0.5, seed=7, frozen_time=FROZEN)
+        async with stub_client(create_stub_app(config)) as client:
+            return [
+                (await client.get("/data/2.5/weather", params={"q": f"City{i}", "appid": "x"})).status_code
+                for i in range(20)
+            ]
+    
+    first, second = await run(), await run()
+    
+    assert first == second
+    assert 500 in first and 200 in first
+
+
+@pytest.mark.asyncio
+async def test_stub_rejects_missing_api_key():
+    """Test that requests without appid get 401 like the real API."""
+    async with stub_client(create_stub_app(StubConfig())) as client:
+        response = await client.get("/data/2.5/weather", params={"q": "Oslo"})
+    
+    assert response.status_code == 401
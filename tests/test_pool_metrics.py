@@ -0,0 +1,52 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import create_async_engine
+from app.pool_metrics import Histogram, InstrumentedAsyncQueuePool, instrument_engine, pool_stats
+
+
+def test_histogram_buckets():
+    """Test that observations land in the right buckets."""
+    histogram = Histogram((0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value)
+    
+    stats = histogram.stats()
+    assert stats["buckets"] == {"le_0.1": 2, "le_1": 1, "inf": 1}
+    assert stats["count"] == 4
+    assert stats["max"] == 3.0
+
+
+@pytest.mark.asyncio
+async def test_pool_metrics_track_checkouts_and_timeouts(tmp_path):
+    """Test checkout counts, saturation timeouts and connection lifetimes."""
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}",
+        poolclass=InstrumentedAsyncQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.05,
+    )
+    metrics = instrument_engine(engine)
+    
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+        stats = pool_stats(engine, metrics)
+        assert stats["checked_out"] == 1
+        assert stats["overflow"] == 0
+        
+        with pytest.raises(PoolTimeoutError):
+            async with engine.connect():
+                pass
+    
+    stats = pool_stats(engine, metrics)
+    assert stats["checked_out"] == 0
+    assert stats["checkouts"] == 1
+    assert stats["checkins"] == 1
+    assert stats["timeouts"] == 1
+    assert stats["checkout_wait_seconds"]["count"] == 2
+    assert stats["checkout_wait_seconds"]["max"] >= 0.05
+    
+    await engine.dispose()
+    assert metrics.closes == 1
+    assert metrics.connection_lifetime.count == 1
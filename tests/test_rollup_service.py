@@ -0,0 +1,89 @@
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.schemas.weather import WeatherCreate
+from app.services.observation_service import ObservationService
+from app.services.rollup_service import RollupService
+
+
+def reading(at: datetime, temperature: float, city: str = "Rollup") -> WeatherCreate:
+    return WeatherCreate(
+        city=city,
+        country="RU",
+        temperature=temperature,
+        humidity=50.0,
+        pressure=1000.0 + temperature,
+        data_timestamp=at,
+    )
+
+
+@pytest.mark.asyncio
+async def test_refresh_builds_hourly_and_daily_rollups(test_session: AsyncSession):
+    """Test aggregating observations into hour and day buckets."""
+    await ObservationService(test_session).record([
+        (reading(datetime(2024, 1, 1, 10, 5), 10.0), "live"),
+        (reading(datetime(2024, 1, 1, 10, 35), 14.0), "live"),
+        (reading(datetime(2024, 1, 1, 11, 5), 18.0), "live"),
+        (reading(datetime(2024, 1, 1, 10, 5), 30.0, city="Other"), "live"),
+    ])
+    service = RollupService(test_session, settle_seconds=0)
+    
+    written = await service.refresh()
+    await test_session.commit()
+    
+    assert written == 5
+    hours = await service.get_stats("rollup", "hour", datetime(2024, 1, 1), datetime(2024, 1, 2))
+    assert [(h.bucket_start.hour, h.samples) for h in hours] == [(10, 2), (11, 1)]
+    assert hours[0].temperature_min == 10.0
+    assert hours[0].temperature_max == 14.0
+    assert hours[0].temperature_avg == 12.0
+    
+    days = await service.get_stats("Rollup", "day", datetime(2024, 1, 1), datetime(2024, 1, 2), country="ru")
+    assert len(days) == 1
+    assert days[0].samples == 3
+    assert days[0].pressure_max == 1018.0
+
+
+@pytest.mark.asyncio
+async def test_refresh_only_processes_new_observations(test_session: AsyncSession):
+    """Test that the watermark limits work to buckets touched since the last refresh."""
+    observations = ObservationService(test_session)
+    service = RollupService(test_session, settle_seconds=0)
+    
+    await observations.record([(reading(datetime(2024, 1, 1, 10, 0), 10.0), "live")])
+    await service.refresh()
+    assert await service.refresh() == 0
+    
+    await observations.record([(reading(datetime(2024, 1, 1, 10, 30), 20.0), "live")])
+    # Only the touched hour and its day are rewritten
+    assert await service.refresh() == 2
+    await test_session.commit()
+    
+    hours = await service.get_stats("Rollup", "hour", datetime(2024, 1, 1), datetime(2024, 1, 2))
+    assert hours[0].samples == 2
+    assert hours[0].temperature_avg == 15.0
+
+
+@pytest.mark.asyncio
+async def test_refresh_waits_for_settle_window_and_batches(test_session: AsyncSession):
+    """Test that recent observations stay pending and large backlogs fold in batches."""
+    observations = ObservationService(test_session)
+    await observations.record([(reading(datetime(2024, 1, 1, hour, 0), float(hour)), "live") for hour in range(5)])
+    
+    settling = RollupService(test_session, settle_seconds=3600)
+    assert await settling.refresh() == 0
+    assert await settling.next_pending() is None
+    assert await settling.get_watermark() is None
+    
+    # All five rows share one ingested_at, so a batch never splits them
+    service = RollupService(test_session, settle_seconds=0, batch_size=2)
+    assert await service.refresh() == 6
+    assert await service.get_watermark() <= datetime.utcnow()
+    
+    await observations.record([(reading(datetime(2024, 1, 2, hour, 0), 1.0), "live") for hour in range(3)])
+    await observations.record([(reading(datetime(2024, 1, 3, hour, 0), 1.0), "live") for hour in range(3)])
+    await test_session.commit()
+    assert await service.refresh(until=datetime.utcnow() + timedelta(hours=1)) == 8
+    
+    days = await service.get_stats("Rollup", "day", datetime(2024, 1, 1), datetime(2024, 1, 4))
+    assert [day.samples for day in days] == [5, 3, 3]
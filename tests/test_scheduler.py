@@ -0,0 +1,149 @@
+import asyncio
+import sys
+from datetime import datetime
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from app.models.log import ActionLog
+from app.models.weather import Weather
+from app.schemas.weather import WeatherCreate
+from app.services.fetch_engine import FetchEngine
+from app.services.synthetic_weather import SyntheticWeatherProvider
+from app.services.weather_fetcher import SOURCE_LIVE, SOURCE_UNAVAILABLE, FetchResult
+from app.services.weather_service import WeatherService
+from app.stub import StubConfig, create_stub_app
+from app.tasks.scheduler import update_weather_for_cities
+from tests.test_owm_stub import FROZEN, stub_client, stub_fetcher
+
+
+class FakeFetcher:
+    """Fetcher returning canned results per "city,country" query; exceptions are raised."""
+    
+    api_key = None
+    
+    def __init__(self, results):
+        self.results = results
+        self.engine = FetchEngine(max_in_flight=10, rate_per_minute=0, burst=1)
+    
+    async def fetch(self, query):
+        result = self.results[query]
+        if isinstance(result, Exception):
+            raise result
+        return result
+    
+    async def fetch_many(self, provider_ids):
+        return {}
+
+
+def stored(city, country, provider_id=None):
+    return WeatherCreate(
+        city=city, country=country, provider_id=provider_id,
+        temperature=-50.0, humidity=10.0, pressure=900.0,
+        data_timestamp=datetime(2024, 1, 1),
+    )
+
+
+async def seed(session, monkeypatch, test_engine, *rows):
+    saved = await WeatherService(session).bulk_upsert(list(rows))
+    await session.commit()
+    session_maker = async_sessionmaker(test_engine, expire_on_commit=False)
+    # app.tasks re-exports the AsyncIOScheduler instance under the module's name
+    monkeypatch.setattr(sys.modules["app.tasks.scheduler"], "async_session_maker", session_maker)
+    return {(weather.city, weather.country): weather.id for weather, _ in saved}
+
+
+async def scheduled_logs(session):
+    result = await session.scalars(select(ActionLog).where(ActionLog.action == "SCHEDULED_FETCH"))
+    return {log.entity_id: log for log in result.all()}
+
+
+@pytest.mark.asyncio
+async def test_update_refreshes_every_stored_row(test_session: AsyncSession, test_engine, monkeypatch):
+    """Test the scheduled fetch against the stub: same-named cities stay apart and rows update in place."""
+    app = create_stub_app(StubConfig(frozen_time=FROZEN, cities=["Paris,FR"]))
+    paris_id = next(iter(app.state.stub.cities_by_id))
+    
+    service = WeatherService(test_session)
+    await service.bulk_upsert([
+        stored("Paris", "FR", provider_id=paris_id),
+        stored("Paris", "US"),
+        stored("London", "GB"),
+        stored("Ghost", "ZZ", provider_id=1),
+    ])
+    await test_session.commit()
+    # app.tasks re-exports the AsyncIOScheduler instance under the module's name
+    session_maker = async_sessionmaker(test_engine, expire_on_commit=False)
+    monkeypatch.setattr(sys.modules["app.tasks.scheduler"], "async_session_maker", session_maker)
+    
+    async with stub_client(app) as client:
+        await update_weather_for_cities(stub_fetcher(client, attempts=1))
+    
+    test_session.expire_all()
+    rows = {(row.city, row.country): row for row in (await test_session.scalars(select(Weather))).all()}
+    assert set(rows) == {("Paris", "FR"), ("Paris", "US"), ("London", "GB"), ("Ghost", "ZZ")}
+    
+    provider = SyntheticWeatherProvider()
+    for city, country in (("Paris", "FR"), ("Paris", "US"), ("London", "GB")):
+        assert rows[city, country].data_timestamp == FROZEN
+        assert rows[city, country].temperature == provider.owm_payload(city, country, FROZEN)["main"]["temp"]
+    assert rows["Paris", "FR"].provider_id == paris_id
+    assert rows["Ghost", "ZZ"].data_timestamp == datetime(2024, 1, 1)
+    
+    logs = await scheduled_logs(test_session)
+    assert sorted(logs) == sorted(row.id for row in rows.values())
+    assert [weather_id for weather_id, log in logs.items() if log.status == "error"] == [rows["Ghost", "ZZ"].id]
+
+
+
+@pytest.mark.asyncio
+async def test_update_logs_each_city_once(test_session: AsyncSession, test_engine, monkeypatch):
+    """Test that the job updates rows in place and writes one log row per city, failures included."""
+    ids = await seed(
+        test_session, monkeypatch, test_engine,
+        stored("Oslo", "NO"), stored("Rome", "IT"), stored("Lima", "PE"), stored("Kyiv", "UA"),
+    )
+    fresh = stored("Oslo", "NO").model_copy(update={"temperature": 3.0, "data_timestamp": datetime(2024, 6, 1)})
+    fetcher = FakeFetcher({
+        "Oslo,NO": FetchResult(fresh, SOURCE_LIVE),
+        "Rome,IT": FetchResult(None, SOURCE_UNAVAILABLE, error="Provider returned HTTP 503"),
+        "Lima,PE": RuntimeError("boom"),
+        "Kyiv,UA": asyncio.CancelledError(),
+    })
+    
+    await update_weather_for_cities(fetcher)
+    
+    test_session.expire_all()
+    rows = {(row.city, row.country): row for row in (await test_session.scalars(select(Weather))).all()}
+    assert {key: row.id for key, row in rows.items()} == ids
+    assert rows["Oslo", "NO"].temperature == 3.0
+    assert rows["Rome", "IT"].temperature == -50.0
+    
+    logs = await scheduled_logs(test_session)
+    assert sorted(logs) == sorted(ids.values())
+    assert logs[ids["Oslo", "NO"]].status == "success"
+    assert logs[ids["Rome", "IT"]].error_message == "Provider returned HTTP 503"
+    assert logs[ids["Lima", "PE"]].error_message == "boom"
+    assert logs[ids["Kyiv", "UA"]].status == "error"
+    assert '"source": "live"' in logs[ids["Oslo", "NO"]].details
+
+
+@pytest.mark.asyncio
+async def test_update_logs_failed_save(test_session: AsyncSession, test_engine, monkeypatch):
+    """Test that a failed batch save is rolled back and logged for every fetched city."""
+    ids = await seed(test_session, monkeypatch, test_engine, stored("Oslo", "NO"), stored("Rome", "IT"))
+    fetcher = FakeFetcher({
+        query: FetchResult(stored(*query.split(",")).model_copy(update={"temperature": 3.0}), SOURCE_LIVE)
+        for query in ("Oslo,NO", "Rome,IT")
+    })
+    
+    async def fail(self, items, chunk_size=None):
+        raise RuntimeError("database unavailable")
+    
+    monkeypatch.setattr(WeatherService, "bulk_upsert", fail)
+    await update_weather_for_cities(fetcher)
+    
+    test_session.expire_all()
+    assert {row.temperature for row in (await test_session.scalars(select(Weather))).all()} == {-50.0}
+    logs = await scheduled_logs(test_session)
+    assert sorted(logs) == sorted(ids.values())
+    assert {log.error_message for log in logs.values()} == {"database unavailable"}
@@ -0,0 +1,102 @@
+import math
+import numpy as np
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from app import database
+from app.database import READ_REPLICA, READ_SOURCE, Base
+from app.schemas.weather import WeatherCreate
+from app.services.spatial_index import EARTH_RADIUS_KM, SpatialIndex
+from app.services.weather_service import WeatherService
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def test_nearest_matches_haversine_scan():
+    """Test k-nearest results against a brute-force haversine scan."""
+    rng = np.random.default_rng(7)
+    points = {i: (float(rng.uniform(-90, 90)), float(rng.uniform(-180, 180))) for i in range(1, 2001)}
+    index = SpatialIndex(capacity=4)
+    for weather_id, (lat, lon) in points.items():
+        index.upsert(weather_id, lat, lon)
+    
+    for lat, lon in [(55.75, 37.62), (-33.9, 151.2), (89.9, 179.9), (0.0, -180.0)]:
+        expected = sorted((haversine_km(lat, lon, *point), weather_id) for weather_id, point in points.items())
+        hits = index.nearest(lat, lon, k=5)
+        assert [weather_id for weather_id, _ in hits] == [weather_id for _, weather_id in expected[:5]]
+        for (_, distance), (expected_distance, _) in zip(hits, expected):
+            assert distance == pytest.approx(expected_distance, abs=1e-6)
+        
+        radius = expected[3][0] + 1e-3
+        assert len(index.nearest(lat, lon, k=50, radius_km=radius)) == 4
+
+
+def test_upsert_and_remove():
+    """Test moving, removing and re-adding entries keeps slots consistent."""
+    index = SpatialIndex(capacity=2)
+    index.upsert(1, 0.0, 0.0)
+    index.upsert(2, 0.0, 10.0)
+    index.upsert(3, 0.0, 20.0)
+    
+    index.remove(1)
+    index.upsert(2, None, None)
+    assert len(index) == 1
+    assert index.nearest(0.0, 0.0, k=3)[0][0] == 3
+    
+    index.upsert(3, 0.0, 1.0)
+    index.upsert(4, 0.0, 2.0)
+    assert [weather_id for weather_id, _ in index.nearest(0.0, 0.0, k=3)] == [3, 4]
+
+
+@pytest.mark.asyncio
+async def test_entries_applied_on_commit(test_session: AsyncSession):
+    """Test that written entries reach the index only when their transaction commits."""
+    index = SpatialIndex()
+    service = WeatherService(test_session, index=index)
+    await index.refresh(test_session)
+    
+    await service.create(WeatherCreate(
+        city="Rollback", country="RB", latitude=10.0, longitude=10.0,
+        temperature=1.0, humidity=1.0, pressure=1.0,
+    ))
+    assert index.nearest(10.0, 10.0, k=1) == []
+    await test_session.rollback()
+    await index.refresh(test_session)
+    assert index.nearest(10.0, 10.0, k=1) == []
+    
+    weather = await service.create(WeatherCreate(
+        city="Commit", country="CM", latitude=10.0, longitude=10.0,
+        temperature=1.0, humidity=1.0, pressure=1.0,
+    ))
+    await test_session.commit()
+    assert index.nearest(10.0, 10.0, k=1)[0][0] == weather.id
+    assert index.stats()["partial_loads"] == 0
+
+
+@pytest.mark.asyncio
+async def test_dirty_entries_reread_on_primary(test_session: AsyncSession, test_engine, monkeypatch):
+    """Test that dirty ids are not re-read from a lagging replica."""
+    monkeypatch.setattr(database, "async_session_maker", async_sessionmaker(test_engine, expire_on_commit=False))
+    replica_engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with replica_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    
+    index = SpatialIndex()
+    await index.refresh(test_session)
+    weather = await WeatherService(test_session, index=SpatialIndex()).create(WeatherCreate(
+        city="Moved", country="MV", latitude=10.0, longitude=10.0,
+        temperature=1.0, humidity=1.0, pressure=1.0,
+    ))
+    await test_session.commit()
+    index.mark_dirty([weather.id])
+    
+    # The replica has not replayed the write yet
+    async with async_sessionmaker(replica_engine)() as replica:
+        replica.info[READ_SOURCE] = READ_REPLICA
+        await index.refresh(replica)
+    await replica_engine.dispose()
+    
+    assert index.nearest(10.0, 10.0, k=1)[0][0] == weather.id
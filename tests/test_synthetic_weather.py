@@ -0,0 +1,56 @@
+from datetime import datetime, timedelta
+from app.services.synthetic_weather import SyntheticWeatherProvider
+
+
+def test_same_city_and_time_give_identical_data():
+    """Test that synthetic data is fully determined by city and time."""
+    at = datetime(2024, 6, 1, 12, 0)
+    
+    first = SyntheticWeatherProvider().observe("Moscow", "RU", at)
+    second = SyntheticWeatherProvider().observe(" moscow ", "ru", at)
+    
+    names = {"city": None, "country": None}
+    assert {**first, **names} == {**second, **names}
+
+
+def test_coordinates_are_stable_per_city():
+    """Test that a city keeps its coordinates across calls and times."""
+    provider = SyntheticWeatherProvider()
+    
+    early = provider.observe("Paris", "FR", datetime(2024, 1, 1))
+    late = provider.observe("Paris", "FR", datetime(2024, 7, 1))
+    other = provider.observe("Tokyo", "JP", datetime(2024, 1, 1))
+    
+    assert (early["latitude"], early["longitude"]) == (late["latitude"], late["longitude"])
+    assert (early["latitude"], early["longitude"]) != (other["latitude"], other["longitude"])
+
+
+def test_values_vary_smoothly_over_time():
+    """Test that consecutive minutes differ slightly while the day cycle is visible."""
+    provider = SyntheticWeatherProvider()
+    start = datetime(2024, 3, 10)
+    
+    temperatures = [
+        provider.observe("Berlin", "DE", start + timedelta(minutes=10 * i))["temperature"]
+        for i in range(144)
+    ]
+    steps = [abs(b - a) for a, b in zip(temperatures, temperatures[1:])]
+    
+    assert max(steps) < 1.0
+    assert max(temperatures) - min(temperatures) > 3
+
+
+def test_owm_payload_round_trips_through_parser():
+    """Test that the OWM-format payload parses back to the same values."""
+    from app.services.weather_fetcher import WeatherFetcher
+    
+    at = datetime(2024, 6, 1, 12, 0)
+    provider = SyntheticWeatherProvider()
+    payload = provider.owm_payload("Rome", "IT", at)
+    parsed = WeatherFetcher()._parse_response(payload)
+    expected = provider.observe("Rome", "IT", at)
+    
+    assert parsed.provider_id == expected["provider_id"]
+    assert parsed.temperature == expected["temperature"]
+    assert parsed.latitude == expected["latitude"]
+    assert parsed.data_timestamp == at
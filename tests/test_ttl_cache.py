@@ -0,0 +1,89 @@
+import asyncio
+import pytest
+from app.services.ttl_cache import TTLCache
+
+
+def test_cache_hit_and_miss_counters():
+    """Test basic get/set accounting."""
+    cache = TTLCache(ttl_seconds=60, max_entries=10)
+    
+    assert cache.get("a") is None
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["hit_ratio"] == 0.5
+
+
+def test_cache_evicts_least_recently_used():
+    """Test that the entry count bound evicts the oldest unused entry."""
+    cache = TTLCache(ttl_seconds=60, max_entries=2)
+    
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.evictions == 1
+
+
+@pytest.mark.asyncio
+async def test_cache_entries_expire():
+    """Test that entries are dropped after their TTL."""
+    cache = TTLCache(ttl_seconds=0.02, max_entries=10)
+    
+    cache.set("a", 1)
+    await asyncio.sleep(0.03)
+    
+    assert cache.get("a") is None
+    assert cache.expirations == 1
+    assert len(cache) == 0
+
+
+@pytest.mark.asyncio
+async def test_get_or_load_shares_loader_errors():
+    """Test that coalesced callers receive the loader's exception."""
+    cache = TTLCache(ttl_seconds=60, max_entries=10)
+    
+    async def loader():
+        await asyncio.sleep(0.01)
+        raise ValueError("upstream down")
+    
+    results = await asyncio.gather(
+        *(cache.get_or_load("a", loader) for _ in range(3)),
+        return_exceptions=True,
+    )
+    
+    assert all(isinstance(result, ValueError) for result in results)
+    assert cache.coalesced == 2
+    assert len(cache) == 0
+
+
+
+@pytest.mark.asyncio
+async def test_waiters_take_over_a_cancelled_load():
+    """Test that cancelling the loading caller does not cancel the callers coalesced onto it."""
+    cache = TTLCache(ttl_seconds=60, max_entries=10)
+    calls = 0
+    
+    async def loader():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.02)
+        return calls
+    
+    leader = asyncio.create_task(cache.get_or_load("a", loader))
+    await asyncio.sleep(0)
+    waiters = [asyncio.create_task(cache.get_or_load("a", loader)) for _ in range(2)]
+    await asyncio.sleep(0.005)
+    leader.cancel()
+    
+    assert await asyncio.gather(*waiters) == [2, 2]
+    assert leader.cancelled()
+    assert calls == 2
+    assert cache.get("a") == 2
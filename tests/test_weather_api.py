@@ -1,5 +1,13 @@
+import csv
+import io
+import json
 import pytest
+from datetime import datetime
 from httpx import AsyncClient
+from app.config import get_settings
+from app.schemas.weather import WeatherCreate
+from app.services.observation_service import ObservationService
+from app.services.rollup_service import RollupService
 
 
 @pytest.mark.asyncio
@@ -262,3 +270,362 @@ async def test_fetch_weather_for_city(client: AsyncClient):
     assert "humidity" in data
     assert "id" in data  # Record was saved to database
 
+
+
+@pytest.mark.asyncio
+async def test_fetcher_stats_endpoint(client: AsyncClient):
+    """Test internal fetch engine statistics endpoint."""
+    response = await client.get("/internal/fetcher")
+    assert response.status_code == 200
+    
+    engine = response.json()["engine"]
+    assert "max_in_flight" in engine
+    assert "avg_wait_seconds" in engine
+
+
+@pytest.mark.asyncio
+async def test_create_weather_duplicate_city(client: AsyncClient):
+    """Test that creating a second row for the same city is a conflict."""
+    payload = {
+        "city": "Vienna",
+        "country": "AT",
+        "temperature": 12.0,
+        "humidity": 70.0,
+        "pressure": 1012.0,
+    }
+    
+    response = await client.post("/api/v1/weather/", json=payload)
+    assert response.status_code == 201
+    
+    response = await client.post("/api/v1/weather/", json={**payload, "city": " VIENNA "})
+    assert response.status_code == 409
+    
+    response = await client.get("/api/v1/weather/city/Vienna")
+    assert response.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_weather_list_cursor_pagination(client: AsyncClient):
+    """Test following next_cursor through the weather list."""
+    for i in range(7):
+        await client.post("/api/v1/weather/", json={
+            "city": f"CursorCity{i}",
+            "country": "CC",
+            "temperature": 20.0,
+            "humidity": 50.0,
+            "pressure": 1010.0,
+            "data_timestamp": f"2024-01-01T12:0{i % 2}:00",
+        })
+    
+    seen = []
+    response = await client.get("/api/v1/weather/?size=3")
+    while True:
+        data = response.json()
+        seen.extend(item["city"] for item in data["items"])
+        if not data["next_cursor"]:
+            break
+        response = await client.get(f"/api/v1/weather/?size=3&cursor={data['next_cursor']}")
+    
+    assert len(seen) == 7
+    assert len(set(seen)) == 7
+
+
+@pytest.mark.asyncio
+async def test_list_invalid_cursor(client: AsyncClient):
+    """Test that a malformed cursor is rejected."""
+    response = await client.get("/api/v1/weather/?cursor=not-a-cursor")
+    assert response.status_code == 400
+    
+    response = await client.get("/api/v1/logs/?cursor=not-a-cursor")
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_weather_list_without_total(client: AsyncClient):
+    """Test that total=none skips the count and reports has_more."""
+    for i in range(4):
+        await client.post("/api/v1/weather/", json={
+            "city": f"NoTotalCity{i}",
+            "country": "NT",
+            "temperature": 20.0,
+            "humidity": 50.0,
+            "pressure": 1010.0,
+        })
+    
+    response = await client.get("/api/v1/weather/?size=3&total=none")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total"] is None
+    assert data["pages"] is None
+    assert data["total_mode"] == "none"
+    assert data["has_more"] is True
+    assert len(data["items"]) == 3
+    
+    response = await client.get(f"/api/v1/weather/?size=3&total=none&cursor={data['next_cursor']}")
+    data = response.json()
+    assert data["has_more"] is False
+    assert data["next_cursor"] is None
+    assert len(data["items"]) == 1
+    
+    response = await client.get("/api/v1/weather/?total=bogus")
+    assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_weather_stats_endpoint(client: AsyncClient, test_session):
+    """Test reading city stats from the rollups."""
+    await ObservationService(test_session).record([
+        (WeatherCreate(
+            city="StatsCity",
+            country="SC",
+            temperature=float(t),
+            humidity=50.0,
+            pressure=1010.0,
+            data_timestamp=datetime(2024, 3, 1, t),
+        ), "live")
+        for t in range(6)
+    ])
+    await RollupService(test_session, settle_seconds=0).refresh()
+    await test_session.commit()
+    
+    response = await client.get(
+        "/api/v1/weather/city/statscity/stats?bucket=day&from=2024-03-01T00:00:00&to=2024-03-02T00:00:00"
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["bucket"] == "day"
+    assert len(data["items"]) == 1
+    assert data["items"][0]["samples"] == 6
+    assert data["items"][0]["temperature_avg"] == 2.5
+    
+    response = await client.get(
+        "/api/v1/weather/city/StatsCity/stats?from=2024-03-01T00:00:00&to=2024-03-01T03:00:00"
+    )
+    assert len(response.json()["items"]) == 3
+    
+    response = await client.get("/api/v1/weather/city/StatsCity/stats?bucket=week")
+    assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_bulk_create_json_array(client: AsyncClient):
+    """Test bulk creation with per-item results and one summary log."""
+    await client.post("/api/v1/weather/", json={
+        "city": "BulkExisting", "country": "BK", "temperature": 1.0, "humidity": 50.0, "pressure": 1000.0,
+    })
+    payload = [
+        {"city": "BulkA", "country": "BK", "temperature": 10.0, "humidity": 50.0, "pressure": 1000.0},
+        {"city": "BulkB", "country": "BK", "temperature": 11.0, "humidity": 150.0, "pressure": 1000.0},
+        {"city": "bulkexisting", "country": "bk", "temperature": 12.0, "humidity": 50.0, "pressure": 1000.0},
+        {"city": "BulkA", "country": "BK", "temperature": 13.0, "humidity": 50.0, "pressure": 1000.0},
+    ]
+    
+    response = await client.post("/api/v1/weather/bulk", json=payload)
+    assert response.status_code == 200
+    data = response.json()
+    assert (data["total"], data["created"], data["conflicts"], data["invalid"]) == (4, 1, 2, 1)
+    assert [item["status"] for item in data["items"]] == ["created", "invalid", "conflict", "conflict"]
+    assert "humidity" in data["items"][1]["errors"][0]
+    
+    response = await client.get(f"/api/v1/weather/{data['items'][0]['id']}")
+    assert response.json()["temperature"] == 10.0
+    
+    response = await client.get("/api/v1/logs/?action=BULK_CREATE")
+    assert response.json()["total"] == 1
+
+
+@pytest.mark.asyncio
+async def test_bulk_create_ndjson_update(client: AsyncClient):
+    """Test NDJSON bodies and updating existing cities."""
+    lines = [
+        '{"city": "NdA", "country": "ND", "temperature": 1.0, "humidity": 50.0, "pressure": 1000.0}',
+        '{"city": "NdB", "country": "ND", "temperature": 2.0, "humidity": 50.0, "pressure": 1000.0}',
+    ]
+    response = await client.post(
+        "/api/v1/weather/bulk",
+        content="\n".join(lines).encode(),
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    assert response.json()["created"] == 2
+    
+    response = await client.post(
+        "/api/v1/weather/bulk?on_conflict=update",
+        content=lines[0].replace("1.0", "5.0").encode(),
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    data = response.json()
+    assert data["updated"] == 1
+    
+    response = await client.get("/api/v1/weather/city/NdA")
+    assert response.json()["temperature"] == 5.0
+
+
+@pytest.mark.asyncio
+async def test_bulk_create_limits(client: AsyncClient, monkeypatch):
+    """Test the item limit and malformed bodies."""
+    monkeypatch.setattr(get_settings(), "bulk_max_items", 2)
+    
+    item = {"city": "Lim", "country": "LM", "temperature": 1.0, "humidity": 50.0, "pressure": 1000.0}
+    response = await client.post("/api/v1/weather/bulk", json=[item, item, item])
+    assert response.status_code == 413
+    
+    response = await client.post("/api/v1/weather/bulk", content=b'[{"city": "Lim"')
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_export_weather(client: AsyncClient):
+    """Test streaming weather exports as NDJSON and CSV."""
+    for i in range(3):
+        await client.post("/api/v1/weather/", json={
+            "city": f"Export{i}", "country": "EX", "temperature": float(i), "humidity": 50.0, "pressure": 1000.0,
+        })
+    
+    response = await client.get("/api/v1/weather/export?country=ex")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert sorted(row["city"] for row in rows) == ["Export0", "Export1", "Export2"]
+    
+    response = await client.get("/api/v1/weather/export?city=Export1&format=csv")
+    assert response.headers["content-type"].startswith("text/csv")
+    assert 'filename="weather.csv"' in response.headers["content-disposition"]
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert len(rows) == 1
+    assert rows[0]["temperature"] == "1.0"
+    assert rows[0]["wind_speed"] == ""
+
+
+@pytest.mark.asyncio
+async def test_export_logs(client: AsyncClient):
+    """Test streaming log exports with filters."""
+    await client.post("/api/v1/weather/", json={
+        "city": "ExportLog", "country": "EX", "temperature": 1.0, "humidity": 50.0, "pressure": 1000.0,
+    })
+    
+    response = await client.get("/api/v1/logs/export?action=CREATE&format=csv")
+    assert response.status_code == 200
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert len(rows) == 1
+    assert rows[0]["action"] == "CREATE"
+    
+    response = await client.get("/api/v1/logs/export?action=DELETE")
+    assert response.text == ""
+
+
+@pytest.mark.asyncio
+async def test_weather_near(client: AsyncClient):
+    """Test nearest-city lookup, radius filter and coordinate updates."""
+    cities = [("Paris", "FR", 48.8566, 2.3522), ("Brussels", "BE", 50.8503, 4.3517), ("Madrid", "ES", 40.4168, -3.7038)]
+    ids = {}
+    for city, country, lat, lon in cities:
+        response = await client.post("/api/v1/weather/", json={
+            "city": city, "country": country, "latitude": lat, "longitude": lon,
+            "temperature": 15.0, "humidity": 50.0, "pressure": 1010.0,
+        })
+        ids[city] = response.json()["id"]
+    await client.post("/api/v1/weather/", json={"city": "Nowhere", "country": "XX", "temperature": 1.0, "humidity": 1.0, "pressure": 1.0})
+    
+    response = await client.get("/api/v1/weather/near", params={"lat": 49.0, "lon": 2.5, "k": 2})
+    assert response.status_code == 200
+    items = response.json()["items"]
+    assert [item["city"] for item in items] == ["Paris", "Brussels"]
+    assert 15 < items[0]["distance_km"] < 20
+    
+    response = await client.get("/api/v1/weather/near", params={"lat": 49.0, "lon": 2.5, "k": 5, "radius_km": 300})
+    assert [item["city"] for item in response.json()["items"]] == ["Paris", "Brussels"]
+    
+    await client.put(f"/api/v1/weather/{ids['Madrid']}", json={"latitude": 49.0, "longitude": 2.6})
+    response = await client.get("/api/v1/weather/near", params={"lat": 49.0, "lon": 2.5, "k": 1})
+    assert response.json()["items"][0]["city"] == "Madrid"
+    
+    response = await client.get("/api/v1/weather/near", params={"lat": 91, "lon": 0})
+    assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_weather_interpolate(client: AsyncClient, monkeypatch):
+    """Test single and batch interpolation between cities."""
+    response = await client.get("/api/v1/weather/interpolate", params={"lat": 0, "lon": 0})
+    assert response.status_code == 404
+    
+    for city, lon, temperature in [("West", 0.0, 10.0), ("East", 2.0, 20.0)]:
+        await client.post("/api/v1/weather/", json={
+            "city": city, "country": "EQ", "latitude": 0.0, "longitude": lon,
+            "temperature": temperature, "humidity": 50.0, "pressure": 1000.0,
+        })
+    
+    response = await client.get("/api/v1/weather/interpolate", params={"lat": 0, "lon": 1})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["temperature"] == pytest.approx(15.0)
+    assert data["wind_speed"] is None
+    
+    points = [{"lat": 0.0, "lon": 0.0}, {"lat": 0.0, "lon": 1.0}, {"lat": 0.0, "lon": 2.0}]
+    response = await client.post("/api/v1/weather/interpolate", json={"points": points, "k": 2})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["k"] == 2
+    assert [item["temperature"] for item in data["items"]] == pytest.approx([10.0, 15.0, 20.0])
+    
+    monkeypatch.setattr(get_settings(), "interpolation_max_points", 2)
+    response = await client.post("/api/v1/weather/interpolate", json={"points": points})
+    assert response.status_code == 413
+
+
+@pytest.mark.asyncio
+async def test_weather_top(client: AsyncClient):
+    """Test top-N cities by a field with filters, served from the columnar snapshot."""
+    for city, country, temperature in [("Cairo", "EG", 35.0), ("Luxor", "EG", 41.0), ("Oslo", "NO", -2.0), ("Lima", "PE", 22.0)]:
+        await client.post("/api/v1/weather/", json={
+            "city": city, "country": country, "temperature": temperature, "humidity": 40.0, "pressure": 1010.0,
+        })
+    
+    response = await client.get("/api/v1/weather/top", params={"n": 2})
+    assert response.status_code == 200
+    assert response.json()["field"] == "temperature"
+    assert [item["city"] for item in response.json()["items"]] == ["Luxor", "Cairo"]
+    
+    response = await client.get("/api/v1/weather/top", params={"order": "asc", "max_value": 30})
+    assert [item["city"] for item in response.json()["items"]] == ["Oslo", "Lima"]
+    
+    response = await client.get("/api/v1/weather/top", params={"country": "eg", "order": "asc", "n": 1})
+    assert [item["city"] for item in response.json()["items"]] == ["Cairo"]
+    
+    response = await client.get("/api/v1/weather/top", params={"field": "city"})
+    assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_sparse_fieldsets(client: AsyncClient):
+    """Test ?fields= narrowing on the list, single-record and log endpoints."""
+    for city, temperature in [("Riga", 4.0), ("Vilnius", 6.0), ("Tallinn", 2.0)]:
+        response = await client.post("/api/v1/weather/", json={
+            "city": city, "country": "BL", "temperature": temperature, "humidity": 70.0, "pressure": 1005.0,
+        })
+    weather_id = response.json()["id"]
+    
+    response = await client.get("/api/v1/weather/", params={"fields": "temperature, city", "size": 2})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total"] == 3
+    assert all(set(item) == {"city", "temperature"} for item in data["items"])
+    
+    # The cursor still works although the sort key columns are not returned
+    response = await client.get("/api/v1/weather/", params={"fields": "city", "cursor": data["next_cursor"]})
+    seen = [item["city"] for item in data["items"]] + [item["city"] for item in response.json()["items"]]
+    assert sorted(seen) == ["Riga", "Tallinn", "Vilnius"]
+    
+    response = await client.get(f"/api/v1/weather/{weather_id}", params={"fields": "id,data_timestamp"})
+    assert set(response.json()) == {"id", "data_timestamp"}
+    
+    response = await client.get("/api/v1/weather/city/Riga", params={"fields": "city,temperature"})
+    assert response.json() == {"city": "Riga", "temperature": 4.0}
+    
+    response = await client.get("/api/v1/logs/", params={"fields": "action,status"})
+    assert response.status_code == 200
+    assert response.json()["items"][0] == {"action": "CREATE", "status": "success"}
+    
+    for url in ["/api/v1/weather/", f"/api/v1/weather/{weather_id}", "/api/v1/logs/"]:
+        response = await client.get(url, params={"fields": "city,password"})
+        assert response.status_code == 400
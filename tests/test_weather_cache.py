@@ -0,0 +1,127 @@
+import asyncio
+import pytest
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import READ_REPLICA, READ_SOURCE, READ_YOUR_WRITES
+from app.models.weather import Weather
+from app.schemas.weather import WeatherCreate, WeatherUpdate
+from app.services.weather_cache import WeatherReadCache
+from app.services.weather_service import WeatherService
+
+
+def make_service(session: AsyncSession) -> WeatherService:
+    return WeatherService(session, cache=WeatherReadCache(ttl_seconds=60, max_entries=100))
+
+
+async def create(service: WeatherService, city: str = "Cached", temperature: float = 20.0):
+    weather = await service.create(WeatherCreate(
+        city=city,
+        country="CA",
+        temperature=temperature,
+        humidity=50.0,
+        pressure=1010.0,
+    ))
+    await service.db.commit()
+    return weather
+
+
+@pytest.mark.asyncio
+async def test_snapshot_served_from_cache(test_session: AsyncSession):
+    """Test that repeated lookups hit the cache and return frozen snapshots."""
+    service = make_service(test_session)
+    weather = await create(service)
+    
+    first = await service.get_snapshot_by_city("cached")
+    second = await service.get_snapshot_by_city("CACHED")
+    by_id = await service.get_snapshot_by_id(weather.id)
+    
+    assert first is second
+    assert by_id.city == "Cached"
+    assert service.cache.stats()["hits"] == 1
+    with pytest.raises(ValidationError):
+        first.temperature = 0.0
+
+
+@pytest.mark.asyncio
+async def test_update_invalidates_old_and_new_keys(test_session: AsyncSession):
+    """Test that a rename drops the cached entries of both cities."""
+    service = make_service(test_session)
+    weather = await create(service)
+    await service.get_snapshot_by_city("Cached", "CA")
+    await service.get_snapshot_by_id(weather.id)
+    
+    await service.update(weather.id, WeatherUpdate(city="Renamed", temperature=25.0))
+    await test_session.commit()
+    
+    assert await service.get_snapshot_by_city("Cached", "CA") is None
+    renamed = await service.get_snapshot_by_id(weather.id)
+    assert renamed.city == "Renamed"
+    assert renamed.temperature == 25.0
+
+
+@pytest.mark.asyncio
+async def test_delete_and_upsert_invalidate(test_session: AsyncSession):
+    """Test that deletes and upserts drop cached snapshots."""
+    service = make_service(test_session)
+    weather = await create(service)
+    await create(service, city="Other")
+    await service.get_snapshot_by_id(weather.id)
+    other = await service.get_snapshot_by_city("Other")
+    
+    await service.upsert_by_city(WeatherCreate(
+        city="other", country="ca", temperature=30.0, humidity=40.0, pressure=1000.0,
+    ))
+    await service.delete(weather.id)
+    await test_session.commit()
+    
+    assert await service.get_snapshot_by_id(weather.id) is None
+    assert (await service.get_snapshot_by_city("Other")).temperature == 30.0
+    assert other.temperature == 20.0
+
+
+@pytest.mark.asyncio
+async def test_load_overlapping_invalidation_is_not_stored():
+    """Test that a value loaded across an invalidation is not cached."""
+    cache = WeatherReadCache(ttl_seconds=60, max_entries=10)
+    started = asyncio.Event()
+    release = asyncio.Event()
+    
+    async def slow_loader():
+        started.set()
+        await release.wait()
+        return "stale"
+    
+    task = asyncio.create_task(cache.get_or_load(("id", 1), slow_loader))
+    await started.wait()
+    cache.invalidate([("id", 1)])
+    release.set()
+    
+    assert await task == "stale"
+    assert len(cache.cache) == 0
+
+
+@pytest.mark.asyncio
+async def test_replica_and_read_your_writes_sessions(test_session: AsyncSession):
+    """Test that replica loads are not cached and read-your-writes loads skip a stale entry."""
+    service = make_service(test_session)
+    weather_id = (await create(service)).id
+    
+    test_session.info[READ_SOURCE] = READ_REPLICA
+    await service.get_snapshot_by_id(weather_id)
+    assert service.cache.stats()["entries"] == 0
+    
+    # A stale copy cached by an earlier primary read
+    del test_session.info[READ_SOURCE]
+    stale = await service.get_snapshot_by_id(weather_id)
+    await test_session.execute(
+        Weather.__table__.update().where(Weather.id == weather_id).values(temperature=31.0)
+    )
+    test_session.expire_all()
+    assert (await service.get_snapshot_by_id(weather_id)) is stale
+    
+    test_session.info[READ_SOURCE] = READ_YOUR_WRITES
+    fresh = await service.get_snapshot_by_id(weather_id)
+    assert fresh.temperature == 31.0
+    
+    del test_session.info[READ_SOURCE]
+    assert (await service.get_snapshot_by_id(weather_id)) is fresh
@@ -1,5 +1,28 @@
+import asyncio
+import time
+import httpx
 import pytest
-from app.services.weather_fetcher import WeatherFetcher
+from app.services.weather_fetcher import (
+    WeatherFetcher,
+    SOURCE_CACHED,
+    SOURCE_LIVE,
+    SOURCE_SYNTHETIC,
+    SOURCE_UNAVAILABLE,
+)
+from app.services.resilience import CircuitBreaker, RetryPolicy
+from app.services.fetch_engine import FetchEngine
+from app.services.http_client import get_http_client, init_http_client, close_http_client
+from app.services.ttl_cache import TTLCache
+
+
+OSLO_RESPONSE = {
+    "name": "Oslo",
+    "sys": {"country": "NO"},
+    "coord": {"lat": 59.91, "lon": 10.75},
+    "main": {"temp": 4.2, "humidity": 81, "pressure": 1008},
+    "weather": [{"main": "Clouds", "description": "overcast clouds"}],
+    "dt": 1700000000,
+}
 
 
 @pytest.mark.asyncio
@@ -89,3 +112,306 @@ async def test_weather_data_has_coordinates():
     assert weather_data.longitude is not None
     assert -90 <= weather_data.latitude <= 90
     assert -180 <= weather_data.longitude <= 180
+
+
+@pytest.mark.asyncio
+async def test_fetcher_reuses_shared_client():
+    """Test that fetchers share one pooled HTTP client."""
+    first = WeatherFetcher()
+    second = WeatherFetcher()
+    
+    assert first.client is second.client
+    assert first.client is get_http_client()
+
+
+@pytest.mark.asyncio
+async def test_fetch_weather_uses_injected_client():
+    """Test that the fetcher sends requests through the provided client."""
+    requests = []
+    
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(200, json=OSLO_RESPONSE)
+    
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        fetcher = WeatherFetcher(client=client, cache=TTLCache(ttl_seconds=60, max_entries=10))
+        fetcher.api_key = "test-key"
+        weather_data = await fetcher.fetch_weather("Oslo,NO")
+    
+    assert len(requests) == 1
+    assert requests[0].url.params["q"] == "Oslo,NO"
+    assert weather_data.city == "Oslo"
+    assert weather_data.temperature == 4.2
+
+
+@pytest.mark.asyncio
+async def test_close_http_client_resets_shared_client():
+    """Test that closing the shared client lets the next caller get a fresh one."""
+    client = await init_http_client()
+    await close_http_client()
+    
+    assert client.is_closed
+    assert get_http_client() is not client
+
+
+@pytest.mark.asyncio
+async def test_concurrent_fetches_for_same_city_coalesce():
+    """Test that concurrent misses for one city make a single upstream call."""
+    calls = 0
+    
+    async def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, json=OSLO_RESPONSE)
+    
+    cache = TTLCache(ttl_seconds=60, max_entries=10)
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        fetcher = WeatherFetcher(client=client, cache=cache)
+        fetcher.api_key = "test-key"
+        results = await asyncio.gather(*(
+            fetcher.fetch_weather(query) for query in ["Oslo,NO", "oslo, no", " OSLO ,No"] * 5
+        ))
+        cached = await fetcher.fetch_weather("Oslo,NO")
+    
+    assert calls == 1
+    assert all(result.city == "Oslo" for result in results)
+    assert cached.temperature == 4.2
+    assert cache.coalesced == 14
+    assert cache.hits == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_fetch_is_not_cached():
+    """Test that upstream failures are retried on the next call."""
+    calls = 0
+    
+    def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            return httpx.Response(404)
+        return httpx.Response(200, json=OSLO_RESPONSE)
+    
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        fetcher = make_fetcher(client)
+        first = await fetcher.fetch("Oslo,NO")
+        second = await fetcher.fetch("Oslo,NO")
+    
+    assert calls == 2
+    assert first.data is None
+    assert first.source == SOURCE_UNAVAILABLE
+    assert "404" in first.error
+    assert second.source == SOURCE_LIVE
+    assert second.data.temperature == 4.2
+
+
+@pytest.mark.asyncio
+async def test_fetch_result_reports_source():
+    """Test that results say whether data is synthetic, live or cached."""
+    synthetic = await WeatherFetcher().fetch("Moscow,RU")
+    assert synthetic.source == SOURCE_SYNTHETIC
+    
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json=OSLO_RESPONSE)
+    
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        fetcher = make_fetcher(client)
+        live = await fetcher.fetch("Oslo,NO")
+        cached = await fetcher.fetch("Oslo,NO")
+    
+    assert live.source == SOURCE_LIVE
+    assert cached.source == SOURCE_CACHED
+    assert cached.data == live.data
+
+
+@pytest.mark.asyncio
+async def test_retries_server_errors_then_succeeds():
+    """Test that retryable statuses are retried with backoff."""
+    statuses = [503, 502, 200]
+    
+    def handler(request: httpx.Request) -> httpx.Response:
+        status = statuses.pop(0)
+        if status != 200:
+            return httpx.Response(status)
+        return httpx.Response(200, json=OSLO_RESPONSE)
+    
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        fetcher = make_fetcher(client)
+        result = await fetcher.fetch("Oslo,NO")
+    
+    assert result.source == SOURCE_LIVE
+    assert statuses == []
+    assert fetcher.breaker.state == CircuitBreaker.CLOSED
+
+
+@pytest.mark.asyncio
+async def test_upstream_failure_does_not_fall_back_to_mock():
+    """Test that exhausted retries return no data instead of synthetic values."""
+    calls = 0
+    
+    def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal calls
+        calls += 1
+        raise httpx.ConnectError("connection refused")
+    
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        fetcher = make_fetcher(client)
+        result = await fetcher.fetch("Oslo,NO")
+    
+    assert calls == 3
+    assert result.data is None
+    assert result.source == SOURCE_UNAVAILABLE
+    assert "ConnectError" in result.error
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("status", [429, 503])
+async def test_rate_limit_honors_retry_after(status):
+    """Test that a 429 or 503 waits at least the Retry-After interval."""
+    calls = []
+    
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(time.monotonic())
+        if len(calls) == 1:
+            return httpx.Response(status, headers={"Retry-After": "0.1"})
+        return httpx.Response(200, json=OSLO_RESPONSE)
+    
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        fetcher = make_fetcher(client)
+        result = await fetcher.fetch("Oslo,NO")
+    
+    assert result.source == SOURCE_LIVE
+    assert calls[1] - calls[0] >= 0.1
+
+
+@pytest.mark.asyncio
+async def test_open_circuit_fails_fast_and_recovers():
+    """Test that an open circuit skips the provider until a half-open probe succeeds."""
+    calls = 0
+    healthy = False
+    
+    def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal calls
+        calls += 1
+        if not healthy:
+            return httpx.Response(500)
+        return httpx.Response(200, json=OSLO_RESPONSE)
+    
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=0.05)
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        fetcher = make_fetcher(client, breaker=breaker)
+        
+        first = await fetcher.fetch("Oslo,NO")
+        assert breaker.state == CircuitBreaker.OPEN
+        assert calls == 2
+        
+        rejected = await fetcher.fetch("Oslo,NO")
+        assert calls == 2
+        assert "open" in rejected.error
+        
+        await asyncio.sleep(0.06)
+        healthy = True
+        recovered = await fetcher.fetch("Oslo,NO")
+    
+    assert first.source == SOURCE_UNAVAILABLE
+    assert recovered.source == SOURCE_LIVE
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.rejected == 1
+
+
+@pytest.mark.asyncio
+async def test_half_open_probe_released_on_cancel():
+    """Test that a cancelled or failed half-open probe does not leave the circuit stuck."""
+    release = asyncio.Event()
+    
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.params["q"] == "Hang":
+            await release.wait()
+        if request.url.params["q"] == "Redirect":
+            return httpx.Response(302, headers={"Location": str(request.url)})
+        return httpx.Response(200, json=OSLO_RESPONSE)
+    
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=0.0)
+    breaker.record_failure()
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler), follow_redirects=True, max_redirects=1) as client:
+        fetcher = make_fetcher(client, breaker=breaker)
+        
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(fetcher._get_json(fetcher.api_url, {"q": "Hang"}, "Hang"), timeout=0.05)
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        assert breaker.half_open_calls == 0
+        
+        redirected = await fetcher.fetch("Redirect")
+        assert "TooManyRedirects" in redirected.error
+        assert breaker.state == CircuitBreaker.OPEN
+        
+        recovered = await fetcher.fetch("Oslo,NO")
+    
+    assert recovered.source == SOURCE_LIVE
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def group_stub(requests):
+    """Stub of the provider's weather and group endpoints keyed by city ID."""
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        if request.url.path.endswith("/group"):
+            ids = [int(value) for value in request.url.params["id"].split(",")]
+            return httpx.Response(200, json={
+                "cnt": len(ids),
+                "list": [
+                    {**OSLO_RESPONSE, "id": city_id, "name": f"City{city_id}"}
+                    for city_id in ids if city_id != 404
+                ],
+            })
+        return httpx.Response(200, json=OSLO_RESPONSE)
+    return handler
+
+
+@pytest.mark.asyncio
+async def test_fetch_many_uses_group_requests():
+    """Test that cities are fetched in groups of at most group_size IDs."""
+    requests = []
+    
+    async with httpx.AsyncClient(transport=httpx.MockTransport(group_stub(requests))) as client:
+        fetcher = make_fetcher(client)
+        fetcher.group_size = 20
+        results = await fetcher.fetch_many(list(range(1, 46)))
+    
+    assert len(requests) == 3
+    assert all(request.url.path.endswith("/group") for request in requests)
+    assert sorted(len(request.url.params["id"].split(",")) for request in requests) == [5, 20, 20]
+    assert len(results) == 45
+    assert results[7].source == SOURCE_LIVE
+    assert results[7].data.city == "City7"
+    assert results[7].data.provider_id == 7
+
+
+@pytest.mark.asyncio
+async def test_fetch_many_reports_missing_and_cached_ids():
+    """Test that IDs absent from the response are unavailable and hits skip the provider."""
+    requests = []
+    
+    async with httpx.AsyncClient(transport=httpx.MockTransport(group_stub(requests))) as client:
+        fetcher = make_fetcher(client)
+        first = await fetcher.fetch_many([1, 404])
+        second = await fetcher.fetch_many([1])
+    
+    assert len(requests) == 1
+    assert first[1].source == SOURCE_LIVE
+    assert first[404].source == SOURCE_UNAVAILABLE
+    assert "404" in first[404].error
+    assert second[1].source == SOURCE_CACHED
+
+
+def make_fetcher(client, breaker=None):
+    fetcher = WeatherFetcher(
+        client=client,
+        engine=FetchEngine(max_in_flight=10, rate_per_minute=0, burst=1),
+        cache=TTLCache(ttl_seconds=60, max_entries=10),
+        breaker=breaker or CircuitBreaker("test", failure_threshold=10, reset_timeout=30),
+        retry_policy=RetryPolicy(attempts=3, base_delay=0.001, max_delay=1.0),
+    )
+    fetcher.api_key = "test-key"
+    return fetcher
@@ -0,0 +1,133 @@
+import json
+import numpy as np
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from app import database
+from app.database import READ_REPLICA, READ_SOURCE, Base
+from app.schemas.weather import WeatherCreate, WeatherUpdate
+from app.services.columnar_snapshot import ColumnarSnapshot
+from app.services.weather_grid import WeatherGrid, bin_cells, get_weather_grid, tile_bounds
+from app.services.weather_service import WeatherService
+
+
+def test_bin_cells():
+    """Test vectorized binning with dropped points and missing values."""
+    columns = np.array([0.5, 0.7, 1.2, 5.0, -0.1])
+    rows = np.array([0.5, 0.2, 0.9, 0.5, 0.5])
+    values = np.array([
+        [10.0, 50.0, np.nan],
+        [20.0, 70.0, 40.0],
+        [30.0, 90.0, 10.0],
+        [99.0, 99.0, 99.0],
+        [99.0, 99.0, 99.0],
+    ])
+    
+    cells = bin_cells(columns, rows, values, n_columns=2, n_rows=1)
+    
+    assert cells["col"].tolist() == [0, 1]
+    assert cells["row"].tolist() == [0, 0]
+    assert cells["count"].tolist() == [2, 1]
+    assert cells["temperature"].tolist() == [15.0, 30.0]
+    assert cells["cloudiness"].tolist() == [40.0, 10.0]
+
+
+def test_tile_bounds():
+    """Test Web Mercator tile bounds."""
+    min_lon, min_lat, max_lon, max_lat = tile_bounds(0, 0, 1)
+    assert (min_lon, max_lon) == (-180, 180)
+    assert max_lat == pytest.approx(85.0511, abs=1e-4)
+    assert min_lat == pytest.approx(-85.0511, abs=1e-4)
+    assert tile_bounds(1, 0, 2)[1:3] == (0.0, 180.0)
+
+
+async def create_city(client: AsyncClient, city: str, lat: float, lon: float, temperature: float):
+    response = await client.post("/api/v1/weather/", json={
+        "city": city, "country": "GR", "latitude": lat, "longitude": lon,
+        "temperature": temperature, "humidity": 50.0, "pressure": 1000.0, "cloudiness": 20,
+    })
+    return response.json()["id"]
+
+
+@pytest.mark.asyncio
+async def test_grid_bbox_and_cache(client: AsyncClient):
+    """Test bbox aggregation and that repeated requests are served from the cache until data changes."""
+    await create_city(client, "A", 10.2, 20.2, 10.0)
+    await create_city(client, "B", 10.8, 20.9, 20.0)
+    city_id = await create_city(client, "C", 12.5, 21.5, 30.0)
+    
+    params = {"bbox": "20,10,22,13", "cell_deg": 1}
+    response = await client.get("/api/v1/weather/grid", params=params)
+    assert response.status_code == 200
+    data = response.json()
+    assert (data["rows"], data["cols"]) == (3, 2)
+    cells = {(cell["row"], cell["col"]): cell for cell in data["cells"]}
+    assert cells[(0, 0)]["count"] == 2
+    assert cells[(0, 0)]["temperature"] == 15.0
+    assert cells[(0, 0)]["bounds"] == [20.0, 10.0, 21.0, 11.0]
+    assert cells[(2, 1)]["temperature"] == 30.0
+    
+    grid = get_weather_grid()
+    hits = grid.tiles.hits
+    assert (await client.get("/api/v1/weather/grid", params=params)).json() == data
+    assert grid.tiles.hits == hits + 1
+    
+    await client.put(f"/api/v1/weather/{city_id}", json={"temperature": 40.0})
+    data = (await client.get("/api/v1/weather/grid", params=params)).json()
+    assert {cell["temperature"] for cell in data["cells"]} == {15.0, 40.0}
+
+
+@pytest.mark.asyncio
+async def test_grid_tile(client: AsyncClient):
+    """Test tile aggregation and validation."""
+    await create_city(client, "North", 45.0, 90.0, 5.0)
+    await create_city(client, "South", -45.0, 90.0, 25.0)
+    
+    response = await client.get("/api/v1/weather/grid/1/1/0", params={"cells": 4})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["tile"] == "1/1/0"
+    assert [cell["temperature"] for cell in data["cells"]] == [5.0]
+    cell = data["cells"][0]
+    assert cell["col"] == 2
+    min_lon, min_lat, max_lon, max_lat = cell["bounds"]
+    assert min_lon <= 90.0 < max_lon and min_lat <= 45.0 < max_lat
+    
+    assert (await client.get("/api/v1/weather/grid/1/2/0")).status_code == 404
+    assert (await client.get("/api/v1/weather/grid", params={"bbox": "1,2,3"})).status_code == 400
+    response = await client.get("/api/v1/weather/grid", params={"bbox": "-180,-90,180,90", "cell_deg": 0.01})
+    assert response.status_code == 400
+
+
+
+@pytest.mark.asyncio
+async def test_grid_reads_primary_behind_lagging_replica(test_session: AsyncSession, test_engine, monkeypatch):
+    """Test that a grid requested on a lagging replica session is built from the primary."""
+    monkeypatch.setattr(database, "async_session_maker", async_sessionmaker(test_engine, expire_on_commit=False))
+    replica_engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with replica_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    
+    snapshot = ColumnarSnapshot()
+    grid = WeatherGrid(ttl_seconds=60, max_entries=10, max_cells=100, snapshot=snapshot)
+    # Another worker's writes: this process only hears about them as dirty ids
+    writer = WeatherService(test_session, snapshot=ColumnarSnapshot())
+    weather = await writer.create(WeatherCreate(
+        city="Remote", country="RM", latitude=10.5, longitude=20.5,
+        temperature=7.0, humidity=50.0, pressure=1000.0,
+    ))
+    await test_session.commit()
+    
+    async def render():
+        async with async_sessionmaker(replica_engine)() as replica:
+            replica.info[READ_SOURCE] = READ_REPLICA
+            return json.loads(await grid.bbox(replica, 20, 10, 22, 12, 1))
+    
+    assert [cell["temperature"] for cell in (await render())["cells"]] == [7.0]
+    
+    await writer.update(weather.id, WeatherUpdate(temperature=9.0))
+    await test_session.commit()
+    snapshot.mark_dirty([weather.id])
+    assert [cell["temperature"] for cell in (await render())["cells"]] == [9.0]
+    
+    await replica_engine.dispose()
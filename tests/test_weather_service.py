@@ -1,5 +1,6 @@
 import pytest
 from datetime import datetime
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.services.weather_service import WeatherService
 from app.schemas.weather import WeatherCreate, WeatherUpdate
@@ -101,6 +102,28 @@ async def test_get_by_city_case_insensitive(test_session: AsyncSession):
     assert weather.city == "CaseTest"
 
 
+@pytest.mark.asyncio
+async def test_get_by_city_normalized_key(test_session: AsyncSession):
+    """Test that lookups ignore casefolding and whitespace differences."""
+    service = WeatherService(test_session)
+    
+    await service.create(WeatherCreate(
+        city="Gross  Strasse",
+        country="DE",
+        temperature=20.0,
+        humidity=50.0,
+        pressure=1010.0,
+    ))
+    await test_session.commit()
+    
+    weather = await service.get_by_city(" GROß strasse ", "de")
+    assert weather is not None
+    assert weather.city_key == "gross strasse"
+    
+    items, total = await service.get_all(city="gross   STRASSE")
+    assert total == 1
+
+
 @pytest.mark.asyncio
 async def test_update_weather_service(test_session: AsyncSession):
     """Test updating weather through service."""
@@ -241,3 +264,124 @@ async def test_upsert_by_city_update(test_session: AsyncSession):
     assert weather.temperature == 25.0
     assert weather.humidity == 55.0
 
+
+@pytest.mark.asyncio
+async def test_get_fetch_targets(test_session: AsyncSession):
+    """Test that every stored row is a fetch target, with its provider city ID when known."""
+    service = WeatherService(test_session)
+    
+    await service.create(WeatherCreate(
+        city="Known", country="KN", temperature=10.0, humidity=40.0, pressure=1000.0,
+        provider_id=12345,
+    ))
+    await service.create(WeatherCreate(
+        city="Unknown", country="UK", temperature=10.0, humidity=40.0, pressure=1000.0,
+    ))
+    await service.create(WeatherCreate(
+        city="Known", country="US", temperature=10.0, humidity=40.0, pressure=1000.0,
+    ))
+    await test_session.commit()
+    
+    targets = await service.get_fetch_targets()
+    assert [target[1:] for target in targets] == [
+        ("Known", "KN", 12345),
+        ("Unknown", "UK", None),
+        ("Known", "US", None),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_bulk_upsert_inserts_and_updates(test_session: AsyncSession):
+    """Test bulk upsert creates new cities and updates existing ones in place."""
+    service = WeatherService(test_session)
+    
+    existing = await service.create(WeatherCreate(
+        city="BulkExisting", country="BE", temperature=5.0, humidity=40.0, pressure=1000.0,
+        wind_speed=3.0,
+    ))
+    await test_session.commit()
+    
+    results = await service.bulk_upsert([
+        WeatherCreate(city="bulkexisting", country="be", temperature=9.0, humidity=45.0, pressure=1001.0),
+        WeatherCreate(city="BulkNew", country="BN", temperature=15.0, humidity=55.0, pressure=1011.0),
+    ])
+    await test_session.commit()
+    
+    by_city = {weather.city_key: (weather, is_new) for weather, is_new in results}
+    updated, updated_is_new = by_city["bulkexisting"]
+    created, created_is_new = by_city["bulknew"]
+    
+    assert updated.id == existing.id
+    assert updated_is_new is False
+    assert updated.temperature == 9.0
+    assert updated.wind_speed == 3.0  # None in the new reading keeps the stored value
+    assert created_is_new is True
+    
+    _, total = await service.get_all()
+    assert total == 2
+
+
+@pytest.mark.asyncio
+async def test_bulk_upsert_keeps_latest_duplicate(test_session: AsyncSession):
+    """Test that repeated cities in one batch resolve to the latest reading."""
+    service = WeatherService(test_session)
+    
+    results = await service.bulk_upsert([
+        WeatherCreate(city="Dup", country="DP", temperature=1.0, humidity=50.0, pressure=1000.0,
+                      data_timestamp=datetime(2024, 1, 1, 12)),
+        WeatherCreate(city="Dup", country="DP", temperature=3.0, humidity=50.0, pressure=1000.0,
+                      data_timestamp=datetime(2024, 1, 1, 14)),
+        WeatherCreate(city="DUP", country="dp", temperature=2.0, humidity=50.0, pressure=1000.0,
+                      data_timestamp=datetime(2024, 1, 1, 13)),
+    ])
+    await test_session.commit()
+    
+    assert len(results) == 1
+    assert results[0][0].temperature == 3.0
+
+
+@pytest.mark.asyncio
+async def test_bulk_upsert_skips_older_readings(test_session: AsyncSession):
+    """Test that a reading older than the stored one leaves the row unchanged but is still reported."""
+    service = WeatherService(test_session)
+    await service.bulk_upsert([
+        WeatherCreate(city="Late", country="LT", temperature=5.0, humidity=50.0, pressure=1000.0,
+                      data_timestamp=datetime(2024, 1, 1, 14)),
+    ])
+    await test_session.commit()
+    
+    results = await service.bulk_upsert([
+        WeatherCreate(city="Late", country="LT", temperature=1.0, humidity=50.0, pressure=1000.0,
+                      data_timestamp=datetime(2024, 1, 1, 12)),
+        WeatherCreate(city="Fresh", country="LT", temperature=9.0, humidity=50.0, pressure=1000.0,
+                      data_timestamp=datetime(2024, 1, 1, 12)),
+    ])
+    await test_session.commit()
+    
+    by_city = {weather.city: (weather.temperature, is_new) for weather, is_new in results}
+    assert by_city == {"Late": (5.0, False), "Fresh": (9.0, True)}
+
+
+@pytest.mark.asyncio
+async def test_bulk_upsert_uses_one_statement_per_chunk(test_session: AsyncSession, test_engine):
+    """Test that a bulk upsert issues one INSERT per chunk."""
+    service = WeatherService(test_session)
+    statements = []
+    
+    def count_statements(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    
+    event.listen(test_engine.sync_engine, "before_cursor_execute", count_statements)
+    try:
+        results = await service.bulk_upsert(
+            [
+                WeatherCreate(city=f"Chunk{i}", country="CH", temperature=i, humidity=50.0, pressure=1000.0)
+                for i in range(50)
+            ],
+            chunk_size=20,
+        )
+    finally:
+        event.remove(test_engine.sync_engine, "before_cursor_execute", count_statements)
+    
+    assert len(results) == 50
+    assert len([s for s in statements if s.lstrip().upper().startswith("INSERT")]) == 3